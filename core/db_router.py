@@ -0,0 +1,63 @@
+"""
+Read/write splitting between the primary ('default') and a read replica.
+
+Reads go to the replica only inside read_from_replica() — the
+ReplicaRoutingMiddleware enables it for read-only endpoints, unless the
+user has written recently (read-your-writes stickiness). Everything else,
+including all writes and the database cache table, uses the primary.
+"""
+import contextvars
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+REPLICA_DB_ALIAS = 'replica'
+# app_label of DatabaseCache entries: a lagging replica would return
+# cache versions that were already bumped on the primary
+CACHE_APP_LABEL = 'django_cache'
+
+_use_replica = contextvars.ContextVar('use_replica', default=False)
+
+
+@contextmanager
+def read_from_replica():
+    token = _use_replica.set(True)
+    try:
+        yield
+    finally:
+        _use_replica.reset(token)
+
+
+@contextmanager
+def read_from_primary():
+    """Forces primary reads, e.g. for checks made inside a write transaction"""
+    token = _use_replica.set(False)
+    try:
+        yield
+    finally:
+        _use_replica.reset(token)
+
+
+def replica_enabled():
+    return REPLICA_DB_ALIAS in settings.DATABASES
+
+
+class ReadWriteRouter:
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label == CACHE_APP_LABEL:
+            return DEFAULT_DB_ALIAS
+        if _use_replica.get() and replica_enabled():
+            return REPLICA_DB_ALIAS
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases hold the same data
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # The replica receives schema changes through replication
+        return db == DEFAULT_DB_ALIAS
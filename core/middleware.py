@@ -0,0 +1,200 @@
+"""
+Project-level middleware:
+
+* PrecompressedStaticMiddleware — serving collected static files from the
+  application when no front proxy (nginx) is configured. Enabled in
+  production with DJANGO_SERVE_STATIC=true.
+* ReplicaRoutingMiddleware — routing read-only endpoints to the read replica.
+* ProfilingMiddleware — on-demand profiling of API endpoints for superusers.
+* SlowQueryLogMiddleware — attributing slow/repeated queries to the view.
+"""
+import mimetypes
+import os
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.http import FileResponse, HttpResponseNotModified
+from django.urls import Resolver404, resolve
+from django.utils.http import http_date
+from django.views.static import was_modified_since
+
+from .db_router import _use_replica, replica_enabled
+from .profiling import PROFILE_HEADER, PROFILE_QUERY_PARAM, profile_request
+from .slow_queries import query_context, set_query_context_label
+
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+DEFAULT_CACHE_CONTROL = 'public, max-age=60'
+
+ENCODINGS = [('br', '.br'), ('gzip', '.gz')]
+
+
+class PrecompressedStaticMiddleware:
+    """
+    Serves files from STATIC_ROOT before the rest of the stack runs.
+
+    Picks the precompressed ``.br``/``.gz`` variant written by
+    CompressedManifestStaticFilesStorage according to Accept-Encoding.
+    Content-hashed names from the manifest get a far-future immutable
+    Cache-Control; unhashed names are revalidated via Last-Modified.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.prefix = '/' + settings.STATIC_URL.strip('/') + '/'
+        self.root = Path(settings.STATIC_ROOT).resolve()
+        self.hashed_names = set(getattr(staticfiles_storage, 'hashed_files', {}).values())
+
+    def __call__(self, request):
+        if request.method in ('GET', 'HEAD') and request.path.startswith(self.prefix):
+            response = self.serve(request, request.path[len(self.prefix):])
+            if response is not None:
+                return response
+        return self.get_response(request)
+
+    def serve(self, request, name):
+        path = (self.root / name).resolve()
+        if self.root not in path.parents or not path.is_file():
+            return None
+
+        stat = path.stat()
+        if not was_modified_since(request.META.get('HTTP_IF_MODIFIED_SINCE'), stat.st_mtime):
+            response = HttpResponseNotModified()
+        else:
+            content_type, _ = mimetypes.guess_type(str(path))
+            serve_path, encoding = self.choose_variant(request, path)
+            response = FileResponse(
+                open(serve_path, 'rb'),
+                content_type=content_type or 'application/octet-stream'
+            )
+            if encoding:
+                response['Content-Encoding'] = encoding
+            response['Last-Modified'] = http_date(stat.st_mtime)
+
+        response['Vary'] = 'Accept-Encoding'
+        response['Cache-Control'] = (
+            IMMUTABLE_CACHE_CONTROL if name in self.hashed_names else DEFAULT_CACHE_CONTROL
+        )
+        return response
+
+    def choose_variant(self, request, path):
+        accepted = {
+            part.split(';')[0].strip()
+            for part in request.META.get('HTTP_ACCEPT_ENCODING', '').split(',')
+        }
+        for encoding, suffix in ENCODINGS:
+            variant = str(path) + suffix
+            if encoding in accepted and os.path.isfile(variant):
+                return variant, encoding
+        return str(path), None
+
+
+# Read-only endpoints (URL names) served from the replica
+REPLICA_READ_VIEWS = {
+    'home',
+    'load_events',
+    'load_series_events',
+    'load_users_overview',
+    'check_event_conflict',
+    'load_occupancy',
+    'search_events',
+    'workload_summary',
+    'export_events',
+    'audit_log',
+    'users_directory',
+    'load_students',
+    'student_history',
+}
+
+PRIMARY_UNTIL_SESSION_KEY = 'db_primary_until'
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Sends reads of REPLICA_READ_VIEWS to the replica database.
+
+    After any unsafe request (POST etc.) the session is pinned to the primary
+    for REPLICA_READ_YOUR_WRITES_SECONDS, so users see their own writes even
+    if the replica lags behind. Must be placed after AuthenticationMiddleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.window = getattr(settings, 'REPLICA_READ_YOUR_WRITES_SECONDS', 5)
+
+    def __call__(self, request):
+        try:
+            response = self.get_response(request)
+        finally:
+            token = getattr(request, '_replica_token', None)
+            if token is not None:
+                _use_replica.reset(token)
+
+        if request.method not in ('GET', 'HEAD', 'OPTIONS') and replica_enabled():
+            session = getattr(request, 'session', None)
+            if session is not None and request.user.is_authenticated:
+                session[PRIMARY_UNTIL_SESSION_KEY] = time.time() + self.window
+
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if (
+            request.method in ('GET', 'HEAD')
+            and replica_enabled()
+            and request.resolver_match.url_name in REPLICA_READ_VIEWS
+            # Session and user are loaded from the primary, before the switch
+            and request.user.is_authenticated
+            and request.session.get(PRIMARY_UNTIL_SESSION_KEY, 0) < time.time()
+        ):
+            request._replica_token = _use_replica.set(True)
+        return None
+
+
+# Modules whose views can be profiled
+PROFILED_VIEW_MODULES = ('scheduler.views', 'scheduler.students_views')
+
+
+class ProfilingMiddleware:
+    """
+    Profiles a request when a superuser asks for it with ?_profile=1 or the
+    X-Profile header (see core.profiling). When not requested the cost is
+    two dictionary lookups. Must be placed after AuthenticationMiddleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if (
+            (PROFILE_QUERY_PARAM in request.GET or PROFILE_HEADER in request.META)
+            and request.user.is_superuser
+            and self.is_profiled_view(request.path_info)
+        ):
+            return profile_request(request, self.get_response)
+        return self.get_response(request)
+
+    def is_profiled_view(self, path):
+        try:
+            match = resolve(path)
+        except Resolver404:
+            return False
+        return match.func.__module__ in PROFILED_VIEW_MODULES
+
+
+class SlowQueryLogMiddleware:
+    """
+    Labels the queries of a request with its view for the slow-query log
+    (core.slow_queries) and reports statements repeated within the request.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with query_context(request.path):
+            return self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        set_query_context_label(f'{view_func.__module__}.{view_func.__name__}')
+        return None
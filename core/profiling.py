@@ -0,0 +1,162 @@
+"""
+On-demand request profiling for superusers.
+
+A request to a profiled endpoint with ``?_profile=1`` (or the
+``X-Profile: 1`` header) from a superuser runs under cProfile with every
+SQL query recorded (duration, alias and the project call site). The report
+is written to PROFILE_REPORTS_DIR and listed at /admin/profiles/.
+"""
+import cProfile
+import io
+import os
+import pstats
+import re
+import time
+import traceback
+from contextlib import ExitStack
+from datetime import datetime
+
+from django.conf import settings
+from django.db import connections
+
+PROFILE_QUERY_PARAM = '_profile'
+PROFILE_HEADER = 'HTTP_X_PROFILE'
+
+REPORT_NAME_RE = re.compile(r'^[\w.-]+\.txt$')
+
+_INTERNAL_FILES = {os.path.abspath(__file__)}
+
+
+def reports_dir():
+    return getattr(settings, 'PROFILE_REPORTS_DIR', os.path.join(settings.BASE_DIR, 'profiles'))
+
+
+def call_site(skip_files=()):
+    """
+    The innermost project frame of the current stack (``path:line function``),
+    skipping Django, third-party packages and the recorders themselves.
+    """
+    root = str(settings.BASE_DIR) + os.sep
+    skip = _INTERNAL_FILES.union(skip_files)
+    for frame in reversed(traceback.extract_stack()[:-1]):
+        filename = os.path.abspath(frame.filename)
+        if filename.startswith(root) and 'site-packages' not in filename and filename not in skip:
+            return f'{os.path.relpath(filename, root)}:{frame.lineno} {frame.name}'
+    return '?'
+
+
+class QueryRecorder:
+    """connection.execute_wrapper that keeps every query with its timing and call site"""
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append({
+                'alias': context['connection'].alias,
+                'sql': sql,
+                'params': params,
+                'many': many,
+                'duration_ms': (time.perf_counter() - start) * 1000,
+                'call_site': call_site(),
+            })
+
+    @property
+    def total_ms(self):
+        return sum(query['duration_ms'] for query in self.queries)
+
+
+def profile_request(request, get_response):
+    """Runs get_response under cProfile and the SQL recorder, writes the report"""
+    recorder = QueryRecorder()
+    profiler = cProfile.Profile()
+    start = time.perf_counter()
+
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(recorder))
+        profiler.enable()
+        try:
+            response = get_response(request)
+        finally:
+            profiler.disable()
+
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    name = write_report(request, response, profiler, recorder, elapsed_ms)
+    response['X-Profile-Report'] = name
+    return response
+
+
+def write_report(request, response, profiler, recorder, elapsed_ms):
+    directory = reports_dir()
+    os.makedirs(directory, exist_ok=True)
+
+    url_name = request.resolver_match.url_name if request.resolver_match else 'request'
+    base_name = f"{datetime.now():%Y%m%d-%H%M%S-%f}_{request.user.username}_{url_name}"
+    base_name = re.sub(r'[^\w.-]', '_', base_name)
+
+    stats_output = io.StringIO()
+    stats = pstats.Stats(profiler, stream=stats_output)
+    stats.sort_stats('cumulative').print_stats(40)
+    # Binary stats for snakeviz / pstats
+    stats.dump_stats(os.path.join(directory, base_name + '.prof'))
+
+    lines = [
+        f'{request.method} {request.get_full_path()}',
+        f'user: {request.user.username}  status: {response.status_code}  '
+        f'total: {elapsed_ms:.1f} ms  SQL: {len(recorder.queries)} queries, {recorder.total_ms:.1f} ms',
+        '',
+        '== SQL ==',
+    ]
+    for number, query in enumerate(recorder.queries, 1):
+        lines.append(
+            f"{number:4}. {query['duration_ms']:8.2f} ms  [{query['alias']}]  {query['call_site']}"
+        )
+        lines.append(f"      {query['sql']}")
+        if query['params']:
+            lines.append(f"      params: {str(query['params'])[:500]}")
+    lines += ['', '== Profile (cumulative, top 40) ==', stats_output.getvalue()]
+
+    with open(os.path.join(directory, base_name + '.txt'), 'w', encoding='utf-8') as report:
+        report.write('\n'.join(lines))
+
+    prune_reports(directory)
+    return base_name + '.txt'
+
+
+def prune_reports(directory):
+    keep = getattr(settings, 'PROFILE_REPORTS_KEEP', 200)
+    reports = sorted(name for name in os.listdir(directory) if name.endswith('.txt'))
+    for name in reports[:-keep] if len(reports) > keep else []:
+        for suffix in ('.txt', '.prof'):
+            path = os.path.join(directory, name[:-4] + suffix)
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def list_reports():
+    directory = reports_dir()
+    if not os.path.isdir(directory):
+        return []
+    reports = []
+    for name in sorted(os.listdir(directory), reverse=True):
+        if REPORT_NAME_RE.match(name):
+            with open(os.path.join(directory, name), encoding='utf-8') as report:
+                summary = [report.readline().strip(), report.readline().strip()]
+            reports.append({'name': name, 'request': summary[0], 'summary': summary[1]})
+    return reports
+
+
+def read_report(name):
+    """Report text or None; the name is validated, paths outside the directory are rejected"""
+    if not REPORT_NAME_RE.match(name):
+        return None
+    path = os.path.join(reports_dir(), name)
+    if not os.path.isfile(path):
+        return None
+    with open(path, encoding='utf-8') as report:
+        return report.read()
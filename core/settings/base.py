@@ -30,6 +30,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.middleware.ProfilingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -86,5 +87,64 @@ MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
 LOGOUT_REDIRECT_URL = '/'
 
+# Reports of ?_profile=1 requests (core.profiling), browsable at /admin/profiles/
+PROFILE_REPORTS_DIR = os.path.join(BASE_DIR, 'profiles')
+PROFILE_REPORTS_KEEP = 200
+
+# Slow-query log (core.slow_queries): queries over the threshold and statements
+# repeated within one request/job go to the core.slow_queries logger
+SLOW_QUERY_LOG = os.getenv('DJANGO_SLOW_QUERY_LOG', 'false').lower() == 'true'
+SLOW_QUERY_THRESHOLD_MS = float(os.getenv('DJANGO_SLOW_QUERY_MS', '100'))
+SLOW_QUERY_REPEAT_THRESHOLD = int(os.getenv('DJANGO_SLOW_QUERY_REPEAT', '20'))
+# Share of slow PostgreSQL SELECTs logged with EXPLAIN ANALYZE (0 — never)
+SLOW_QUERY_EXPLAIN_SAMPLE_RATE = float(os.getenv('DJANGO_SLOW_QUERY_EXPLAIN_RATE', '0'))
+SLOW_QUERY_LOG_FILE = os.path.join(BASE_DIR, 'slow_queries.log')
+
+if SLOW_QUERY_LOG:
+    MIDDLEWARE.append('core.middleware.SlowQueryLogMiddleware')
+
+# Future occurrences of recurring series are created by the run_jobs worker
+# instead of inside the save request
+SERIES_BACKGROUND_JOBS = os.getenv('DJANGO_SERIES_BACKGROUND_JOBS', 'false').lower() == 'true'
+
+# Idempotency-Key responses of write endpoints are kept this long
+# (purged by the purge_idempotency_keys command)
+IDEMPOTENCY_KEY_TTL_HOURS = int(os.getenv('DJANGO_IDEMPOTENCY_KEY_TTL_HOURS', '24'))
+# A key whose first request never finished (the worker was killed) is taken
+# over by a retry after this long; keep it above the worker timeout
+IDEMPOTENCY_LEASE_SECONDS = int(os.getenv('DJANGO_IDEMPOTENCY_LEASE_SECONDS', '300'))
+
+# Audit log of schedule changes: entries are queued in memory and written
+# in batches by a background thread (scheduler/audit.py). A killed process
+# loses up to AUDIT_LOG_FLUSH_SECONDS of entries; graceful shutdown loses none
+AUDIT_LOG_ENABLED = os.getenv('DJANGO_AUDIT_LOG', 'true').lower() == 'true'
+AUDIT_LOG_FLUSH_SECONDS = float(os.getenv('DJANGO_AUDIT_LOG_FLUSH_SECONDS', '2'))
+AUDIT_LOG_BATCH_SIZE = int(os.getenv('DJANGO_AUDIT_LOG_BATCH_SIZE', '200'))
+# Entries beyond this are written synchronously instead of being dropped
+AUDIT_LOG_QUEUE_SIZE = int(os.getenv('DJANGO_AUDIT_LOG_QUEUE_SIZE', '10000'))
+
+# Cache shared by all web processes and the run_jobs worker: month summaries
+# and the users directory are invalidated by version/key bumps that every
+# process has to see. Redis when DJANGO_REDIS_URL is set (needs the redis
+# package), otherwise a table in the primary database — create it once with
+# `python manage.py createcachetable`.
+if os.getenv('DJANGO_REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('DJANGO_REDIS_URL'),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+            'LOCATION': 'django_cache',
+            'OPTIONS': {
+                'MAX_ENTRIES': int(os.getenv('DJANGO_CACHE_MAX_ENTRIES', '100000')),
+            },
+        }
+    }
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
\ No newline at end of file
@@ -29,6 +29,19 @@ DATABASES = {
     }
 }
 
+# Реплика для чтения: load_events и другие читающие эндпоинты идут на нее,
+# запись и чтение сразу после своей записи — на основную БД
+if os.environ.get('DB_REPLICA_HOST'):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'HOST': os.environ.get('DB_REPLICA_HOST'),
+        'PORT': os.environ.get('DB_REPLICA_PORT', DATABASES['default']['PORT']),
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_ROUTERS = ['core.db_router.ReadWriteRouter']
+    MIDDLEWARE.append('core.middleware.ReplicaRoutingMiddleware')
+    REPLICA_READ_YOUR_WRITES_SECONDS = int(os.environ.get('DB_REPLICA_STICKY_SECONDS', '5'))
+
 # Security settings
 CSRF_TRUSTED_ORIGINS = [
     'https://scheduler.mrrob.ru',
@@ -44,6 +57,24 @@ SECURE_CONTENT_TYPE_NOSNIFF = True
 # Static files
 STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 
+# Хэшированные имена + манифест + .gz/.br варианты при collectstatic
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'core.storage.CompressedManifestStaticFilesStorage',
+    },
+}
+
+# Раздача статики самим приложением, если перед ним нет nginx
+SERVE_STATIC = os.environ.get('DJANGO_SERVE_STATIC', 'false').lower() == 'true'
+if SERVE_STATIC:
+    MIDDLEWARE.insert(
+        MIDDLEWARE.index('django.middleware.security.SecurityMiddleware') + 1,
+        'core.middleware.PrecompressedStaticMiddleware'
+    )
+
 # Logging
 LOGGING = {
     'version': 1,
@@ -54,6 +85,17 @@ LOGGING = {
             'class': 'logging.FileHandler',
             'filename': os.path.join(BASE_DIR, 'django_errors.log'),
         },
+        'slow_queries': {
+            'level': 'INFO',
+            'class': 'logging.FileHandler',
+            'filename': SLOW_QUERY_LOG_FILE,
+            'formatter': 'json_line',
+        },
+    },
+    'formatters': {
+        'json_line': {
+            'format': '%(message)s',
+        },
     },
     'loggers': {
         'django': {
@@ -61,6 +103,17 @@ LOGGING = {
             'level': 'ERROR',
             'propagate': True,
         },
+        'core.slow_queries': {
+            'handlers': ['slow_queries'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+        # Audit entries that could not be written on shutdown end up here
+        'scheduler.audit': {
+            'handlers': ['file'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
     },
 }
 
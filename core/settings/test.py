@@ -0,0 +1,61 @@
+"""
+Test settings for core project (SQLite, PostgreSQL is not required).
+
+    python manage.py test --settings=core.settings.test
+"""
+from .base import *
+
+
+DEBUG = False
+
+ALLOWED_HOSTS = ['testserver', 'localhost', '127.0.0.1']
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.path.join(BASE_DIR, 'test_db.sqlite3'),
+        'OPTIONS': {
+            'timeout': 20,
+        },
+        'TEST': {
+            # Файловая тестовая БД: потоки стресс-тестов работают с одной базой
+            # и ждут блокировку, а не падают с "database table is locked"
+            'NAME': os.path.join(BASE_DIR, 'test_db_test.sqlite3'),
+        },
+    }
+}
+
+# Вторая SQLite-база играет роль реплики (в тестах — зеркало default)
+DATABASES['replica'] = {
+    'ENGINE': 'django.db.backends.sqlite3',
+    'NAME': os.path.join(BASE_DIR, 'test_db_replica.sqlite3'),
+    'TEST': {
+        'MIRROR': 'default',
+    },
+}
+
+DATABASE_ROUTERS = ['core.db_router.ReadWriteRouter']
+
+MIDDLEWARE = MIDDLEWARE + ['core.middleware.ReplicaRoutingMiddleware']
+
+# Быстрый хэшер паролей для тестов
+PASSWORD_HASHERS = [
+    'django.contrib.auth.hashers.MD5PasswordHasher',
+]
+
+# Тесты идут в одном процессе — общий кэш не нужен, а таблица кэша в SQLite
+# добавила бы записей, конкурирующих с потоками стресс-тестов
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+# Сессии в памяти: запись сессии после запроса идет вне блокировки расписания
+# и на SQLite может взаимно заблокироваться с транзакцией соседнего потока
+SESSION_ENGINE = 'django.contrib.sessions.backends.cache'
+
+# Журнал изменений включают тесты журнала (override_settings) и пишут его
+# явным audit.writer.flush(): к выходу из процесса тестовой БД уже нет
+AUDIT_LOG_ENABLED = False
+AUDIT_LOG_FLUSH_SECONDS = 3600
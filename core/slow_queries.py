@@ -0,0 +1,178 @@
+"""
+Slow-query log.
+
+A recorder installed on every database connection (connection_created)
+logs, as JSON lines to the ``core.slow_queries`` logger:
+
+* ``slow`` — a query slower than SLOW_QUERY_THRESHOLD_MS, with the view or
+  job it ran in, the project call site (e.g. an EventManager method), the
+  normalized SQL fingerprint and, for a sampled share of PostgreSQL SELECTs,
+  the EXPLAIN ANALYZE plan;
+* ``repeated`` — a statement executed SLOW_QUERY_REPEAT_THRESHOLD or more
+  times within one request/job: per-week loops are fast query by query
+  but show up here.
+
+``python manage.py slow_query_report`` aggregates the log into a top-N.
+"""
+import contextvars
+import hashlib
+import json
+import logging
+import random
+import re
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.utils import timezone
+
+from .profiling import call_site
+
+logger = logging.getLogger('core.slow_queries')
+
+# Label and per-statement counters of the current request or job
+_query_context = contextvars.ContextVar('slow_query_context', default=None)
+# Set while the recorder itself runs EXPLAIN
+_explaining = contextvars.ContextVar('slow_query_explaining', default=False)
+
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PLACEHOLDER_RE = re.compile(r'%s|\?')
+_LIST_RE = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+_ROWS_RE = re.compile(r'(\(\?\+\))(?:\s*,\s*\(\?\+\))+')
+_SPACE_RE = re.compile(r'\s+')
+
+
+def fingerprint(sql):
+    """SQL with literals and placeholders replaced by ``?`` and lists collapsed to ``(?+)``"""
+    sql = _STRING_RE.sub('?', sql)
+    sql = _NUMBER_RE.sub('?', sql)
+    sql = _PLACEHOLDER_RE.sub('?', sql)
+    sql = _LIST_RE.sub('(?+)', sql)
+    sql = _ROWS_RE.sub(r'\1, ...', sql)
+    return _SPACE_RE.sub(' ', sql).strip()
+
+
+def fingerprint_hash(normalized):
+    return hashlib.md5(normalized.encode()).hexdigest()[:12]
+
+
+@contextmanager
+def query_context(label):
+    """Attributes queries inside the block to ``label`` and reports repeated statements at the end"""
+    context = {
+        'label': label, 'counts': defaultdict(int), 'durations': defaultdict(float),
+        'max_durations': defaultdict(float), 'sites': {},
+    }
+    token = _query_context.set(context)
+    try:
+        yield context
+    finally:
+        _query_context.reset(token)
+        report_repeated(context)
+
+
+def set_query_context_label(label):
+    context = _query_context.get()
+    if context is not None:
+        context['label'] = label
+
+
+def report_repeated(context):
+    threshold = getattr(settings, 'SLOW_QUERY_REPEAT_THRESHOLD', 20)
+    for sql, count in context['counts'].items():
+        if count >= threshold:
+            normalized = fingerprint(sql)
+            log_entry({
+                'kind': 'repeated',
+                'label': context['label'],
+                'count': count,
+                'duration_ms': round(context['durations'][sql], 2),
+                # Slowest single execution; duration_ms is the sum over all of them
+                'max_ms': round(context['max_durations'][sql], 2),
+                'call_site': context['sites'].get(sql, '?'),
+                'fingerprint': fingerprint_hash(normalized),
+                'sql': normalized[:2000],
+            })
+
+
+def log_entry(entry):
+    logger.info(json.dumps({'ts': timezone.now().isoformat(), **entry}, ensure_ascii=False))
+
+
+class SlowQueryRecorder:
+    def __call__(self, execute, sql, params, many, context):
+        if _explaining.get():
+            return execute(sql, params, many, context)
+
+        start = time.perf_counter()
+        result = execute(sql, params, many, context)
+        duration_ms = (time.perf_counter() - start) * 1000
+
+        request_context = _query_context.get()
+        if request_context is not None:
+            request_context['counts'][sql] += 1
+            request_context['durations'][sql] += duration_ms
+            request_context['max_durations'][sql] = max(request_context['max_durations'][sql], duration_ms)
+            if sql not in request_context['sites']:
+                request_context['sites'][sql] = call_site(skip_files={__file__})
+
+        if duration_ms >= getattr(settings, 'SLOW_QUERY_THRESHOLD_MS', 100):
+            self.log_slow(sql, params, many, context['connection'], duration_ms, request_context)
+        return result
+
+    def log_slow(self, sql, params, many, connection, duration_ms, request_context):
+        normalized = fingerprint(sql)
+        entry = {
+            'kind': 'slow',
+            'label': request_context['label'] if request_context else None,
+            'alias': connection.alias,
+            'duration_ms': round(duration_ms, 2),
+            'call_site': call_site(skip_files={__file__}),
+            'fingerprint': fingerprint_hash(normalized),
+            'sql': normalized[:2000],
+        }
+        if not many and self.should_explain(sql, connection):
+            entry['explain'] = self.explain(sql, params, connection)
+        log_entry(entry)
+
+    def should_explain(self, sql, connection):
+        rate = getattr(settings, 'SLOW_QUERY_EXPLAIN_SAMPLE_RATE', 0)
+        statement = sql.lstrip().upper()
+        return (
+            rate > 0
+            and connection.vendor == 'postgresql'
+            and statement.startswith('SELECT')
+            and 'FOR UPDATE' not in statement
+            and not connection.needs_rollback
+            and random.random() < rate
+        )
+
+    def explain(self, sql, params, connection):
+        # EXPLAIN ANALYZE runs the SELECT once more. The savepoint keeps a
+        # failed EXPLAIN from aborting the caller's transaction on PostgreSQL.
+        token = _explaining.set(True)
+        try:
+            with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+                cursor.execute('EXPLAIN (ANALYZE, BUFFERS) ' + sql, params)
+                return '\n'.join(row[0] for row in cursor.fetchall())
+        except Exception as e:
+            return f'EXPLAIN failed: {e}'
+        finally:
+            _explaining.reset(token)
+
+
+recorder = SlowQueryRecorder()
+
+
+def install_recorder(sender, connection, **kwargs):
+    if recorder not in connection.execute_wrappers:
+        connection.execute_wrappers.append(recorder)
+
+
+def install():
+    """Connects the recorder to every new database connection (called from SchedulerConfig.ready)"""
+    connection_created.connect(install_recorder, dispatch_uid='core.slow_queries')
@@ -18,6 +18,8 @@ from django.contrib import admin
 from django.urls import path,include
 from . import views
 urlpatterns = [
+    path('admin/profiles/', views.profile_reports, name='profile_reports'),
+    path('admin/profiles/<str:name>/', views.profile_report, name='profile_report'),
     path('admin/', admin.site.urls),
     path('', views.home, name="home"),
     path('api/', include('scheduler.urls')),  # ← подключаем URLs приложения
@@ -1,9 +1,57 @@
+from datetime import timedelta
+
+from django.contrib import admin
+from django.contrib.auth.decorators import login_required, user_passes_test
+from django.http import Http404
 from django.shortcuts import render
-from django.contrib.auth.decorators import login_required
+from django.utils import timezone
+
+from scheduler.event_manager import EventManager
+from scheduler.views import get_users_directory_page, load_week_events
+
+from .profiling import list_reports, read_report
 
 @login_required
 def home(request):
-    return render(request,"index.html")
+    # Данные текущей недели встраиваются в страницу (json_script),
+    # чтобы первая отрисовка не ждала отдельных запросов load_events/users-directory
+    target_user = EventManager(request).target_user
+    today = timezone.localdate()
+    date_from = today - timedelta(days=today.weekday())
+    date_to = date_from + timedelta(days=6)
+
+    initial_data = {
+        'date_from': date_from.strftime('%Y-%m-%d'),
+        'date_to': date_to.strftime('%Y-%m-%d'),
+        'events': load_week_events(target_user, date_from, date_to),
+        'target_user': {
+            'id': target_user.id,
+            'username': target_user.username,
+            'is_self': target_user.id == request.user.id
+        },
+        'users': get_users_directory_page() if request.user.is_superuser else None
+    }
+    return render(request, "index.html", {'initial_data': initial_data})
+
+@user_passes_test(lambda user: user.is_superuser, login_url='admin:login')
+def profile_reports(request):
+    """Список отчетов профилирования (?_profile=1) в админке"""
+    return render(request, 'admin/profile_reports.html', {
+        **admin.site.each_context(request),
+        'title': 'Профилирование запросов',
+        'reports': list_reports(),
+    })
+
+@user_passes_test(lambda user: user.is_superuser, login_url='admin:login')
+def profile_report(request, name):
+    report = read_report(name)
+    if report is None:
+        raise Http404('Отчет не найден')
+    return render(request, 'admin/profile_report.html', {
+        **admin.site.each_context(request),
+        'title': name,
+        'report': report,
+    })
 
 def shedule(request):
-    return
\ No newline at end of file
+    return
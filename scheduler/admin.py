@@ -1,8 +1,74 @@
 # scheduler/admin.py
 from django.contrib import admin
-from .models import ScheduleEvent
+from .locks import users_schedule_lock
+from .models import AuditEntry, BackgroundJob, ScheduleEvent
+from .occupancy import OccupancyDelta
+from .workload import WorkloadDelta
+
 
 @admin.register(ScheduleEvent)
 class ScheduleEventAdmin(admin.ModelAdmin):
+    """
+    Правка событий из админки. Запись идет мимо EventManager, поэтому
+    нагрузка и маски занятости (по ним проверяются конфликты) пересчитываются
+    здесь же, под блокировкой расписаний затронутых пользователей, как и в API.
+    """
     list_display = ['date', 'time', 'text', 'color', 'user']
-    list_filter = ['date', 'color']
\ No newline at end of file
+    list_filter = ['date', 'color']
+
+    def save_model(self, request, obj, form, change):
+        workload = WorkloadDelta()
+        occupancy = OccupancyDelta()
+        # При смене владельца меняются оба расписания
+        owners = {obj.user_id}
+        if change:
+            owners.update(ScheduleEvent.objects.filter(id=obj.id).values_list('user_id', flat=True))
+        with users_schedule_lock(owners):
+            if change:
+                for user_id, date, duration in ScheduleEvent.objects.filter(id=obj.id).values_list(
+                    'user_id', 'date', 'duration'
+                ):
+                    workload.remove(user_id, date, duration)
+                    occupancy.touch(user_id, date)
+            super().save_model(request, obj, form, change)
+            workload.add(obj.user_id, obj.date, obj.duration)
+            occupancy.touch(obj.user_id, obj.date)
+            workload.apply()
+            occupancy.apply()
+
+    def delete_model(self, request, obj):
+        self.delete_queryset(request, ScheduleEvent.objects.filter(id=obj.id))
+
+    def delete_queryset(self, request, queryset):
+        workload = WorkloadDelta()
+        occupancy = OccupancyDelta()
+        with users_schedule_lock(queryset.values_list('user_id', flat=True).distinct()):
+            for user_id, date, duration in queryset.values_list('user_id', 'date', 'duration'):
+                workload.remove(user_id, date, duration)
+                occupancy.touch(user_id, date)
+            queryset.delete()
+            workload.apply()
+            occupancy.apply()
+
+
+@admin.register(BackgroundJob)
+class BackgroundJobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'kind', 'status', 'user', 'attempts', 'created_at', 'finished_at']
+    list_filter = ['status', 'kind']
+    readonly_fields = ['result', 'last_error']
+
+
+@admin.register(AuditEntry)
+class AuditEntryAdmin(admin.ModelAdmin):
+    """Журнал только для просмотра: записи не добавляются, не правятся и не удаляются вручную"""
+    list_display = ['created_at', 'action', 'user', 'actor', 'event_id', 'series_id', 'count']
+    list_filter = ['action']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
@@ -1,6 +1,15 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class SchedulerConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'scheduler'
+
+    def ready(self):
+        from . import signals  # noqa: F401 — регистрация обработчиков сигналов
+        from . import tasks  # noqa: F401 — регистрация обработчиков фоновых задач
+
+        if getattr(settings, 'SLOW_QUERY_LOG', False):
+            from core.slow_queries import install
+            install()
@@ -0,0 +1,185 @@
+"""
+Журнал изменений расписания с отложенной записью (write-behind).
+
+Запись в журнал не входит в запрос: после коммита транзакции запись
+кладется в ограниченную очередь в памяти, фоновый поток раз в
+AUDIT_LOG_FLUSH_SECONDS (или по набору AUDIT_LOG_BATCH_SIZE записей)
+вставляет их одним bulk_create.
+
+Гарантия — at-least-once только при штатной остановке процесса:
+
+* очередь переполнена — запись вставляется синхронно, в запросе;
+* вставка не удалась — пакет остается и повторяется в следующий раз;
+* при остановке процесса (atexit) очередь дописывается до конца, а что
+  не удалось вставить, уходит в лог scheduler.audit строками JSON.
+
+atexit не выполняется, если процесс убит (SIGKILL, OOM, таймаут воркера
+gunicorn): тогда теряются записи, накопленные с последней вставки, —
+до AUDIT_LOG_FLUSH_SECONDS (или AUDIT_LOG_BATCH_SIZE записей). Кому
+важна каждая запись, уменьшает AUDIT_LOG_FLUSH_SECONDS.
+"""
+import atexit
+import json
+import logging
+import queue
+import threading
+from datetime import date, time
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import AuditEntry
+
+logger = logging.getLogger('scheduler.audit')
+
+# Поля события, изменения которых попадают в журнал
+AUDIT_FIELDS = ('date', 'time', 'text', 'color', 'duration', 'is_recurring', 'series_id', 'student_id')
+
+
+def _json_value(value):
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, time):
+        return value.strftime('%H:%M')
+    if isinstance(value, date):
+        return value.isoformat()
+    return str(value)
+
+
+def snapshot(event):
+    """Значения AUDIT_FIELDS события в виде JSON"""
+    return {field: _json_value(getattr(event, field)) for field in AUDIT_FIELDS}
+
+
+def diff(before, after):
+    """{поле: [до, после]} по изменившимся полям; before/after=None — создание/удаление"""
+    before = before or {}
+    after = after or {}
+    return {
+        field: [before.get(field), after.get(field)]
+        for field in AUDIT_FIELDS
+        if before.get(field) != after.get(field)
+    }
+
+
+class AuditWriter:
+    """Очередь записей журнала и фоновый поток, который вставляет их пакетами"""
+
+    def __init__(self, maxsize, batch_size, flush_seconds):
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self.pending = []  # пакет, который не удалось вставить
+        self.flush_lock = threading.Lock()
+        self.stopping = threading.Event()
+        self.wakeup = threading.Event()
+        self.thread = None
+        self.thread_guard = threading.Lock()
+
+    def submit(self, entry):
+        self._ensure_thread()
+        try:
+            self.queue.put_nowait(entry)
+        except queue.Full:
+            # Лучше замедлить запрос, чем потерять запись
+            logger.warning('Очередь журнала переполнена, запись вставляется синхронно')
+            AuditEntry.objects.bulk_create([entry])
+            return
+        if self.queue.qsize() >= self.batch_size:
+            self.wakeup.set()
+
+    def flush(self):
+        """Вставить все, что есть в очереди; возвращает число вставленных записей"""
+        written = 0
+        with self.flush_lock:
+            while True:
+                batch = self.pending or self._take(self.batch_size)
+                if not batch:
+                    return written
+                self.pending = batch
+                AuditEntry.objects.bulk_create(batch)
+                self.pending = []
+                written += len(batch)
+
+    def stop(self):
+        """Остановить поток и дописать очередь (вызывается при выходе из процесса)"""
+        self.stopping.set()
+        self.wakeup.set()
+        if self.thread is not None:
+            self.thread.join(timeout=self.flush_seconds + 5)
+        try:
+            self.flush()
+        except Exception:
+            lost = self.pending + self._take(None)
+            self.pending = []
+            for entry in lost:
+                logger.error('Не записано в журнал: %s', json.dumps({
+                    'created_at': entry.created_at.isoformat(),
+                    'actor_id': entry.actor_id,
+                    'user_id': entry.user_id,
+                    'action': entry.action,
+                    'event_id': entry.event_id,
+                    'series_id': str(entry.series_id) if entry.series_id else None,
+                    'count': entry.count,
+                    'changes': entry.changes,
+                }, ensure_ascii=False))
+        finally:
+            connection.close()
+
+    def _take(self, limit):
+        batch = []
+        while limit is None or len(batch) < limit:
+            try:
+                batch.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _ensure_thread(self):
+        if self.thread is not None and self.thread.is_alive():
+            return
+        with self.thread_guard:
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self._run, name='audit-writer', daemon=True)
+                self.thread.start()
+
+    def _run(self):
+        while not self.stopping.is_set():
+            self.wakeup.wait(self.flush_seconds)
+            self.wakeup.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception('Не удалось записать журнал изменений, повтор через %s с', self.flush_seconds)
+            finally:
+                # Соединение потока не держим открытым между пакетами
+                connection.close()
+
+
+writer = AuditWriter(
+    maxsize=getattr(settings, 'AUDIT_LOG_QUEUE_SIZE', 10000),
+    batch_size=getattr(settings, 'AUDIT_LOG_BATCH_SIZE', 200),
+    flush_seconds=getattr(settings, 'AUDIT_LOG_FLUSH_SECONDS', 2.0),
+)
+atexit.register(writer.stop)
+
+
+def record(action, actor, user, event_id=None, series_id=None, count=None, changes=None):
+    """
+    Записать изменение в журнал после коммита текущей транзакции
+    (откаченная запись в журнал не попадет)
+    """
+    if not getattr(settings, 'AUDIT_LOG_ENABLED', True):
+        return
+    entry = AuditEntry(
+        actor_id=getattr(actor, 'id', actor),
+        user_id=getattr(user, 'id', user),
+        action=action,
+        event_id=event_id,
+        series_id=series_id,
+        count=count,
+        changes=changes or {},
+        created_at=timezone.now(),
+    )
+    transaction.on_commit(lambda: writer.submit(entry))
@@ -0,0 +1,8 @@
+"""
+Ключи общего кэша, которые сбрасываются не там, где заполняются
+(views читают и пишут, signals.py сбрасывает).
+"""
+
+# Первая страница каталога пользователей без поиска
+USERS_DIRECTORY_CACHE_KEY = 'users_directory:first_page'
+USERS_DIRECTORY_CACHE_TIMEOUT = 60 * 60
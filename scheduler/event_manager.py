@@ -1,13 +1,101 @@
 from django.contrib.auth.models import User
-from .models import ScheduleEvent
+from django.db import IntegrityError
+from django.db.models import DateField, ExpressionWrapper, F
+from django.utils import timezone
+from . import audit
+from .jobs import background_jobs_enabled, enqueue
+from .locks import user_schedule_lock
+from .models import ScheduleEvent, Student
+from .month_summary import invalidate_months
+from .occupancy import OccupancyDelta, load_occupancy, slot_mask, start_bit
+from .workload import WorkloadDelta, week_start
+from contextlib import contextmanager
 from datetime import datetime, timedelta
 import uuid
 
+
+class StaleEventError(Exception):
+    """Событие изменено другим запросом после того, как клиент его прочитал"""
+
+
+class EventConflictError(Exception):
+    """Сохраняемое событие пересекается по времени с другими событиями"""
+
+    def __init__(self, conflicts):
+        self.conflicts = conflicts
+        super().__init__('Конфликт с событиями: ' + ', '.join(
+            f"{conflict['text']} ({conflict['time']})" for conflict in conflicts[:10]
+        ))
+
+
+STALE_EVENT_MESSAGE = 'Событие было изменено другим пользователем. Обновите расписание'
+DUPLICATE_SLOT_MESSAGE = 'Событие в это время уже существует'
+SLOT_CONSTRAINT = 'unique_event_slot'
+
+
+def is_duplicate_slot(error):
+    """IntegrityError вызвано ограничением unique_event_slot, а не, например, внешним ключом"""
+    diag = getattr(error.__cause__, 'diag', None)
+    if diag is not None:
+        # PostgreSQL сообщает имя ограничения
+        return diag.constraint_name == SLOT_CONSTRAINT
+    # SQLite называет не ограничение, а его столбцы
+    table = ScheduleEvent._meta.db_table
+    columns = ', '.join(f'{table}.{column}' for column in ('user_id', 'date', 'time'))
+    return SLOT_CONSTRAINT in str(error) or f'UNIQUE constraint failed: {columns}' in str(error)
+
+
+@contextmanager
+def duplicate_slot_errors():
+    """
+    Занятый слот (user, date, time) — ValueError(DUPLICATE_SLOT_MESSAGE),
+    остальные ошибки целостности пробрасываются как есть. Используется
+    внутри user_schedule_lock: исключение откатывает всю его транзакцию,
+    отдельная точка сохранения не нужна.
+    """
+    try:
+        yield
+    except IntegrityError as e:
+        if not is_duplicate_slot(e):
+            raise
+        raise ValueError(DUPLICATE_SLOT_MESSAGE) from e
+
+# Сдвиг серии «на себя» (например, на неделю вперед) проходит в два UPDATE:
+# уникальность (user, date, time) проверяется построчно, поэтому события
+# сначала уводятся на этот срок вперед, где расписания нет, а затем на место
+SHIFT_PARKING_OFFSET = timedelta(days=365 * 1000)
+
+# Фоновая задача: создать будущие события серии (scheduler/tasks.py)
+MATERIALIZE_SERIES_JOB = 'materialize_series'
+
+# student_id не передан при редактировании — привязка к ученику не меняется
+STUDENT_UNCHANGED = object()
+
+# Политики копирования недели при конфликте со своими событиями целевых недель
+COPY_SKIP = 'skip'
+COPY_OVERWRITE = 'overwrite'
+COPY_MAX_WEEKS = 52
+
+# Поля, которые меняет массовое редактирование (bulk_edit)
+BULK_EDIT_FIELDS = ('color', 'text', 'duration')
+
+
 class EventManager:
     def __init__(self, request):
         self.request = request
         self.request_user = request.user
         self.target_user = self._get_target_user()
+        self.scheduled_jobs = []
+
+    @classmethod
+    def for_user(cls, target_user, request_user=None):
+        """Менеджер без HTTP-запроса — для фоновых задач и команд"""
+        manager = cls.__new__(cls)
+        manager.request = None
+        manager.request_user = request_user or target_user
+        manager.target_user = target_user
+        manager.scheduled_jobs = []
+        return manager
 
     def save_event(self, data):
         """Основной метод сохранения/обновления события"""
@@ -16,65 +104,42 @@ class EventManager:
         
         # 2. Получаем ID события
         event_id = data.get('id')
+        self._check_student(parsed_data['student_id'])
         
-        # 3. Валидация
-        if event_id:
-            self.validate_event_update(
-                event_id,
-                parsed_data['date_obj'], 
-                parsed_data['time_obj']
-            )
-        else:
-            self.validate_event_creation(
-                parsed_data['date_obj'], 
-                parsed_data['time_obj']
-            )
-        # 4. Обработка
-        if event_id:
-            return self._update_existing_event(event_id, parsed_data)
-        else:
-            return self._create_new_event(parsed_data)
-    
-    def validate_event_creation(self, date_obj, time_obj):
-        """Валидация при создании нового события"""
-        if self.check_duplicate(date_obj, time_obj):
-            raise ValueError('Событие в это время уже существует')
-    def validate_event_update(self, event_id, date_obj, time_obj):
-        """Валидация при обновлении существующего события"""
-        if self.check_duplicate(date_obj, time_obj, exclude_id=event_id):
-            raise ValueError('Событие в это время уже существует')
-        
-    def check_duplicate(self, date_obj, time_obj, exclude_id=None):
+        # 3-4. Валидация и обработка — в одной транзакции под блокировкой
+        # расписания целевого пользователя: параллельные запросы не
+        # переплетутся с удалением серии. Занятый слот (user, date, time)
+        # отсекает ограничение unique_event_slot — транзакция откатывается целиком
+        with user_schedule_lock(self.target_user.id), duplicate_slot_errors():
+            if event_id:
+                self.validate_no_conflicts(parsed_data, exclude_id=event_id)
+                return self._update_existing_event(event_id, parsed_data)
+            else:
+                self.validate_no_conflicts(parsed_data)
+                return self._create_new_event(parsed_data)
+
+    def validate_no_conflicts(self, parsed_data, exclude_id=None):
         """
-        Проверяет, существует ли уже событие в указанное время.
-        
-        Args:
-            date_obj: Дата события
-            time_obj: Время события
-            exclude_id: ID события, которое нужно исключить из проверки (для редактирования)
-        
-        Returns:
-            ScheduleEvent или None: Существующее событие или None, если дубликата нет
-        """     
-        # Базовый запрос
-        qs = ScheduleEvent.objects.filter(
-            user=self.target_user,
-            date=date_obj,
-            time=time_obj
+        Клиент проверил пересечения по своему кэшу недели и просит
+        подтвердить (reject_conflicts) — окончательная проверка здесь, под блокировкой
+        """
+        if not parsed_data['reject_conflicts']:
+            return
+        conflicts = self.find_conflicts(
+            [(parsed_data['date_obj'], parsed_data['time_obj'], parsed_data['duration'])],
+            exclude_ids=[exclude_id] if exclude_id else []
         )
-        
-        # Исключаем событие при редактировании
-        if exclude_id:
-            qs = qs.exclude(id=exclude_id)
-        
-        # Возвращаем первое найденное событие или None
-        return qs.first()
+        if conflicts:
+            raise EventConflictError(conflicts)
 
     def _update_existing_event(self, event_id, parsed_data):
         """Обновление существующего события"""
         
         event = ScheduleEvent.objects.get(id=event_id, user=self.target_user)
         self._check_permissions(event)
+        self._check_version(event, parsed_data['version'])
+        before = audit.snapshot(event)
+        action = 'update_series' if event.is_recurring and parsed_data['is_recurring'] else 'update'
         
         # Определяем тип обновления
         if not event.is_recurring and parsed_data['is_recurring']:
@@ -85,12 +150,17 @@ class EventManager:
             event = self._convert_recurring_to_single(event, parsed_data)
         else:
             event = self._update_single_event(event, parsed_data)
-        
-        return {'status': 'success', 'created': False, 'id': event.id}
+
+        self._audit(action, event.id, event.series_id, changes=audit.diff(before, audit.snapshot(event)))
+        return self._with_jobs({'status': 'success', 'created': False, 'id': event.id, 'version': event.version})
     
     def _convert_to_recurring(self,event,parsed_data):
         # Создаем новую серию
         series = uuid.uuid4()
+        workload = WorkloadDelta()
+        occupancy = OccupancyDelta()
+        workload.remove(event.user_id, event.date, event.duration)
+        occupancy.touch(event.user_id, event.date)
 
         # Обновляем текущее событие с новыми данными
         event.date = parsed_data['date_obj']
@@ -100,17 +170,24 @@ class EventManager:
         event.is_recurring = True
         event.duration = parsed_data['duration']
         event.series_id = series
-        event.save()
+        self._apply_student(event, parsed_data)
+        self._save_versioned(event)
+        workload.add(event.user_id, event.date, event.duration)
+        occupancy.touch(event.user_id, event.date)
+        workload.apply()
+        occupancy.apply()
 
         # Создаем будущие события
-        self._create_future_recurring_events(
+        self._materialize_series(
             start_date=parsed_data['date_obj'] + timedelta(weeks=1),  # ← используем новую дату
             time=parsed_data['time_obj'],  # ← используем новое время
             text=parsed_data['text'],
             color=parsed_data['color'],
             duration=parsed_data['duration'],
             series=series,
-            weeks_ahead=51
+            weeks_ahead=51,
+            anchor=event,
+            student_id=event.student_id
         )
 
         return event
@@ -126,14 +203,34 @@ class EventManager:
             series_id=series_id
         )
 
-        for ev in events_to_update:
-            ev.text = parsed_data['text']
-            ev.color = parsed_data['color']
-            ev.duration = parsed_data['duration']
-            # Если изменилось время, обновляем время для всех событий
-            if str(ev.time) != parsed_data['time_str']:
-                ev.time = parsed_data['time_obj']
-            ev.save()
+        workload = WorkloadDelta()
+        occupancy = OccupancyDelta()
+        for date, duration in events_to_update.values_list('date', 'duration'):
+            workload.remove(self.target_user.id, date, duration)
+            workload.add(self.target_user.id, date, parsed_data['duration'])
+            occupancy.touch(self.target_user.id, date)
+
+        # Одним UPDATE: версия каждого события серии увеличивается атомарно
+        updates = {
+            'text': parsed_data['text'],
+            'color': parsed_data['color'],
+            'duration': parsed_data['duration'],
+            'time': parsed_data['time_obj'],
+            'version': F('version') + 1,
+            'updated_at': timezone.now()
+        }
+        if parsed_data['student_id'] is not STUDENT_UNCHANGED:
+            updates['student_id'] = parsed_data['student_id']
+        events_to_update.update(**updates)
+        workload.apply()
+        occupancy.apply()
+
+        event.text = parsed_data['text']
+        event.color = parsed_data['color']
+        event.duration = parsed_data['duration']
+        event.time = parsed_data['time_obj']
+        self._apply_student(event, parsed_data)
+        event.version += 1
         return event
 
     def _convert_recurring_to_single(self,event,parsed_data):
@@ -142,58 +239,77 @@ class EventManager:
         original_text = event.text
         original_color = event.color
         original_duration = event.duration
+        original_student_id = event.student_id
 
         # 1. Удаляем все будущие события старой серии (но НЕ трогаем текущее)
-        ScheduleEvent.objects.filter(
+        workload = WorkloadDelta()
+        occupancy = OccupancyDelta()
+        future_events = ScheduleEvent.objects.filter(
             user=self.target_user,
             series_id=event.series_id,
             date__gt=parsed_data['date_obj']
-        ).delete()
+        )
+        for date, duration in future_events.values_list('date', 'duration'):
+            workload.remove(self.target_user.id, date, duration)
+            occupancy.touch(self.target_user.id, date)
+        future_events.delete()
 
 
 
         # 2. Создаем новую серию регулярных событий с теми же параметрами
         new_series_id = uuid.uuid4()
-        new_start_date = parsed_data['date_obj']
 
-        # Проверяем, что на new_start_date в это время нет других событий
-        while ScheduleEvent.objects.filter(
-                user=self.target_user,
-                date=new_start_date,
-                time=original_time
-        ).exists():
-            new_start_date += timedelta(weeks=1)
+        # Первая неделя (в пределах года), где в это время нет других событий
+        candidate_dates = [parsed_data['date_obj'] + timedelta(weeks=week) for week in range(53)]
+        taken_dates = self.find_taken_dates(candidate_dates, original_time)
+        new_start_date = next((date for date in candidate_dates if date not in taken_dates), None)
 
         # Создаем новую серию, если дата не ушла слишком далеко
-        if new_start_date <= parsed_data['date_obj'] + timedelta(weeks=52):
-            self._create_future_recurring_events(
+        if new_start_date is not None:
+            self._materialize_series(
                 new_start_date,
                 original_time,
                 original_text,
                 original_color,
                 original_duration,
                 new_series_id,
-                weeks_ahead=52
+                weeks_ahead=52,
+                student_id=original_student_id
             )
 
         # 3. Обновляем текущее событие → превращаем в одиночное
+        workload.remove(event.user_id, event.date, event.duration)
         event.text = parsed_data['text']
         event.color = parsed_data['color']
         event.is_recurring = False
         event.duration = parsed_data['duration']
-        event.save()
+        self._apply_student(event, parsed_data)
+        self._save_versioned(event)
+        workload.add(event.user_id, event.date, event.duration)
+        occupancy.touch(event.user_id, event.date)
+        workload.apply()
+        occupancy.apply()
 
         return event
 
     def _update_single_event(self,event,parsed_data):
         # Обновляем только одно нерегулярное событие
+        workload = WorkloadDelta()
+        occupancy = OccupancyDelta()
+        workload.remove(event.user_id, event.date, event.duration)
+        occupancy.touch(event.user_id, event.date)
         event.date = parsed_data['date_obj']
         event.time = parsed_data['time_obj']
         event.text = parsed_data['text']
         event.color = parsed_data['color']
         event.is_recurring = False
         event.duration = parsed_data['duration']
-        event.save()
+        self._apply_student(event, parsed_data)
+        self._save_versioned(event)
+        workload.add(event.user_id, event.date, event.duration)
+        occupancy.touch(event.user_id, event.date)
+        workload.apply()
+        occupancy.apply()
 
         return event
     
@@ -214,16 +330,16 @@ class EventManager:
             return {'status': 'success', 'created': True, 'id': event.id}
         else:
             event, series_id = self.create_recurring_events(parsed_data)
-            return {
+            return self._with_jobs({
                 'status': 'success', 
                 'created': True, 
                 'id': event.id, 
                 'series_id': str(series_id)
-            }
+            })
     
     def create_single_event(self, parsed_data):
         """Создание разового события"""
-        return ScheduleEvent.objects.create(
+        event = ScheduleEvent.objects.create(
             user=self.target_user,
             date=parsed_data['date_obj'],
             time=parsed_data['time_obj'],
@@ -231,8 +347,20 @@ class EventManager:
             color=parsed_data['color'],
             is_recurring=False,
             duration=parsed_data['duration'],
-            created_by=self.request_user
+            created_by=self.request_user,
+            student_id=self._new_student_id(parsed_data)
         )
+
+        workload = WorkloadDelta()
+        workload.add(event.user_id, event.date, event.duration)
+        workload.apply()
+
+        occupancy = OccupancyDelta()
+        occupancy.touch(event.user_id, event.date)
+        occupancy.apply()
+
+        self._audit('create', event.id, changes=audit.diff(None, audit.snapshot(event)))
+        return event
     
     def create_recurring_events(self, parsed_data):
         """Создание серии регулярных событий"""
@@ -248,41 +376,125 @@ class EventManager:
             is_recurring=True,
             duration=parsed_data['duration'],
             series_id=series,
-            created_by=self.request_user
+            created_by=self.request_user,
+            student_id=self._new_student_id(parsed_data)
         )
+
+        workload = WorkloadDelta()
+        workload.add(first_event.user_id, first_event.date, first_event.duration)
+        workload.apply()
+
+        occupancy = OccupancyDelta()
+        occupancy.touch(first_event.user_id, first_event.date)
+        occupancy.apply()
         
         # Создаем будущие события (начиная со следующей недели)
-        self._create_future_recurring_events(
+        created = self._materialize_series(
             start_date=parsed_data['date_obj'] + timedelta(weeks=1),
             time=parsed_data['time_obj'],
             text=parsed_data['text'],
             color=parsed_data['color'],
             duration=parsed_data['duration'],
             series=series,
-            weeks_ahead=51  # чтобы всего было 52 недели
+            weeks_ahead=51,  # чтобы всего было 52 недели
+            anchor=first_event,
+            student_id=first_event.student_id
+        )
+
+        # Одна запись на серию; число событий неизвестно, пока их создает фоновая задача
+        self._audit(
+            'create_series', first_event.id, series, count=None if created is None else created + 1,
+            changes=audit.diff(None, audit.snapshot(first_event))
         )
-        
         return first_event, series
     
-    def _create_future_recurring_events(self, start_date, time, text, color, duration=1.0, series=None, weeks_ahead=52):
-        """Создает регулярные события на год вперед"""
+    def _materialize_series(self, start_date, time, text, color, duration, series, weeks_ahead, anchor=None,
+                            student_id=None):
+        """
+        Будущие события серии: сразу или фоновой задачей (SERIES_BACKGROUND_JOBS).
+
+        anchor — уже созданное событие серии: если к моменту выполнения
+        задачи его удалят или отвяжут от серии, задача ничего не создаст,
+        а время и текст возьмет из него (серию могли успеть отредактировать).
+        Возвращает число созданных событий или None, если поставлена задача.
+        """
+        if not background_jobs_enabled():
+            return self._create_future_recurring_events(
+                start_date, time, text, color, duration, series, weeks_ahead, student_id=student_id
+            )
+
+        job = enqueue(
+            MATERIALIZE_SERIES_JOB,
+            user=self.target_user,
+            created_by=self.request_user,
+            key=f'{MATERIALIZE_SERIES_JOB}:{series}',
+            payload={
+                'series_id': str(series),
+                'anchor_id': anchor.id if anchor else None,
+                'start_date': start_date.isoformat(),
+                'time': time.strftime('%H:%M:%S'),
+                'text': text,
+                'color': color,
+                'duration': float(duration),
+                'weeks_ahead': weeks_ahead,
+                'student_id': student_id,
+            }
+        )
+        self.scheduled_jobs.append(job)
+        return None
+
+    def _with_jobs(self, response):
+        if self.scheduled_jobs:
+            response['job_id'] = self.scheduled_jobs[-1].id
+        return response
+
+    def _create_future_recurring_events(self, start_date, time, text, color, duration=1.0, series=None, weeks_ahead=52,
+                                        student_id=None):
+        """
+        Создает регулярные события на год вперед, возвращает количество созданных.
+
+        Даты, где в это время уже есть событие, пропускает сама база
+        (INSERT ... ON CONFLICT DO NOTHING по unique_event_slot). Какие строки
+        вставлены, видно по событиям серии на эти даты до и после вставки —
+        повторный запуск фоновой задачи не посчитает нагрузку дважды.
+        """
         try:
-            for week in range(0, weeks_ahead + 1):
-                event_date = start_date + timedelta(weeks=week)
-
-                if ScheduleEvent.objects.filter(user=self.target_user, date=event_date, time=time).exists():
-                    continue
-
-                ScheduleEvent.objects.create(
-                    user=self.target_user,
-                    date=event_date,
-                    time=time,
-                    text=text,
-                    color=color,
-                    is_recurring=True,
-                    duration=duration,
-                    series_id=series
-                )
+            event_dates = [start_date + timedelta(weeks=week) for week in range(0, weeks_ahead + 1)]
+            series_events = ScheduleEvent.objects.filter(
+                user=self.target_user, series_id=series, date__in=event_dates
+            ).values_list('date', flat=True)
+            existing_dates = set(series_events)
+
+            # Одним INSERT: число запросов не зависит от длины серии
+            ScheduleEvent.objects.bulk_create(
+                [
+                    ScheduleEvent(
+                        user=self.target_user,
+                        date=event_date,
+                        time=time,
+                        text=text,
+                        color=color,
+                        is_recurring=True,
+                        duration=duration,
+                        series_id=series,
+                        student_id=student_id,
+                        created_by=self.request_user
+                    )
+                    for event_date in event_dates
+                    if event_date not in existing_dates
+                ],
+                ignore_conflicts=True
+            )
+            created_dates = set(series_events.all()) - existing_dates
+
+            workload = WorkloadDelta()
+            occupancy = OccupancyDelta()
+            for event_date in created_dates:
+                workload.add(self.target_user.id, event_date, duration)
+                occupancy.touch(self.target_user.id, event_date)
+            workload.apply()
+            occupancy.apply()
+            return len(created_dates)
         except Exception as e:
             print(f"[ERROR] in create_recurring_events: {str(e)}")
             raise e
@@ -296,17 +508,7 @@ class EventManager:
         date_obj = datetime.strptime(date_str, '%Y-%m-%d').date()
         
         # Парсим время
-        time_obj = None
-        time_formats = ['%H:%M:%S', '%H:%M', '%H']
-        for fmt in time_formats:
-            try:
-                time_obj = datetime.strptime(time_str, fmt).time()
-                break
-            except ValueError:
-                continue
-        
-        if time_obj is None:
-            raise ValueError('Неверный формат времени')
+        time_obj = self.parse_time(time_str)
         
         return {
             'date_obj': date_obj,
@@ -315,9 +517,462 @@ class EventManager:
             'color': data.get('color', ''),
             'is_recurring': data.get('is_recurring', False),
             'duration': data.get('duration', 1.0),
+            'version': data.get('version'),  # версия, которую видел клиент (необязательно)
+            'student_id': data.get('student_id', STUDENT_UNCHANGED) or None,
+            'reject_conflicts': bool(data.get('reject_conflicts')),
             'time_str': time_str  # сохраняем для сравнения
         }
     
+    def parse_time(self, time_str):
+        """Парсит время в форматах HH:MM:SS, HH:MM, HH"""
+        time_formats = ['%H:%M:%S', '%H:%M', '%H']
+        for fmt in time_formats:
+            try:
+                return datetime.strptime(time_str, fmt).time()
+            except ValueError:
+                continue
+
+        raise ValueError('Неверный формат времени')
+
+    def shift_series(self, data):
+        """
+        Сдвигает всю серию (или ее часть начиная с from_date) на day_offset дней
+        и/или на новое время time.
+
+        Все сдвинутые события проверяются на конфликты одним запросом,
+        сам перенос — один UPDATE: id, series_id и created_by сохраняются.
+        """
+        # Проверка пересечений не видит событий нулевой длительности с тем же
+        # началом — их отсекает unique_event_slot
+        with user_schedule_lock(self.target_user.id), duplicate_slot_errors():
+            return self._shift_series(data)
+
+    def _shift_series(self, data):
+        event = ScheduleEvent.objects.get(id=data.get('id'), user=self.target_user)
+        self._check_permissions(event)
+        self._check_version(event, data.get('version'))
+
+        if not event.series_id:
+            raise ValueError('Событие не входит в серию')
+
+        day_offset = int(data.get('day_offset') or 0)
+        new_time = self.parse_time(data['time']) if data.get('time') else None
+        if not day_offset and new_time is None:
+            raise ValueError('Не указан сдвиг: day_offset и/или time')
+
+        series_events = ScheduleEvent.objects.filter(user=self.target_user, series_id=event.series_id)
+        if data.get('from_date'):
+            from_date = datetime.strptime(data['from_date'], '%Y-%m-%d').date()
+            series_events = series_events.filter(date__gte=from_date)
+
+        moving = list(series_events.values_list('id', 'date', 'time', 'duration'))
+        shifted = [
+            (date + timedelta(days=day_offset), new_time or time, duration)
+            for _, date, time, duration in moving
+        ]
+
+        conflicts = self.find_conflicts(shifted, exclude_ids=[event_id for event_id, _, _, _ in moving])
+        if conflicts:
+            raise ValueError('Конфликт с событиями: ' + ', '.join(
+                f"{conflict['date']} {conflict['time']} {conflict['text']}" for conflict in conflicts[:10]
+            ))
+
+        updates = {'version': F('version') + 1, 'updated_at': timezone.now()}
+        if day_offset:
+            updates['date'] = ExpressionWrapper(
+                F('date') + timedelta(days=day_offset), output_field=DateField()
+            )
+        if new_time is not None:
+            updates['time'] = new_time
+
+        workload = WorkloadDelta()
+        occupancy = OccupancyDelta()
+        for (_, date, _, duration), (new_date, _, _) in zip(moving, shifted):
+            workload.remove(self.target_user.id, date, duration)
+            workload.add(self.target_user.id, new_date, duration)
+            occupancy.touch(self.target_user.id, date)
+            occupancy.touch(self.target_user.id, new_date)
+
+        moving_ids = [event_id for event_id, _, _, _ in moving]
+        if {(date, time) for date, time, _ in shifted} & {(date, time) for _, date, time, _ in moving}:
+            ScheduleEvent.objects.filter(id__in=moving_ids).update(
+                date=ExpressionWrapper(F('date') + SHIFT_PARKING_OFFSET, output_field=DateField())
+            )
+            updates['date'] = ExpressionWrapper(
+                F('date') + (timedelta(days=day_offset) - SHIFT_PARKING_OFFSET), output_field=DateField()
+            )
+
+        shifted_count = ScheduleEvent.objects.filter(id__in=moving_ids).update(**updates)
+        workload.apply()
+        occupancy.apply()
+
+        changes = {'day_offset': day_offset, 'from_date': data.get('from_date') or None}
+        if new_time is not None:
+            changes['time'] = [event.time.strftime('%H:%M'), new_time.strftime('%H:%M')]
+        self._audit('shift_series', event.id, event.series_id, count=shifted_count, changes=changes)
+
+        return {'status': 'success', 'shifted': shifted_count, 'series_id': str(event.series_id)}
+
+    def find_conflicts(self, slots, exclude_ids=()):
+        """
+        Ищет события, пересекающиеся по времени с любым из слотов (date, time, duration).
+
+        Сначала — битовые маски занятости дней: события читаются только
+        за даты, где маска слота пересекается с занятыми слотами дня.
+        Пересечение — как в check_event_conflict.
+        """
+        return [
+            {
+                'id': event_id,
+                'date': date.strftime('%Y-%m-%d'),
+                'time': event_time.strftime('%H:%M'),
+                'text': text
+            }
+            for (date, _, _), overlapping in zip(slots, self.find_overlaps(slots, exclude_ids))
+            for event_id, event_time, _, text in overlapping
+        ]
+
+    def find_overlaps(self, slots, exclude_ids=()):
+        """Для каждого слота — список пересекающихся событий (id, time, duration, text)"""
+        if not slots:
+            return []
+
+        occupancy = load_occupancy(self.target_user.id, [date for date, _, _ in slots])
+        busy_dates = {
+            date for date, time, duration in slots
+            if occupancy.get(date, (0, 0))[0] & slot_mask(time, duration)
+        }
+        if not busy_dates:
+            return [[] for _ in slots]
+
+        candidates = ScheduleEvent.objects.filter(
+            user=self.target_user,
+            date__in=busy_dates
+        ).exclude(id__in=list(exclude_ids)).values_list('id', 'date', 'time', 'duration', 'text')
+
+        events_by_date = {}
+        for event_id, date, time, duration, text in candidates:
+            events_by_date.setdefault(date, []).append((event_id, time, duration, text))
+
+        overlaps = []
+        for date, time, duration in slots:
+            start = time.hour * 60 + time.minute
+            end = start + float(duration) * 60
+            overlapping = []
+            for event in events_by_date.get(date, []):
+                event_start = event[1].hour * 60 + event[1].minute
+                event_end = event_start + float(event[2]) * 60
+                if start < event_end and end > event_start:
+                    overlapping.append(event)
+            overlaps.append(overlapping)
+        return overlaps
+
+    def find_taken_dates(self, dates, time_obj):
+        """
+        Даты из списка, на которые в time_obj уже начинается событие.
+        Маски начала событий отсекают свободные даты, оставшиеся проверяются
+        одним запросом.
+        """
+        occupancy = load_occupancy(self.target_user.id, dates)
+        bit = start_bit(time_obj)
+        candidate_dates = [date for date in dates if occupancy.get(date, (0, 0))[1] & bit]
+        if not candidate_dates:
+            return set()
+
+        return set(ScheduleEvent.objects.filter(
+            user=self.target_user,
+            date__in=candidate_dates,
+            time=time_obj
+        ).values_list('date', flat=True))
+
+    def copy_week(self, data):
+        """
+        Копирует события недели week на weeks недель начиная с target_week
+        (по умолчанию — следующая неделя) одним bulk_create.
+
+        Суперпользователь может копировать в расписание другого пользователя
+        (to_user_id; тогда по умолчанию — та же неделя). События серий внутри
+        своего расписания не копируются — серия и так повторяется каждую неделю.
+        Конфликты со всеми целевыми неделями проверяются одним проходом:
+        policy=skip пропускает конфликтующие копии, overwrite удаляет мешающие события
+        (кроме тех, что пользователь удалить не может — тогда копия пропускается).
+        """
+        source_week = week_start(datetime.strptime(data['week'], '%Y-%m-%d').date())
+        weeks = int(data.get('weeks', 1))
+        if not 1 <= weeks <= COPY_MAX_WEEKS:
+            raise ValueError(f'Количество недель — от 1 до {COPY_MAX_WEEKS}')
+        policy = data.get('policy', COPY_SKIP)
+        if policy not in (COPY_SKIP, COPY_OVERWRITE):
+            raise ValueError('policy: skip или overwrite')
+
+        destination = self
+        to_user_id = data.get('to_user_id')
+        if to_user_id and int(to_user_id) != self.target_user.id:
+            if not self.request_user.is_superuser:
+                raise PermissionError('Копировать в чужое расписание может только администратор')
+            destination = EventManager.for_user(User.objects.get(id=to_user_id), self.request_user)
+
+        if data.get('target_week'):
+            target_week = week_start(datetime.strptime(data['target_week'], '%Y-%m-%d').date())
+        else:
+            target_week = source_week + timedelta(weeks=1 if destination is self else 0)
+        if destination is self and target_week <= source_week < target_week + timedelta(weeks=weeks):
+            raise ValueError('Неделя не может быть скопирована сама в себя')
+
+        with user_schedule_lock(destination.target_user.id), duplicate_slot_errors():
+            source_events = ScheduleEvent.objects.filter(
+                user=self.target_user,
+                date__range=(source_week, source_week + timedelta(days=6))
+            )
+            if destination is self:
+                source_events = source_events.filter(is_recurring=False)
+            result = destination._copy_events(
+                list(source_events), target_week - source_week, weeks, policy,
+                keep_students=destination is self
+            )
+            destination._audit('copy_week', count=result['created'], changes={
+                'source_user_id': self.target_user.id,
+                'week': source_week.isoformat(),
+                'target_week': target_week.isoformat(),
+                'weeks': weeks,
+                'policy': policy,
+                'skipped': result['skipped'],
+                'replaced': result['replaced'],
+            })
+            return result
+
+    def _copy_events(self, events, offset, weeks, policy, keep_students):
+        copies = [
+            (event, event.date + offset + timedelta(weeks=week))
+            for week in range(weeks)
+            for event in events
+        ]
+        overlaps = self.find_overlaps([(date, event.time, event.duration) for event, date in copies])
+        protected = self._protected_event_ids(
+            {overlap[0] for overlapping in overlaps for overlap in overlapping}
+        ) if policy == COPY_OVERWRITE else set()
+
+        workload = WorkloadDelta()
+        occupancy = OccupancyDelta()
+        replaced = {}
+        skipped = 0
+        new_events = []
+        for (event, date), overlapping in zip(copies, overlaps):
+            # Чужие события overwrite не удаляет — как и delete_event, копия пропускается
+            if overlapping and (policy == COPY_SKIP or any(overlap[0] in protected for overlap in overlapping)):
+                skipped += 1
+                continue
+            for event_id, _, duration, _ in overlapping:
+                replaced[event_id] = (date, duration)
+            new_events.append(ScheduleEvent(
+                user=self.target_user,
+                created_by=self.request_user,
+                date=date,
+                time=event.time,
+                text=event.text,
+                color=event.color,
+                duration=event.duration,
+                is_recurring=False,
+                student_id=event.student_id if keep_students else None
+            ))
+            workload.add(self.target_user.id, date, event.duration)
+            occupancy.touch(self.target_user.id, date)
+
+        if replaced:
+            ScheduleEvent.objects.filter(id__in=list(replaced)).delete()
+            for date, duration in replaced.values():
+                workload.remove(self.target_user.id, date, duration)
+        ScheduleEvent.objects.bulk_create(new_events)
+        workload.apply()
+        occupancy.apply()
+
+        return {
+            'status': 'success',
+            'created': len(new_events),
+            'skipped': skipped,
+            'replaced': len(replaced),
+            'user_id': self.target_user.id
+        }
+
+    def _protected_event_ids(self, event_ids):
+        """id событий из event_ids, которые пользователь не может удалить (см. _check_permissions)"""
+        if not event_ids or self.request_user.is_superuser:
+            return set()
+        return set(
+            ScheduleEvent.objects.filter(id__in=list(event_ids))
+            .exclude(created_by=self.request_user)
+            .values_list('id', flat=True)
+        )
+
+    def bulk_edit(self, data):
+        """
+        Меняет color/text/duration (data['set']) всех событий целевого
+        пользователя, подходящих под фильтр (data['filter']): date_from,
+        date_to, text (подстрока), color, series_ids, student_id.
+
+        Само изменение — один UPDATE (версия каждого события растет
+        атомарно). До него один SELECT дат и длительностей: по ним
+        пересчитываются нагрузка и занятость. dry_run — только подсчет.
+        """
+        changes = self._parse_bulk_changes(data.get('set') or {})
+        dry_run = bool(data.get('dry_run'))
+
+        with user_schedule_lock(self.target_user.id):
+            events = self._bulk_edit_queryset(data.get('filter') or {})
+            matched = list(events.values_list('date', 'duration', 'series_id'))
+            result = {
+                'status': 'success',
+                'dry_run': dry_run,
+                'matched': len(matched),
+                'series': len({series_id for _, _, series_id in matched if series_id}),
+                'updated': 0
+            }
+            if dry_run or not matched:
+                return result
+
+            result['updated'] = events.update(
+                **changes, version=F('version') + 1, updated_at=timezone.now()
+            )
+
+            dates = {date for date, _, _ in matched}
+            if 'duration' in changes:
+                workload = WorkloadDelta()
+                occupancy = OccupancyDelta()
+                for date, duration, _ in matched:
+                    workload.remove(self.target_user.id, date, duration)
+                    workload.add(self.target_user.id, date, changes['duration'])
+                    occupancy.touch(self.target_user.id, date)
+                workload.apply()
+                occupancy.apply()
+            else:
+                # Цвета входят в сводку месяца, занятость не меняется
+                invalidate_months(self.target_user.id, dates)
+
+            self._audit('bulk_edit', count=result['updated'], changes={
+                'filter': data.get('filter') or {},
+                'set': changes,
+            })
+            return result
+
+    def _parse_bulk_changes(self, changes):
+        unknown = set(changes) - set(BULK_EDIT_FIELDS)
+        if unknown:
+            raise ValueError('Можно изменить только: ' + ', '.join(BULK_EDIT_FIELDS))
+        if not changes:
+            raise ValueError('Не указано, что изменить (set)')
+
+        parsed = {}
+        if 'color' in changes:
+            parsed['color'] = str(changes['color'] or '')
+        if 'text' in changes:
+            parsed['text'] = str(changes['text'] or '')
+        if 'duration' in changes:
+            parsed['duration'] = float(changes['duration'])
+            if not 0 < parsed['duration'] <= 24:
+                raise ValueError('Продолжительность — от 0 до 24 часов')
+        return parsed
+
+    def _bulk_edit_queryset(self, filters):
+        """События целевого пользователя по фильтру; пустой фильтр не допускается"""
+        events = ScheduleEvent.objects.filter(user=self.target_user)
+        if not self.request_user.is_superuser:
+            # Как в _check_permissions: чужие события расписания не меняются
+            events = events.filter(created_by=self.request_user)
+        applied = False
+        if filters.get('date_from'):
+            events = events.filter(date__gte=datetime.strptime(filters['date_from'], '%Y-%m-%d').date())
+            applied = True
+        if filters.get('date_to'):
+            events = events.filter(date__lte=datetime.strptime(filters['date_to'], '%Y-%m-%d').date())
+            applied = True
+        if filters.get('text'):
+            events = events.filter(text__icontains=filters['text'])
+            applied = True
+        if filters.get('color') is not None:
+            events = events.filter(color=filters['color'])
+            applied = True
+        if filters.get('series_ids'):
+            events = events.filter(series_id__in=[uuid.UUID(str(series_id)) for series_id in filters['series_ids']])
+            applied = True
+        if filters.get('student_id'):
+            events = events.filter(student_id=int(filters['student_id']))
+            applied = True
+        if not applied:
+            raise ValueError('Фильтр не задан: изменить все расписание разом нельзя')
+        return events
+
+    def link_student(self, data):
+        """
+        Привязывает событие (или всю его серию, whole_series) к ученику
+        одним UPDATE; student_id=None снимает привязку.
+        """
+        with user_schedule_lock(self.target_user.id):
+            event = ScheduleEvent.objects.get(id=data.get('id'), user=self.target_user)
+            self._check_permissions(event)
+            self._check_version(event, data.get('version'))
+
+            student_id = data.get('student_id') or None
+            self._check_student(student_id)
+
+            events = ScheduleEvent.objects.filter(id=event.id)
+            whole_series = data.get('whole_series', True) and event.series_id
+            if whole_series:
+                events = ScheduleEvent.objects.filter(user=self.target_user, series_id=event.series_id)
+
+            linked = events.update(student_id=student_id, version=F('version') + 1, updated_at=timezone.now())
+            self._audit(
+                'link_student', event.id, event.series_id if whole_series else None, count=linked,
+                changes={'student_id': [event.student_id, student_id and int(student_id)]}
+            )
+            return {'status': 'success', 'linked': linked, 'id': event.id, 'version': event.version + 1}
+
+    def _check_student(self, student_id):
+        """Ученик должен принадлежать владельцу расписания или тому, кто его редактирует"""
+        if student_id in (None, STUDENT_UNCHANGED):
+            return
+        if not Student.objects.filter(
+            id=student_id, created_by_id__in={self.target_user.id, self.request_user.id}
+        ).exists():
+            raise ValueError('Ученик не найден')
+
+    def _new_student_id(self, parsed_data):
+        student_id = parsed_data['student_id']
+        return None if student_id is STUDENT_UNCHANGED else student_id
+
+    def _apply_student(self, event, parsed_data):
+        if parsed_data['student_id'] is not STUDENT_UNCHANGED:
+            event.student_id = parsed_data['student_id']
+
+    def _audit(self, action, event_id=None, series_id=None, count=None, changes=None):
+        """Запись в журнал изменений (в базу попадет после коммита, фоновым потоком)"""
+        audit.record(action, self.request_user, self.target_user, event_id, series_id, count, changes)
+
+    def _check_version(self, event, expected_version):
+        """Оптимистичная блокировка: клиент должен редактировать актуальную версию"""
+        if expected_version is not None and int(expected_version) != event.version:
+            raise StaleEventError(STALE_EVENT_MESSAGE)
+
+    def _save_versioned(self, event):
+        """
+        Compare-and-swap: сохраняет событие, только если его версия не изменилась
+        с момента чтения, и увеличивает версию.
+        """
+        updated = ScheduleEvent.objects.filter(id=event.id, version=event.version).update(
+            date=event.date,
+            time=event.time,
+            text=event.text,
+            color=event.color,
+            is_recurring=event.is_recurring,
+            duration=event.duration,
+            series_id=event.series_id,
+            student_id=event.student_id,
+            version=F('version') + 1,
+            updated_at=timezone.now()
+        )
+        if not updated:
+            raise StaleEventError(STALE_EVENT_MESSAGE)
+        event.version += 1
+
     def _check_permissions(self, event):
         """Проверка прав доступа"""
         if not self.request_user.is_superuser and event.created_by != self.request_user:
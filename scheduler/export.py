@@ -0,0 +1,132 @@
+"""
+Потоковая выгрузка событий (расчет зарплаты и отчеты).
+
+События читаются .iterator(chunk_size) в порядке (пользователь, дата,
+время) и сразу превращаются в строки CSV или NDJSON: память не зависит
+от длины периода и числа пользователей. Итог пользователя (totals)
+выводится строкой record=total сразу после его событий — благодаря
+порядку выборки итоги не копятся.
+"""
+import csv
+import json
+
+from .models import ScheduleEvent
+from .workload import duration_minutes
+
+EXPORT_CONTENT_TYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson; charset=utf-8',
+}
+EXPORT_CHUNK_SIZE = 2000
+# Строк в одном куске ответа: меньше системных вызовов, чем по строке
+EXPORT_LINES_PER_WRITE = 500
+
+# Начало текста, с которого табличные редакторы считают ячейку формулой
+CSV_FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+# В строке итога duration — сумма часов пользователя (по минутам, как в сводке
+# нагрузки), event_count — число событий
+EXPORT_COLUMNS = [
+    'record', 'user_id', 'username', 'date', 'time', 'duration', 'text', 'color',
+    'is_recurring', 'series_id', 'student_id', 'event_count',
+]
+
+
+def export_queryset(date_from, date_to, user_ids=None):
+    """События периода (всех пользователей или user_ids) в порядке выгрузки"""
+    events = ScheduleEvent.objects.filter(date__range=(date_from, date_to))
+    if user_ids is not None:
+        events = events.filter(user_id__in=user_ids)
+    return events.order_by('user_id', 'date', 'time', 'id').values_list(
+        'user_id', 'user__username', 'date', 'time', 'duration', 'text', 'color',
+        'is_recurring', 'series_id', 'student_id'
+    )
+
+
+def export_records(events, totals=False, chunk_size=EXPORT_CHUNK_SIZE):
+    """Словари строк выгрузки: события и (totals) итог после событий каждого пользователя"""
+    total = None
+    for (user_id, username, date, time, duration, text, color,
+         is_recurring, series_id, student_id) in events.iterator(chunk_size=chunk_size):
+        if totals and total is not None and total['user_id'] != user_id:
+            yield _total_record(total)
+            total = None
+        if totals and total is None:
+            total = {'user_id': user_id, 'username': username, 'event_count': 0, 'minutes': 0}
+
+        duration = float(duration)
+        if totals:
+            total['event_count'] += 1
+            total['minutes'] += duration_minutes(duration)
+
+        yield {
+            'record': 'event',
+            'user_id': user_id,
+            'username': username,
+            'date': date.isoformat(),
+            'time': time.strftime('%H:%M'),
+            'duration': duration,
+            'text': text,
+            'color': color,
+            'is_recurring': is_recurring,
+            'series_id': str(series_id) if series_id else None,
+            'student_id': student_id,
+        }
+
+    if total is not None:
+        yield _total_record(total)
+
+
+def _total_record(total):
+    return {
+        'record': 'total',
+        'user_id': total['user_id'],
+        'username': total['username'],
+        'duration': round(total['minutes'] / 60, 2),
+        'event_count': total['event_count'],
+    }
+
+
+class _Echo:
+    """Буфер для csv.writer: строка сразу возвращается, а не копится"""
+
+    def write(self, value):
+        return value
+
+
+def _csv_cell(value):
+    """Строка, которую Excel/LibreOffice выполнили бы как формулу, экранируется апострофом"""
+    if isinstance(value, str) and value.startswith(CSV_FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def render_csv(records):
+    writer = csv.DictWriter(_Echo(), fieldnames=EXPORT_COLUMNS)
+    lines = [writer.writeheader()]
+    for record in records:
+        lines.append(writer.writerow({column: _csv_cell(value) for column, value in record.items()}))
+        if len(lines) >= EXPORT_LINES_PER_WRITE:
+            yield ''.join(lines)
+            lines = []
+    if lines:
+        yield ''.join(lines)
+
+
+def render_ndjson(records):
+    lines = []
+    for record in records:
+        lines.append(json.dumps(record, ensure_ascii=False) + '\n')
+        if len(lines) >= EXPORT_LINES_PER_WRITE:
+            yield ''.join(lines)
+            lines = []
+    if lines:
+        yield ''.join(lines)
+
+
+RENDERERS = {'csv': render_csv, 'ndjson': render_ndjson}
+
+
+def render_export(events, export_format, totals=False, chunk_size=EXPORT_CHUNK_SIZE):
+    """Куски текста выгрузки в формате csv или ndjson"""
+    return RENDERERS[export_format](export_records(events, totals, chunk_size))
@@ -0,0 +1,112 @@
+"""
+Ключи идемпотентности для записывающих эндпоинтов.
+
+Клиент передает заголовок Idempotency-Key (например, UUID на каждое
+действие пользователя) и повторяет запрос с тем же ключом после сетевой
+ошибки. Первый запрос с ключом выполняется и сохраняет ответ, повторы
+получают сохраненный ответ без повторного выполнения. Ключи старше
+IDEMPOTENCY_KEY_TTL_HOURS удаляет команда purge_idempotency_keys.
+
+Ключ без ответа старше IDEMPOTENCY_LEASE_SECONDS считается брошенным
+(процесс убит посреди запроса): повтор с ним забирает ключ и выполняет
+запрос, а не получает 409 до очистки ключей.
+"""
+import hashlib
+import json
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.http import JsonResponse
+from django.utils import timezone
+
+from .models import IdempotencyKey
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+REPLAYED_HEADER = 'Idempotent-Replayed'
+MAX_KEY_LENGTH = 64
+
+
+def request_hash(request):
+    return hashlib.sha256(request.path.encode() + b'\n' + request.body).hexdigest()
+
+
+def idempotent(view):
+    """
+    Декоратор вьюхи (после login_required). Запрос выполняется один раз на
+    (пользователь, ключ). Ответы 5xx и исключения не сохраняются — такой
+    запрос можно повторить с тем же ключом.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        key = request.headers.get(IDEMPOTENCY_HEADER)
+        if not key:
+            return view(request, *args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            return JsonResponse(
+                {'status': 'error', 'message': f'Ключ идемпотентности длиннее {MAX_KEY_LENGTH} символов'},
+                status=400
+            )
+
+        digest = request_hash(request)
+        try:
+            with transaction.atomic():
+                record = IdempotencyKey.objects.create(user=request.user, key=key, request_hash=digest)
+        except IntegrityError:
+            record = reclaim_abandoned(request.user, key, digest)
+            if record is None:
+                return replay(request, key, digest)
+
+        try:
+            response = view(request, *args, **kwargs)
+        except Exception:
+            record.delete()
+            raise
+
+        if response.status_code >= 500:
+            record.delete()
+        else:
+            IdempotencyKey.objects.filter(id=record.id).update(
+                status_code=response.status_code,
+                response=json.loads(response.content)
+            )
+        return response
+
+    return wrapper
+
+
+def reclaim_abandoned(user, key, digest):
+    """
+    Забрать ключ, запрос которого не завершился за IDEMPOTENCY_LEASE_SECONDS.
+    Условный UPDATE: из нескольких одновременных повторов ключ получит один.
+    """
+    now = timezone.now()
+    claimed = IdempotencyKey.objects.filter(
+        user=user, key=key, request_hash=digest, status_code__isnull=True,
+        created_at__lt=now - timedelta(seconds=settings.IDEMPOTENCY_LEASE_SECONDS)
+    ).update(created_at=now)
+    if not claimed:
+        return None
+    return IdempotencyKey.objects.get(user=user, key=key)
+
+
+def replay(request, key, digest):
+    record = IdempotencyKey.objects.filter(user=request.user, key=key).first()
+    if record is None or record.status_code is None:
+        # Первый запрос еще выполняется (или только что завершился ошибкой)
+        response = JsonResponse(
+            {'status': 'error', 'message': 'Запрос с этим ключом еще выполняется, повторите позже'},
+            status=409
+        )
+        response['Retry-After'] = '1'
+        return response
+    if record.request_hash != digest:
+        return JsonResponse(
+            {'status': 'error', 'message': 'Ключ идемпотентности уже использован для другого запроса'},
+            status=422
+        )
+
+    response = JsonResponse(record.response, status=record.status_code, safe=False)
+    response[REPLAYED_HEADER] = 'true'
+    return response
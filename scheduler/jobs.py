@@ -0,0 +1,108 @@
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+
+from .locks import user_schedule_lock
+from .models import BackgroundJob
+
+# Обработчики задач по kind, регистрируются декоратором job_handler
+JOB_HANDLERS = {}
+
+# Задержка перед повторной попыткой: RETRY_BASE_SECONDS * 2^(попытка - 1)
+RETRY_BASE_SECONDS = 5
+
+
+def job_handler(kind):
+    def register(func):
+        JOB_HANDLERS[kind] = func
+        return func
+    return register
+
+
+def background_jobs_enabled():
+    return getattr(settings, 'SERIES_BACKGROUND_JOBS', False)
+
+
+def enqueue(kind, user, payload, created_by=None, key=None):
+    """
+    Ставит задачу в очередь. Вызывается внутри транзакции запроса: задача
+    видна воркеру только вместе с остальными изменениями запроса.
+    """
+    if key:
+        job, _ = BackgroundJob.objects.get_or_create(
+            key=key,
+            defaults={'kind': kind, 'user': user, 'payload': payload, 'created_by': created_by}
+        )
+        return job
+    return BackgroundJob.objects.create(kind=kind, user=user, payload=payload, created_by=created_by)
+
+
+def claim_job(batch=10):
+    """
+    Забирает одну готовую к выполнению задачу. Захват — условный UPDATE
+    по статусу, поэтому несколько воркеров не получат одну задачу.
+    """
+    now = timezone.now()
+    candidates = BackgroundJob.objects.filter(
+        status=BackgroundJob.STATUS_PENDING,
+        run_after__lte=now
+    ).order_by('run_after', 'id').values_list('id', flat=True)[:batch]
+
+    for job_id in candidates:
+        claimed = BackgroundJob.objects.filter(id=job_id, status=BackgroundJob.STATUS_PENDING).update(
+            status=BackgroundJob.STATUS_RUNNING,
+            attempts=F('attempts') + 1,
+            started_at=now
+        )
+        if claimed:
+            return BackgroundJob.objects.select_related('user', 'created_by').get(id=job_id)
+    return None
+
+
+def requeue_stale_jobs(timeout):
+    """Возвращает в очередь задачи, зависшие в running (воркер упал). Обработчики идемпотентны"""
+    return BackgroundJob.objects.filter(
+        status=BackgroundJob.STATUS_RUNNING,
+        started_at__lt=timezone.now() - timedelta(seconds=timeout)
+    ).update(status=BackgroundJob.STATUS_PENDING)
+
+
+def run_job(job):
+    """Выполняет задачу под блокировкой расписания ее пользователя, при ошибке — повтор с паузой"""
+    try:
+        handler = JOB_HANDLERS[job.kind]
+        with user_schedule_lock(job.user_id):
+            result = handler(job)
+    except Exception:
+        job.last_error = traceback.format_exc(limit=5)
+        if job.attempts < job.max_attempts:
+            job.status = BackgroundJob.STATUS_PENDING
+            job.run_after = timezone.now() + timedelta(seconds=RETRY_BASE_SECONDS * 2 ** (job.attempts - 1))
+        else:
+            job.status = BackgroundJob.STATUS_FAILED
+            job.finished_at = timezone.now()
+        job.save(update_fields=['status', 'run_after', 'finished_at', 'last_error'])
+        return False
+
+    job.status = BackgroundJob.STATUS_DONE
+    job.result = result or {}
+    job.last_error = ''
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'result', 'last_error', 'finished_at'])
+    return True
+
+
+def serialize_job(job):
+    return {
+        'id': job.id,
+        'kind': job.kind,
+        'state': job.status,
+        'attempts': job.attempts,
+        'result': job.result,
+        'error': job.last_error if job.status == BackgroundJob.STATUS_FAILED else '',
+        'created_at': job.created_at.isoformat(),
+        'finished_at': job.finished_at.isoformat() if job.finished_at else None,
+    }
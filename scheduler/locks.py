@@ -0,0 +1,59 @@
+import threading
+from contextlib import ExitStack, contextmanager
+
+from django.db import connection, transaction
+
+from core.db_router import read_from_primary
+
+# Пространство ключей advisory-блокировок расписания (первый аргумент pg_advisory_xact_lock)
+SCHEDULE_LOCK_NAMESPACE = 4201
+
+# Блокировки внутри процесса (не PostgreSQL): фиксированный набор, расписание
+# пользователя защищает блокировка user_id % LOCAL_LOCK_STRIPES. Пользователи
+# с общей блокировкой ждут друг друга, зато память не растет с числом пользователей.
+# Поэтому блокировки расписаний не вкладываются одна в другую — даже для разных
+# пользователей; расписания нескольких пользователей берутся только через users_schedule_lock
+LOCAL_LOCK_STRIPES = 64
+_local_locks = [threading.Lock() for _ in range(LOCAL_LOCK_STRIPES)]
+
+
+@contextmanager
+def user_schedule_lock(user_id):
+    """
+    Транзакция с блокировкой расписания одного пользователя.
+
+    На PostgreSQL — pg_advisory_xact_lock(namespace, user_id): блокировка
+    снимается вместе с транзакцией и не мешает записи в расписания других
+    пользователей. На остальных СУБД (SQLite в разработке и тестах) —
+    блокировка внутри процесса, удерживаемая до фиксации транзакции.
+
+    Все чтения внутри идут в основную БД (connection — алиас default):
+    проверки перед записью не должны видеть отстающую реплику.
+    """
+    with users_schedule_lock([user_id]):
+        yield
+
+
+@contextmanager
+def users_schedule_lock(user_ids):
+    """
+    Одна транзакция с блокировками расписаний нескольких пользователей
+    (перенос события между пользователями, массовое удаление в админке).
+
+    Блокировки берутся по возрастанию ключа, поэтому два таких вызова
+    не ждут друг друга по кругу. Локальные блокировки берутся по разу
+    на полосу: у разных пользователей она может быть общей.
+    """
+    user_ids = sorted(set(user_ids))
+    if connection.vendor == 'postgresql':
+        with read_from_primary(), transaction.atomic():
+            with connection.cursor() as cursor:
+                for user_id in user_ids:
+                    cursor.execute('SELECT pg_advisory_xact_lock(%s, %s)', [SCHEDULE_LOCK_NAMESPACE, user_id])
+            yield
+    else:
+        with ExitStack() as stack:
+            for stripe in sorted({user_id % LOCAL_LOCK_STRIPES for user_id in user_ids}):
+                stack.enter_context(_local_locks[stripe])
+            with read_from_primary(), transaction.atomic():
+                yield
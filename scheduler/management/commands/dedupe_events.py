@@ -0,0 +1,69 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Exists, F, Max, Min, OuterRef, Subquery
+
+from scheduler.models import ScheduleEvent
+from scheduler.occupancy import OccupancyDelta
+from scheduler.workload import WorkloadDelta
+
+
+class Command(BaseCommand):
+    help = (
+        'Сливает события, занимающие один слот (пользователь, дата, время): '
+        'остается самое раннее, привязка к ученику переносится на него из дубликатов'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000,
+                            help='Диапазон ID событий, обрабатываемый одной транзакцией')
+        parser.add_argument('--dry-run', action='store_true', help='Только посчитать дубликаты')
+
+    def handle(self, *args, **options):
+        same_slot = ScheduleEvent.objects.filter(
+            user_id=OuterRef('user_id'), date=OuterRef('date'), time=OuterRef('time')
+        )
+        # Дубликат — событие, у которого в том же слоте есть более раннее
+        duplicates = ScheduleEvent.objects.filter(Exists(same_slot.filter(id__lt=OuterRef('id'))))
+
+        if options['dry_run']:
+            self.stdout.write(f'Дубликатов: {duplicates.count()}')
+            return
+
+        bounds = ScheduleEvent.objects.aggregate(first=Min('id'), last=Max('id'))
+        if bounds['first'] is None:
+            self.stdout.write(self.style.SUCCESS('Удалено дубликатов: 0'))
+            return
+
+        removed = 0
+        for batch_start in range(bounds['first'], bounds['last'] + 1, options['batch_size']):
+            batch = duplicates.filter(id__gte=batch_start, id__lt=batch_start + options['batch_size'])
+            removed += self.merge_batch(batch, same_slot)
+
+        self.stdout.write(self.style.SUCCESS(f'Удалено дубликатов: {removed}'))
+
+    def merge_batch(self, batch, same_slot):
+        with transaction.atomic():
+            rows = list(batch.values_list('id', 'user_id', 'date', 'duration'))
+            if not rows:
+                return 0
+            ids = [event_id for event_id, _, _, _ in rows]
+
+            # Ученик из дубликата достается оставшемуся событию, если у того его нет
+            linked_duplicate = same_slot.filter(id__in=ids, student__isnull=False).order_by('id')
+            ScheduleEvent.objects.filter(student__isnull=True).exclude(
+                Exists(same_slot.filter(id__lt=OuterRef('id')))
+            ).filter(Exists(linked_duplicate)).update(
+                student_id=Subquery(linked_duplicate.values('student_id')[:1]),
+                version=F('version') + 1
+            )
+
+            ScheduleEvent.objects.filter(id__in=ids).delete()
+
+            workload = WorkloadDelta()
+            occupancy = OccupancyDelta()
+            for _, user_id, date, duration in rows:
+                workload.remove(user_id, date, duration)
+                occupancy.touch(user_id, date)
+            workload.apply()
+            occupancy.apply()
+            return len(rows)
@@ -0,0 +1,48 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from scheduler.export import EXPORT_CHUNK_SIZE, EXPORT_CONTENT_TYPES, export_queryset, render_export
+
+
+def parse_date(value):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise CommandError(f'Неверная дата {value!r} (YYYY-MM-DD)')
+
+
+class Command(BaseCommand):
+    help = 'Выгружает события за период в CSV или NDJSON (для расчета зарплаты), порциями'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date-from', required=True, help='Начало периода (YYYY-MM-DD)')
+        parser.add_argument('--date-to', required=True, help='Конец периода включительно (YYYY-MM-DD)')
+        parser.add_argument('--format', choices=sorted(EXPORT_CONTENT_TYPES), default='csv')
+        parser.add_argument('--user', type=int, action='append', help='ID пользователя (по умолчанию — все)')
+        parser.add_argument('--totals', action='store_true', help='Итог по каждому пользователю')
+        parser.add_argument('--output', help='Файл (по умолчанию — stdout)')
+        parser.add_argument('--chunk-size', type=int, default=EXPORT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        date_from = parse_date(options['date_from'])
+        date_to = parse_date(options['date_to'])
+        if date_to < date_from:
+            raise CommandError('--date-to раньше --date-from')
+
+        chunks = render_export(
+            export_queryset(date_from, date_to, options['user']),
+            options['format'],
+            totals=options['totals'],
+            chunk_size=options['chunk_size']
+        )
+
+        if not options['output']:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending='')
+            return
+
+        with open(options['output'], 'w', encoding='utf-8', newline='') as output:
+            for chunk in chunks:
+                output.write(chunk)
+        self.stderr.write(self.style.SUCCESS(f'Выгрузка записана в {options["output"]}'))
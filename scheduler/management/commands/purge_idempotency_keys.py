@@ -0,0 +1,31 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from scheduler.models import IdempotencyKey
+
+
+class Command(BaseCommand):
+    help = 'Удаляет ключи идемпотентности старше IDEMPOTENCY_KEY_TTL_HOURS (запускать по cron)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=int, default=None,
+                            help='Срок хранения в часах (по умолчанию — из настроек)')
+        parser.add_argument('--chunk-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        hours = options['hours'] or settings.IDEMPOTENCY_KEY_TTL_HOURS
+        cutoff = timezone.now() - timedelta(hours=hours)
+        expired = IdempotencyKey.objects.filter(created_at__lt=cutoff)
+
+        # Пачками по первичному ключу — без долгой блокировки таблицы
+        deleted = 0
+        while True:
+            ids = list(expired.values_list('id', flat=True)[:options['chunk_size']])
+            if not ids:
+                break
+            deleted += IdempotencyKey.objects.filter(id__in=ids).delete()[0]
+
+        self.stdout.write(self.style.SUCCESS(f'Удалено ключей: {deleted}'))
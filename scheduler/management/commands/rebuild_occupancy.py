@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from scheduler.models import DayOccupancy, ScheduleEvent
+from scheduler.occupancy import build_bitmaps, to_bytes
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает битовые маски занятости по дням из событий расписания'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, help='ID пользователя (по умолчанию — все)')
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        events = ScheduleEvent.objects.all()
+        occupancy = DayOccupancy.objects.all()
+        if options['user']:
+            events = events.filter(user_id=options['user'])
+            occupancy = occupancy.filter(user_id=options['user'])
+
+        bitmaps = build_bitmaps(
+            events.values_list('user_id', 'date', 'time', 'duration').iterator(
+                chunk_size=options['chunk_size']
+            )
+        )
+
+        with transaction.atomic():
+            occupancy.delete()
+            DayOccupancy.objects.bulk_create(
+                [
+                    DayOccupancy(user_id=user_id, date=date, busy=to_bytes(busy), starts=to_bytes(starts))
+                    for (user_id, date), (busy, starts) in bitmaps.items()
+                ],
+                batch_size=options['chunk_size']
+            )
+
+        self.stdout.write(self.style.SUCCESS(f'Пересчитано дней: {len(bitmaps)}'))
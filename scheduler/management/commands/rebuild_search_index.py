@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from scheduler.search import create_search_index
+
+
+class Command(BaseCommand):
+    help = 'Пересоздает полнотекстовый индекс по тексту событий (на SQLite — FTS5-таблицу и триггеры)'
+
+    def handle(self, *args, **options):
+        with connection.schema_editor() as schema_editor:
+            create_search_index(schema_editor)
+
+        self.stdout.write(self.style.SUCCESS(f'Поисковый индекс пересоздан ({connection.vendor})'))
@@ -0,0 +1,43 @@
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from scheduler.models import ScheduleEvent, WeeklyWorkload
+from scheduler.workload import duration_minutes, week_start
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает сводную таблицу нагрузки по неделям из событий расписания'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, help='ID пользователя (по умолчанию — все)')
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        events = ScheduleEvent.objects.all()
+        workloads = WeeklyWorkload.objects.all()
+        if options['user']:
+            events = events.filter(user_id=options['user'])
+            workloads = workloads.filter(user_id=options['user'])
+
+        # Считаем так же, как инкрементальный путь (минуты по каждому событию)
+        totals = defaultdict(lambda: [0, 0])
+        for user_id, date, duration in events.values_list('user_id', 'date', 'duration').iterator(
+            chunk_size=options['chunk_size']
+        ):
+            total = totals[(user_id, week_start(date))]
+            total[0] += 1
+            total[1] += duration_minutes(duration)
+
+        with transaction.atomic():
+            workloads.delete()
+            WeeklyWorkload.objects.bulk_create(
+                [
+                    WeeklyWorkload(user_id=user_id, week_start=week, event_count=count, minutes=minutes)
+                    for (user_id, week), (count, minutes) in totals.items()
+                ],
+                batch_size=options['chunk_size']
+            )
+
+        self.stdout.write(self.style.SUCCESS(f'Пересчитано недель: {len(totals)}'))
@@ -0,0 +1,73 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection
+
+from core.slow_queries import query_context
+from scheduler.jobs import claim_job, requeue_stale_jobs, run_job
+
+
+class Command(BaseCommand):
+    help = 'Выполняет фоновые задачи из очереди (пул потоков, повторы с паузой)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=4)
+        parser.add_argument('--poll-interval', type=float, default=1.0, help='Пауза при пустой очереди, сек')
+        parser.add_argument('--stale-timeout', type=int, default=600,
+                            help='Через сколько секунд задача в running считается зависшей')
+        parser.add_argument('--stale-check-interval', type=float, default=60.0,
+                            help='Как часто искать зависшие задачи, пока воркер работает, сек')
+        parser.add_argument('--once', action='store_true', help='Выполнить готовые задачи и выйти')
+
+    def handle(self, *args, **options):
+        threads = options['threads']
+        next_stale_check = 0
+
+        done = failed = 0
+        running = set()
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            try:
+                while True:
+                    # Не только при старте: задачи упавших соседних воркеров зависают и позже
+                    if time.monotonic() >= next_stale_check:
+                        self.requeue_stale(options['stale_timeout'])
+                        next_stale_check = time.monotonic() + options['stale_check_interval']
+
+                    for future in [future for future in running if future.done()]:
+                        running.discard(future)
+                        if future.result():
+                            done += 1
+                        else:
+                            failed += 1
+
+                    while len(running) < threads:
+                        job = claim_job()
+                        if job is None:
+                            break
+                        running.add(pool.submit(self.process, job))
+
+                    if not running:
+                        if options['once']:
+                            break
+                        time.sleep(options['poll_interval'])
+                    else:
+                        time.sleep(0.05)
+            except KeyboardInterrupt:
+                self.stdout.write('Остановка: ждем выполняющиеся задачи')
+
+        self.stdout.write(self.style.SUCCESS(f'Выполнено задач: {done}, с ошибкой: {failed}'))
+
+    def requeue_stale(self, timeout):
+        requeued = requeue_stale_jobs(timeout)
+        if requeued:
+            self.stdout.write(f'Возвращено в очередь зависших задач: {requeued}')
+
+    def process(self, job):
+        close_old_connections()
+        try:
+            with query_context(f'job:{job.kind}'):
+                return run_job(job)
+        finally:
+            # Соединение принадлежит потоку пула — закрываем сами
+            connection.close()
@@ -0,0 +1,77 @@
+import json
+from collections import Counter, defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+
+class Command(BaseCommand):
+    help = 'Топ запросов из журнала медленных запросов (core.slow_queries) по суммарному времени'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--log', default=getattr(settings, 'SLOW_QUERY_LOG_FILE', 'slow_queries.log'))
+        parser.add_argument('--top', type=int, default=20)
+        parser.add_argument('--kind', choices=['slow', 'repeated', 'all'], default='all')
+        parser.add_argument('--since-hours', type=float, help='Только записи за последние N часов')
+        parser.add_argument('--explain', action='store_true', help='Показать последний EXPLAIN ANALYZE запроса')
+
+    def handle(self, *args, **options):
+        since = timezone.now() - timedelta(hours=options['since_hours']) if options['since_hours'] else None
+
+        groups = defaultdict(lambda: {
+            'entries': 0, 'executions': 0, 'total_ms': 0.0, 'max_ms': 0.0,
+            'labels': Counter(), 'sites': Counter(), 'sql': '', 'explain': None
+        })
+        try:
+            log_file = open(options['log'], encoding='utf-8')
+        except OSError as e:
+            raise CommandError(f'Не удалось открыть журнал: {e}')
+
+        with log_file:
+            for line in log_file:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                if options['kind'] != 'all' and entry.get('kind') != options['kind']:
+                    continue
+                if since and parse_datetime(entry['ts']) < since:
+                    continue
+
+                # Медленные и повторяющиеся — отдельно, иначе выполнения посчитаются дважды
+                group = groups[(entry['kind'], entry['fingerprint'])]
+                executions = entry.get('count', 1)
+                group['entries'] += 1
+                group['executions'] += executions
+                group['total_ms'] += entry['duration_ms']
+                # Медленная запись — одно выполнение; в повторяющейся max_ms — самое долгое из count
+                # (в записях без max_ms известно только среднее)
+                group['max_ms'] = max(group['max_ms'], entry.get('max_ms', entry['duration_ms'] / executions))
+                group['labels'][entry.get('label') or '?'] += executions
+                group['sites'][entry.get('call_site') or '?'] += executions
+                group['sql'] = entry['sql']
+                if entry.get('explain'):
+                    group['explain'] = entry['explain']
+
+        top = sorted(groups.items(), key=lambda item: item[1]['total_ms'], reverse=True)[:options['top']]
+        if not top:
+            self.stdout.write('Журнал пуст')
+            return
+
+        for rank, ((kind, key), group) in enumerate(top, 1):
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f"{rank}. [{key}] {kind}: "
+                f"{group['total_ms']:.0f} ms всего, {group['executions']} выполнений "
+                f"в {group['entries']} записях, макс. {group['max_ms']:.1f} ms"
+            ))
+            for label, count in group['labels'].most_common(3):
+                self.stdout.write(f'   view/job: {label} ({count})')
+            for site, count in group['sites'].most_common(3):
+                self.stdout.write(f'   call site: {site} ({count})')
+            self.stdout.write(f"   {group['sql'][:500]}")
+            if options['explain'] and group['explain']:
+                self.stdout.write('   ' + group['explain'].replace('\n', '\n   '))
+            self.stdout.write('')
@@ -0,0 +1,32 @@
+# Generated by Django 4.2.16 on 2026-10-19 18:44
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('scheduler', '0009_alter_scheduleevent_series_id'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Student',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('first_name', models.CharField(max_length=100, verbose_name='Имя')),
+                ('last_name', models.CharField(max_length=100, verbose_name='Фамилия')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('created_by', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL, verbose_name='Создатель')),
+            ],
+            options={
+                'verbose_name': 'Ученик',
+                'verbose_name_plural': 'Ученики',
+                'ordering': ['last_name', 'first_name'],
+            },
+        ),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 4.2.16 on 2026-10-19 18:45
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from collections import defaultdict
+from datetime import timedelta
+
+
+def fill_weekly_workload(apps, schema_editor):
+    ScheduleEvent = apps.get_model('scheduler', 'ScheduleEvent')
+    WeeklyWorkload = apps.get_model('scheduler', 'WeeklyWorkload')
+
+    totals = defaultdict(lambda: [0, 0])
+    for user_id, date, duration in ScheduleEvent.objects.values_list('user_id', 'date', 'duration').iterator():
+        total = totals[(user_id, date - timedelta(days=date.weekday()))]
+        total[0] += 1
+        total[1] += int(round(float(duration) * 60))
+
+    WeeklyWorkload.objects.bulk_create(
+        [
+            WeeklyWorkload(user_id=user_id, week_start=week, event_count=count, minutes=minutes)
+            for (user_id, week), (count, minutes) in totals.items()
+        ],
+        batch_size=2000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('scheduler', '0010_student'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WeeklyWorkload',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('week_start', models.DateField(help_text='Понедельник ISO-недели')),
+                ('event_count', models.IntegerField(default=0)),
+                ('minutes', models.IntegerField(default=0, help_text='Суммарная продолжительность в минутах')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='weekly_workloads', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Нагрузка за неделю',
+                'verbose_name_plural': 'Нагрузка по неделям',
+                'indexes': [models.Index(fields=['week_start', 'user'], name='workload_week_user_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='weeklyworkload',
+            constraint=models.UniqueConstraint(fields=('user', 'week_start'), name='unique_weekly_workload'),
+        ),
+        migrations.RunPython(fill_weekly_workload, migrations.RunPython.noop),
+    ]
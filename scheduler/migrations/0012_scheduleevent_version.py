@@ -0,0 +1,18 @@
+# Generated by Django 4.2.16 on 2026-10-19 18:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scheduler', '0011_weeklyworkload'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='scheduleevent',
+            name='version',
+            field=models.PositiveIntegerField(default=1, help_text='Версия для оптимистичной блокировки'),
+        ),
+    ]
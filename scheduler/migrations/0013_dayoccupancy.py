@@ -0,0 +1,79 @@
+# Generated by Django 4.2.16 on 2026-10-19 18:59
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import math
+from collections import defaultdict
+
+# Копия scheduler.occupancy на момент миграции: изменения модуля
+# не должны менять то, что делает уже примененная миграция
+SLOT_MINUTES = 15
+SLOTS_PER_DAY = 24 * 60 // SLOT_MINUTES
+BITMAP_BYTES = SLOTS_PER_DAY // 8
+
+
+def slot_mask(time_obj, duration):
+    start = time_obj.hour * 60 + time_obj.minute
+    end = start + float(duration) * 60
+    first = start // SLOT_MINUTES
+    last = min(max(math.ceil(end / SLOT_MINUTES), first + 1), SLOTS_PER_DAY)
+    return ((1 << (last - first)) - 1) << first
+
+
+def start_bit(time_obj):
+    return 1 << ((time_obj.hour * 60 + time_obj.minute) // SLOT_MINUTES)
+
+
+def to_bytes(bitmap):
+    return bitmap.to_bytes(BITMAP_BYTES, 'little')
+
+
+def fill_day_occupancy(apps, schema_editor):
+    ScheduleEvent = apps.get_model('scheduler', 'ScheduleEvent')
+    DayOccupancy = apps.get_model('scheduler', 'DayOccupancy')
+
+    bitmaps = defaultdict(lambda: [0, 0])
+    for user_id, date, time, duration in ScheduleEvent.objects.values_list(
+        'user_id', 'date', 'time', 'duration'
+    ).iterator():
+        bitmap = bitmaps[(user_id, date)]
+        bitmap[0] |= slot_mask(time, duration)
+        bitmap[1] |= start_bit(time)
+    DayOccupancy.objects.bulk_create(
+        [
+            DayOccupancy(user_id=user_id, date=date, busy=to_bytes(busy), starts=to_bytes(starts))
+            for (user_id, date), (busy, starts) in bitmaps.items()
+        ],
+        batch_size=2000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('scheduler', '0012_scheduleevent_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DayOccupancy',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('busy', models.BinaryField(help_text='Битовая маска 96 слотов, занятых событиями', max_length=12)),
+                ('starts', models.BinaryField(help_text='Битовая маска слотов, в которых начинаются события', max_length=12)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='day_occupancy', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Занятость дня',
+                'verbose_name_plural': 'Занятость по дням',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='dayoccupancy',
+            constraint=models.UniqueConstraint(fields=('user', 'date'), name='unique_day_occupancy'),
+        ),
+        migrations.RunPython(fill_day_occupancy, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.16 on 2026-10-19 19:11
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scheduler', '0014_backgroundjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='scheduleevent',
+            name='student',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='events', to='scheduler.student', verbose_name='Ученик'),
+        ),
+        migrations.AddIndex(
+            model_name='scheduleevent',
+            index=models.Index(fields=['student', 'date', 'time', 'id'], name='event_student_history_idx'),
+        ),
+    ]
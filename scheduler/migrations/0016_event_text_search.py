@@ -0,0 +1,66 @@
+from django.db import migrations
+
+# Копия scheduler.search на момент миграции: изменения модуля
+# не должны менять то, что делает уже примененная миграция
+SEARCH_CONFIG = 'russian'
+FTS_TABLE = 'scheduler_event_fts'
+EVENT_TABLE = 'scheduler_scheduleevent'
+INDEX_NAME = 'event_text_search_idx'
+
+SQLITE_TRIGGERS = {
+    'insert': f"""
+        CREATE TRIGGER {FTS_TABLE}_insert AFTER INSERT ON {EVENT_TABLE} BEGIN
+            INSERT INTO {FTS_TABLE}(rowid, text) VALUES (new.id, new.text);
+        END
+    """,
+    'delete': f"""
+        CREATE TRIGGER {FTS_TABLE}_delete AFTER DELETE ON {EVENT_TABLE} BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, text) VALUES ('delete', old.id, old.text);
+        END
+    """,
+    'update': f"""
+        CREATE TRIGGER {FTS_TABLE}_update AFTER UPDATE OF text ON {EVENT_TABLE} BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, text) VALUES ('delete', old.id, old.text);
+            INSERT INTO {FTS_TABLE}(rowid, text) VALUES (new.id, new.text);
+        END
+    """,
+}
+
+
+def create_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute(
+            f"CREATE INDEX IF NOT EXISTS {INDEX_NAME} ON {EVENT_TABLE} "
+            f"USING gin (to_tsvector('{SEARCH_CONFIG}', text))"
+        )
+    elif vendor == 'sqlite':
+        drop_index(apps, schema_editor)
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5("
+            f"text, content='{EVENT_TABLE}', content_rowid='id', tokenize='unicode61 remove_diacritics 2')"
+        )
+        for sql in SQLITE_TRIGGERS.values():
+            schema_editor.execute(sql)
+        schema_editor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+
+
+def drop_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute(f'DROP INDEX IF EXISTS {INDEX_NAME}')
+    elif vendor == 'sqlite':
+        for name in SQLITE_TRIGGERS:
+            schema_editor.execute(f'DROP TRIGGER IF EXISTS {FTS_TABLE}_{name}')
+        schema_editor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scheduler', '0015_scheduleevent_student'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
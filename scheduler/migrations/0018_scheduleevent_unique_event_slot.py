@@ -0,0 +1,70 @@
+from django.db import migrations, models
+from django.db.models import Count
+
+# Поисковый индекс SQLite из миграции 0016 (копия: миграция не зависит от scheduler.search)
+FTS_TABLE = 'scheduler_event_fts'
+EVENT_TABLE = 'scheduler_scheduleevent'
+
+SQLITE_TRIGGERS = {
+    'insert': f"""
+        CREATE TRIGGER {FTS_TABLE}_insert AFTER INSERT ON {EVENT_TABLE} BEGIN
+            INSERT INTO {FTS_TABLE}(rowid, text) VALUES (new.id, new.text);
+        END
+    """,
+    'delete': f"""
+        CREATE TRIGGER {FTS_TABLE}_delete AFTER DELETE ON {EVENT_TABLE} BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, text) VALUES ('delete', old.id, old.text);
+        END
+    """,
+    'update': f"""
+        CREATE TRIGGER {FTS_TABLE}_update AFTER UPDATE OF text ON {EVENT_TABLE} BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, text) VALUES ('delete', old.id, old.text);
+            INSERT INTO {FTS_TABLE}(rowid, text) VALUES (new.id, new.text);
+        END
+    """,
+}
+
+
+def check_no_duplicates(apps, schema_editor):
+    ScheduleEvent = apps.get_model('scheduler', 'ScheduleEvent')
+    duplicates = ScheduleEvent.objects.values('user_id', 'date', 'time').annotate(
+        count=Count('id')
+    ).filter(count__gt=1).order_by().count()
+    if duplicates:
+        raise RuntimeError(
+            f'Найдено слотов с дубликатами: {duplicates}. '
+            f'Выполните "manage.py dedupe_events" и повторите миграцию'
+        )
+
+
+def restore_search_index(apps, schema_editor):
+    # SQLite пересоздает таблицу событий при изменении ограничений — триггеры поиска теряются.
+    # GIN-индекс PostgreSQL при добавлении ограничения не меняется
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for name in SQLITE_TRIGGERS:
+        schema_editor.execute(f'DROP TRIGGER IF EXISTS {FTS_TABLE}_{name}')
+    schema_editor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+    schema_editor.execute(
+        f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5("
+        f"text, content='{EVENT_TABLE}', content_rowid='id', tokenize='unicode61 remove_diacritics 2')"
+    )
+    for sql in SQLITE_TRIGGERS.values():
+        schema_editor.execute(sql)
+    schema_editor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scheduler', '0017_idempotencykey'),
+    ]
+
+    operations = [
+        migrations.RunPython(check_no_duplicates, restore_search_index),
+        migrations.AddConstraint(
+            model_name='scheduleevent',
+            constraint=models.UniqueConstraint(fields=('user', 'date', 'time'), name='unique_event_slot'),
+        ),
+        migrations.RunPython(restore_search_index, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 4.2.16 on 2026-10-19 19:36
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('scheduler', '0018_scheduleevent_unique_event_slot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuditEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('action', models.CharField(choices=[('create', 'Создание'), ('create_series', 'Создание серии'), ('update', 'Изменение'), ('update_series', 'Изменение серии'), ('delete', 'Удаление'), ('delete_series', 'Удаление серии'), ('shift_series', 'Сдвиг серии'), ('copy_week', 'Копирование недели'), ('link_student', 'Привязка ученика')], max_length=20)),
+                ('event_id', models.BigIntegerField(blank=True, null=True)),
+                ('series_id', models.UUIDField(blank=True, null=True)),
+                ('count', models.PositiveIntegerField(blank=True, help_text='Затронуто событий (если известно)', null=True)),
+                ('changes', models.JSONField(blank=True, default=dict, help_text='{поле: [до, после]} или параметры операции')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now, help_text='Время изменения, а не записи в журнал')),
+                ('actor', models.ForeignKey(db_constraint=False, help_text='Кто изменил', null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('user', models.ForeignKey(db_constraint=False, help_text='Чье расписание изменено', on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Запись журнала',
+                'verbose_name_plural': 'Журнал изменений',
+                'indexes': [models.Index(fields=['user', '-created_at', '-id'], name='audit_user_created_idx'), models.Index(fields=['-created_at', '-id'], name='audit_created_idx'), models.Index(fields=['series_id'], name='audit_series_idx'), models.Index(fields=['event_id'], name='audit_event_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.16 on 2026-10-19 19:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scheduler', '0019_auditentry'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='auditentry',
+            name='action',
+            field=models.CharField(choices=[('create', 'Создание'), ('create_series', 'Создание серии'), ('update', 'Изменение'), ('update_series', 'Изменение серии'), ('delete', 'Удаление'), ('delete_series', 'Удаление серии'), ('shift_series', 'Сдвиг серии'), ('copy_week', 'Копирование недели'), ('link_student', 'Привязка ученика'), ('bulk_edit', 'Массовое изменение')], max_length=20),
+        ),
+    ]
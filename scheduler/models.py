@@ -1,5 +1,6 @@
 from django.db import models
 from django.contrib.auth.models import User
+from django.utils import timezone
 
 class ScheduleEvent(models.Model):
     user=models.ForeignKey(User,on_delete=models.CASCADE)
@@ -10,16 +11,132 @@ class ScheduleEvent(models.Model):
     is_recurring = models.BooleanField(default=False)
     series_id = models.UUIDField(default=None, null=True, blank=True, editable=False, db_index=True)
     duration = models.FloatField(default=1.0, help_text="Duration in hours")
+    version = models.PositiveIntegerField(default=1, help_text="Версия для оптимистичной блокировки")
     created_by = models.ForeignKey(User,on_delete=models.CASCADE,related_name='created_events',verbose_name='Создатель',
                                    default=1)
+    # Отдельный индекс не нужен: student_id — первый столбец event_student_history_idx
+    student = models.ForeignKey('Student', on_delete=models.SET_NULL, null=True, blank=True, db_index=False,
+                                related_name='events', verbose_name='Ученик')
 
     created_at=models.DateTimeField(auto_now_add=True)
     updated_at=models.DateTimeField(auto_now=True)
 
+    class Meta:
+        constraints = [
+            # Одно событие на слот; старые дубликаты сливает команда dedupe_events
+            models.UniqueConstraint(fields=['user', 'date', 'time'], name='unique_event_slot'),
+        ]
+        indexes = [
+            # История ученика: keyset-пагинация по (date, time, id)
+            models.Index(fields=['student', 'date', 'time', 'id'], name='event_student_history_idx'),
+        ]
+
     def __str__(self):
         return f"{self.user} {self.date} {self.time} ({self.text[:20]})"
 
 
+class WeeklyWorkload(models.Model):
+    """Сводка нагрузки пользователя за ISO-неделю (поддерживается EventManager)"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='weekly_workloads')
+    week_start = models.DateField(help_text="Понедельник ISO-недели")
+    event_count = models.IntegerField(default=0)
+    minutes = models.IntegerField(default=0, help_text="Суммарная продолжительность в минутах")
+
+    class Meta:
+        verbose_name = "Нагрузка за неделю"
+        verbose_name_plural = "Нагрузка по неделям"
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'week_start'], name='unique_weekly_workload'),
+        ]
+        indexes = [
+            models.Index(fields=['week_start', 'user'], name='workload_week_user_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user} {self.week_start}: {self.event_count} ({self.minutes} мин)"
+
+
+class DayOccupancy(models.Model):
+    """Занятость дня пользователя по 15-минутным слотам (поддерживается EventManager)"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='day_occupancy')
+    date = models.DateField()
+    busy = models.BinaryField(max_length=12, help_text="Битовая маска 96 слотов, занятых событиями")
+    starts = models.BinaryField(max_length=12, help_text="Битовая маска слотов, в которых начинаются события")
+
+    class Meta:
+        verbose_name = "Занятость дня"
+        verbose_name_plural = "Занятость по дням"
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'date'], name='unique_day_occupancy'),
+        ]
+
+    def __str__(self):
+        return f"{self.user} {self.date}"
+
+
+class BackgroundJob(models.Model):
+    """Фоновая задача над расписанием пользователя (выполняется командой run_jobs)"""
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'В очереди'),
+        (STATUS_RUNNING, 'Выполняется'),
+        (STATUS_DONE, 'Выполнена'),
+        (STATUS_FAILED, 'Ошибка'),
+    ]
+
+    kind = models.CharField(max_length=50)
+    key = models.CharField(max_length=100, unique=True, null=True, blank=True,
+                           help_text="Ключ идемпотентности: задача с тем же ключом ставится один раз")
+    payload = models.JSONField(default=dict)
+    result = models.JSONField(default=dict, blank=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='background_jobs',
+                             help_text="Чье расписание меняет задача")
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True,
+                                   related_name='created_jobs')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=5)
+    run_after = models.DateTimeField(default=timezone.now)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Фоновая задача"
+        verbose_name_plural = "Фоновые задачи"
+        indexes = [
+            models.Index(fields=['status', 'run_after'], name='job_status_run_after_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} #{self.id} ({self.status})"
+
+
+class IdempotencyKey(models.Model):
+    """Ответ на запрос с заголовком Idempotency-Key — повтор запроса получает его же"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='idempotency_keys')
+    key = models.CharField(max_length=64)
+    request_hash = models.CharField(max_length=64, help_text="SHA-256 пути и тела запроса")
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True,
+                                                   help_text="Пусто, пока запрос выполняется")
+    response = models.JSONField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        verbose_name = "Ключ идемпотентности"
+        verbose_name_plural = "Ключи идемпотентности"
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'key'], name='unique_idempotency_key'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id}:{self.key}"
+
+
 class Student(models.Model):
     first_name = models.CharField(max_length=100, verbose_name="Имя")
     last_name = models.CharField(max_length=100, verbose_name="Фамилия")
@@ -33,4 +150,50 @@ class Student(models.Model):
         ordering = ['last_name', 'first_name']
 
     def __str__(self):
-        return f"{self.last_name} {self.first_name}"
\ No newline at end of file
+        return f"{self.last_name} {self.first_name}"
+
+class AuditEntry(models.Model):
+    """
+    Запись журнала изменений расписания (пишется пакетами, см. scheduler/audit.py).
+
+    Операция над серией — одна запись с series_id и числом затронутых событий.
+    Пользователи и события — без внешних ключей: журнал переживает удаление
+    и пишется уже после коммита запроса.
+    """
+    ACTION_CHOICES = [
+        ('create', 'Создание'),
+        ('create_series', 'Создание серии'),
+        ('update', 'Изменение'),
+        ('update_series', 'Изменение серии'),
+        ('delete', 'Удаление'),
+        ('delete_series', 'Удаление серии'),
+        ('shift_series', 'Сдвиг серии'),
+        ('copy_week', 'Копирование недели'),
+        ('link_student', 'Привязка ученика'),
+        ('bulk_edit', 'Массовое изменение'),
+    ]
+
+    actor = models.ForeignKey(User, on_delete=models.DO_NOTHING, db_constraint=False, null=True,
+                              related_name='+', help_text="Кто изменил")
+    user = models.ForeignKey(User, on_delete=models.DO_NOTHING, db_constraint=False,
+                             related_name='+', help_text="Чье расписание изменено")
+    action = models.CharField(max_length=20, choices=ACTION_CHOICES)
+    event_id = models.BigIntegerField(null=True, blank=True)
+    series_id = models.UUIDField(null=True, blank=True)
+    count = models.PositiveIntegerField(null=True, blank=True, help_text="Затронуто событий (если известно)")
+    changes = models.JSONField(default=dict, blank=True,
+                               help_text="{поле: [до, после]} или параметры операции")
+    created_at = models.DateTimeField(default=timezone.now, help_text="Время изменения, а не записи в журнал")
+
+    class Meta:
+        verbose_name = "Запись журнала"
+        verbose_name_plural = "Журнал изменений"
+        indexes = [
+            models.Index(fields=['user', '-created_at', '-id'], name='audit_user_created_idx'),
+            models.Index(fields=['-created_at', '-id'], name='audit_created_idx'),
+            models.Index(fields=['series_id'], name='audit_series_idx'),
+            models.Index(fields=['event_id'], name='audit_event_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.created_at:%Y-%m-%d %H:%M} {self.action} ({self.user_id})"
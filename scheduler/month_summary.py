@@ -0,0 +1,104 @@
+"""
+Сводка месяца по дням для месячного вида и тепловой карты.
+
+Агрегаты считаются одним GROUP BY (дата, цвет) и кэшируются по
+(пользователь, месяц). Любая запись, затронувшая дни месяца, после коммита
+меняет версию месяца (OccupancyDelta.apply вызывает invalidate_months).
+Версия входит в ключ кэша: сводка, посчитанная параллельно с записью,
+сохранится под старой версией и не будет прочитана.
+"""
+import calendar
+import uuid
+from collections import defaultdict
+from datetime import date
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Max, Min, Sum
+
+from core.db_router import read_from_primary
+
+from .models import ScheduleEvent
+
+MONTH_SUMMARY_CACHE_TIMEOUT = 24 * 60 * 60
+
+# Сколько преобладающих цветов дня отдавать
+DOMINANT_COLORS = 3
+
+
+def month_version_key(user_id, year, month):
+    return f'month_summary_version:{user_id}:{year:04d}-{month:02d}'
+
+
+def month_version(user_id, year, month):
+    key = month_version_key(user_id, year, month)
+    version = cache.get(key)
+    if version is None:
+        # Версия могла быть вытеснена из кэша — начинаем с новой, а не с нуля
+        cache.add(key, uuid.uuid4().hex, None)
+        version = cache.get(key)
+    return version
+
+
+def invalidate_months(user_id, dates):
+    """Меняет версии месяцев, в которые попадают даты, после коммита транзакции"""
+    keys = {month_version_key(user_id, day.year, day.month) for day in dates}
+    if keys:
+        transaction.on_commit(lambda: cache.set_many({key: uuid.uuid4().hex for key in keys}, None))
+
+
+def get_month_summary(user_id, year, month):
+    """{'days': {YYYY-MM-DD: агрегаты}, 'totals': {...}} — из кэша или одним запросом"""
+    key = f'month_summary:{user_id}:{year:04d}-{month:02d}:{month_version(user_id, year, month)}'
+    summary = cache.get(key)
+    if summary is None:
+        # Отстающая реплика закэшировала бы устаревшую сводку на сутки
+        with read_from_primary():
+            summary = build_month_summary(user_id, year, month)
+        cache.set(key, summary, MONTH_SUMMARY_CACHE_TIMEOUT)
+    return summary
+
+
+def build_month_summary(user_id, year, month):
+    first_day = date(year, month, 1)
+    last_day = date(year, month, calendar.monthrange(year, month)[1])
+
+    rows = ScheduleEvent.objects.filter(
+        user_id=user_id, date__range=(first_day, last_day)
+    ).values('date', 'color').annotate(
+        count=Count('id'),
+        hours=Sum('duration'),
+        first_time=Min('time'),
+        last_time=Max('time')
+    ).order_by()
+
+    days = {}
+    colors = defaultdict(list)
+    for row in rows:
+        day = days.setdefault(row['date'], {
+            'count': 0, 'hours': 0.0, 'first_time': row['first_time'], 'last_time': row['last_time']
+        })
+        day['count'] += row['count']
+        day['hours'] += row['hours'] or 0
+        day['first_time'] = min(day['first_time'], row['first_time'])
+        day['last_time'] = max(day['last_time'], row['last_time'])
+        colors[row['date']].append((row['count'], row['color']))
+
+    result = {}
+    for day_date, day in sorted(days.items()):
+        dominant = sorted(colors[day_date], key=lambda item: (-item[0], item[1]))[:DOMINANT_COLORS]
+        result[day_date.strftime('%Y-%m-%d')] = {
+            'count': day['count'],
+            'hours': round(day['hours'], 2),
+            'first_time': day['first_time'].strftime('%H:%M'),
+            'last_time': day['last_time'].strftime('%H:%M'),
+            'colors': [{'color': color, 'count': count} for count, color in dominant]
+        }
+
+    return {
+        'days': result,
+        'totals': {
+            'count': sum(day['count'] for day in result.values()),
+            'hours': round(sum(day['hours'] for day in result.values()), 2)
+        }
+    }
@@ -0,0 +1,109 @@
+import math
+from collections import defaultdict
+
+from .models import DayOccupancy, ScheduleEvent
+from .month_summary import invalidate_months
+
+SLOT_MINUTES = 15
+SLOTS_PER_DAY = 24 * 60 // SLOT_MINUTES  # 96
+BITMAP_BYTES = SLOTS_PER_DAY // 8  # 12
+
+
+def time_minutes(time_obj):
+    return time_obj.hour * 60 + time_obj.minute
+
+
+def slot_mask(time_obj, duration):
+    """
+    Биты 15-минутных слотов, которые задевает интервал [time, time + duration).
+
+    Маска — надмножество интервала (края округляются наружу), поэтому
+    пустое пересечение масок гарантирует отсутствие пересечения событий.
+    Событие нулевой длины занимает слот своего начала.
+    """
+    start = time_minutes(time_obj)
+    end = start + float(duration) * 60
+    first = start // SLOT_MINUTES
+    last = min(max(math.ceil(end / SLOT_MINUTES), first + 1), SLOTS_PER_DAY)
+    return ((1 << (last - first)) - 1) << first
+
+
+def start_bit(time_obj):
+    """Бит слота, в котором начинается событие (для проверки дубликатов)"""
+    return 1 << (time_minutes(time_obj) // SLOT_MINUTES)
+
+
+def to_bytes(bitmap):
+    return bitmap.to_bytes(BITMAP_BYTES, 'little')
+
+
+def from_bytes(value):
+    return int.from_bytes(bytes(value), 'little')
+
+
+def build_bitmaps(rows):
+    """(user_id, date, time, duration) → {(user_id, date): [busy, starts]}"""
+    bitmaps = defaultdict(lambda: [0, 0])
+    for user_id, date, time, duration in rows:
+        bitmap = bitmaps[(user_id, date)]
+        bitmap[0] |= slot_mask(time, duration)
+        bitmap[1] |= start_bit(time)
+    return bitmaps
+
+
+def load_occupancy(user_id, dates):
+    """{date: (busy, starts)} для дат с событиями — один запрос"""
+    return {
+        date: (from_bytes(busy), from_bytes(starts))
+        for date, busy, starts in DayOccupancy.objects.filter(
+            user_id=user_id, date__in=set(dates)
+        ).values_list('date', 'busy', 'starts')
+    }
+
+
+class OccupancyDelta:
+    """
+    Накопитель дней (пользователь, дата), расписание которых изменилось.
+
+    Снять биты удаленного события нельзя — слот может занимать и другое,
+    пересекающееся с ним событие. Поэтому apply() пересчитывает маски
+    затронутых дней по их событиям: один SELECT и один upsert на
+    пользователя, плюс DELETE для опустевших дней.
+
+    Через него проходят все записи расписания, поэтому apply() заодно
+    сбрасывает кэш сводок затронутых месяцев.
+    """
+
+    def __init__(self):
+        self.days = defaultdict(set)
+
+    def touch(self, user_id, date_obj):
+        self.days[user_id].add(date_obj)
+
+    def apply(self):
+        for user_id, dates in self.days.items():
+            self._rebuild_days(user_id, dates)
+            invalidate_months(user_id, dates)
+        self.days.clear()
+
+    def _rebuild_days(self, user_id, dates):
+        bitmaps = build_bitmaps(
+            ScheduleEvent.objects.filter(user_id=user_id, date__in=dates).values_list(
+                'user_id', 'date', 'time', 'duration'
+            )
+        )
+
+        empty_dates = dates - {date for _, date in bitmaps}
+        if empty_dates:
+            DayOccupancy.objects.filter(user_id=user_id, date__in=empty_dates).delete()
+
+        if bitmaps:
+            DayOccupancy.objects.bulk_create(
+                [
+                    DayOccupancy(user_id=user_id, date=date, busy=to_bytes(busy), starts=to_bytes(starts))
+                    for (_, date), (busy, starts) in bitmaps.items()
+                ],
+                update_conflicts=True,
+                unique_fields=['user', 'date'],
+                update_fields=['busy', 'starts']
+            )
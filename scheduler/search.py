@@ -0,0 +1,159 @@
+"""
+Полнотекстовый поиск по тексту событий.
+
+Индекс поддерживается самой базой при любой записи (в том числе bulk_create
+и UPDATE серий):
+
+* PostgreSQL — GIN-индекс по выражению to_tsvector('russian', text);
+* SQLite — внешняя FTS5-таблица scheduler_event_fts и триггеры на
+  scheduler_scheduleevent.
+
+Другие СУБД проект не использует. Каждое слово запроса ищется
+по префиксу («иванов» находит «Ивановым»), результаты ранжируются и
+сворачиваются по series_id: серия — одна строка с числом совпадений.
+"""
+import re
+
+from django.db import NotSupportedError, connections, router
+
+from .models import ScheduleEvent
+
+SEARCH_CONFIG = 'russian'
+FTS_TABLE = 'scheduler_event_fts'
+EVENT_TABLE = 'scheduler_scheduleevent'
+INDEX_NAME = 'event_text_search_idx'
+
+# Слов в запросе учитывается не больше
+MAX_TERMS = 8
+
+SQLITE_TRIGGERS = {
+    'insert': f"""
+        CREATE TRIGGER {FTS_TABLE}_insert AFTER INSERT ON {EVENT_TABLE} BEGIN
+            INSERT INTO {FTS_TABLE}(rowid, text) VALUES (new.id, new.text);
+        END
+    """,
+    'delete': f"""
+        CREATE TRIGGER {FTS_TABLE}_delete AFTER DELETE ON {EVENT_TABLE} BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, text) VALUES ('delete', old.id, old.text);
+        END
+    """,
+    'update': f"""
+        CREATE TRIGGER {FTS_TABLE}_update AFTER UPDATE OF text ON {EVENT_TABLE} BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, text) VALUES ('delete', old.id, old.text);
+            INSERT INTO {FTS_TABLE}(rowid, text) VALUES (new.id, new.text);
+        END
+    """,
+}
+
+
+def create_search_index(schema_editor):
+    """
+    Создает (или пересоздает) поисковый индекс. Идемпотентна.
+
+    На SQLite миграции, пересоздающие таблицу событий, теряют триггеры —
+    после них нужно вызвать rebuild_search_index.
+    """
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute(
+            f"CREATE INDEX IF NOT EXISTS {INDEX_NAME} ON {EVENT_TABLE} "
+            f"USING gin (to_tsvector('{SEARCH_CONFIG}', text))"
+        )
+    elif vendor == 'sqlite':
+        drop_search_index(schema_editor)
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5("
+            f"text, content='{EVENT_TABLE}', content_rowid='id', tokenize='unicode61 remove_diacritics 2')"
+        )
+        for sql in SQLITE_TRIGGERS.values():
+            schema_editor.execute(sql)
+        schema_editor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+
+
+def drop_search_index(schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute(f'DROP INDEX IF EXISTS {INDEX_NAME}')
+    elif vendor == 'sqlite':
+        for name in SQLITE_TRIGGERS:
+            schema_editor.execute(f'DROP TRIGGER IF EXISTS {FTS_TABLE}_{name}')
+        schema_editor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+def search_terms(query):
+    """Слова запроса без операторов и кавычек — их нельзя передавать в MATCH/to_tsquery как есть"""
+    return re.findall(r'\w+', query.lower())[:MAX_TERMS]
+
+
+def _match_clause(vendor, terms):
+    """(источник, условие, ранг, параметры) для конкретной СУБД"""
+    if vendor == 'postgresql':
+        return (
+            f"{EVENT_TABLE} e, to_tsquery('{SEARCH_CONFIG}', %s) query",
+            f"to_tsvector('{SEARCH_CONFIG}', e.text) @@ query",
+            f"ts_rank(to_tsvector('{SEARCH_CONFIG}', e.text), query)",
+            [' & '.join(f'{term}:*' for term in terms)]
+        )
+    if vendor == 'sqlite':
+        # bm25: чем меньше, тем релевантнее
+        return (
+            f'{FTS_TABLE} JOIN {EVENT_TABLE} e ON e.id = {FTS_TABLE}.rowid',
+            f'{FTS_TABLE} MATCH %s',
+            f'-bm25({FTS_TABLE})',
+            [' '.join(f'"{term}"*' for term in terms)]
+        )
+    raise NotSupportedError(f'Полнотекстовый поиск не поддерживается для {vendor}')
+
+
+def search_user_events(user_id, query, limit, offset=0):
+    """
+    Ищет события пользователя по тексту.
+
+    Возвращает (total, rows), где total — число найденных серий и одиночных
+    событий, а rows — страница словарей {id, rank, hits, first_date, last_date}.
+    Представитель серии — самое релевантное, а при равенстве самое раннее событие.
+    """
+    terms = search_terms(query)
+    if not terms:
+        return 0, []
+
+    # Та же база, из которой вьюха потом читает события через in_bulk:
+    # на вьюхах из REPLICA_READ_VIEWS это реплика
+    connection = connections[router.db_for_read(ScheduleEvent)]
+    source, match, rank, params = _match_clause(connection.vendor, terms)
+    group = "COALESCE(CAST(series_id AS TEXT), 'e' || CAST(id AS TEXT))"
+    sql = f"""
+        WITH found AS (
+            SELECT e.id, e.date, e.time, e.series_id, {rank} AS rank
+            FROM {source}
+            WHERE {match} AND e.user_id = %s
+        ), grouped AS (
+            SELECT id, rank,
+                ROW_NUMBER() OVER (PARTITION BY {group} ORDER BY rank DESC, date, time, id) AS series_position,
+                COUNT(*) OVER (PARTITION BY {group}) AS hits,
+                MIN(date) OVER (PARTITION BY {group}) AS first_date,
+                MAX(date) OVER (PARTITION BY {group}) AS last_date
+            FROM found
+        )
+        SELECT id, rank, hits, first_date, last_date, COUNT(*) OVER () AS total
+        FROM grouped
+        WHERE series_position = 1
+        ORDER BY rank DESC, last_date DESC, id DESC
+        LIMIT %s OFFSET %s
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [*params, user_id, limit, offset])
+        rows = cursor.fetchall()
+
+    if not rows:
+        return 0, []
+    return rows[0][5], [
+        {
+            'id': event_id,
+            'rank': float(rank_value),
+            'hits': hits,
+            'first_date': str(first_date),
+            'last_date': str(last_date),
+        }
+        for event_id, rank_value, hits, first_date, last_date, _ in rows
+    ]
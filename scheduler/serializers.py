@@ -0,0 +1,16 @@
+def serialize_event(event):
+    """Событие в формате API (load_events, load_series_events, начальные данные страницы)"""
+    return {
+        'id': event.id,
+        'series_id': str(event.series_id),
+        'date': event.date.strftime('%Y-%m-%d'),
+        'time': event.time.strftime('%H:%M'),
+        'text': event.text,
+        'color': event.color,
+        'is_recurring': event.is_recurring,
+        'duration': float(event.duration),
+        'version': event.version,
+        'created_by': event.created_by_id,
+        'user_id': event.user_id,
+        'student_id': event.student_id
+    }
@@ -0,0 +1,16 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .cache_keys import USERS_DIRECTORY_CACHE_KEY
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_users_directory(sender, **kwargs):
+    """Сбрасываем кэш первой страницы каталога пользователей"""
+    if kwargs.get('update_fields') == frozenset({'last_login'}):
+        # Вход в систему не меняет каталог
+        return
+    cache.delete(USERS_DIRECTORY_CACHE_KEY)
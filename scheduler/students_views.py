@@ -1,8 +1,16 @@
 from django.shortcuts import render
 from django.contrib.auth.decorators import login_required
 from django.http import JsonResponse
+from django.db.models import Count, Max, Min, Q, Sum
+from django.utils import timezone
+from datetime import datetime
 import json
-from .models import Student
+from .models import ScheduleEvent, Student
+from .serializers import serialize_event
+
+# Размер страницы истории занятий ученика
+HISTORY_PAGE_SIZE = 50
+HISTORY_MAX_PAGE_SIZE = 200
 
 @login_required
 def students_page(request):
@@ -50,14 +58,20 @@ def save_student(request):
 def load_students(request):
     """API для загрузки списка учеников"""
     try:
-        students = Student.objects.filter(created_by=request.user)
+        # Количество занятий и часы считаются в том же запросе
+        students = Student.objects.filter(created_by=request.user).annotate(
+            lessons=Count('events'),
+            hours=Sum('events__duration')
+        )
         students_list = [
             {
                 'id': student.id,
                 'first_name': student.first_name,
                 'last_name': student.last_name,
                 'full_name': str(student),
-                'created_at': student.created_at.strftime('%d.%m.%Y')
+                'created_at': student.created_at.strftime('%d.%m.%Y'),
+                'lessons': student.lessons,
+                'hours': student.hours or 0
             }
             for student in students
         ]
@@ -106,4 +120,79 @@ def delete_student(request):
                 'message': f'Ошибка: {str(e)}'
             })
 
-    return JsonResponse({'status': 'error', 'message': 'Метод не разрешен'})
\ No newline at end of file
+    return JsonResponse({'status': 'error', 'message': 'Метод не разрешен'})
+
+def _parse_history_cursor(cursor):
+    """Курсор "YYYY-MM-DD|HH:MM:SS|id" — последнее событие предыдущей страницы"""
+    date_str, time_str, event_id = cursor.split('|')
+    return (
+        datetime.strptime(date_str, '%Y-%m-%d').date(),
+        datetime.strptime(time_str, '%H:%M:%S').time(),
+        int(event_id)
+    )
+
+@login_required
+def student_history(request):
+    """
+    История занятий ученика, от новых к старым, с keyset-пагинацией
+    по (date, time, id) — индекс event_student_history_idx.
+
+    На первой странице (без cursor) возвращается сводка: число занятий,
+    часы, прошедшие занятия и диапазон дат — одним агрегирующим запросом.
+    """
+    try:
+        student = Student.objects.get(id=request.GET.get('student_id'))
+    except (Student.DoesNotExist, ValueError):
+        return JsonResponse({'status': 'error', 'message': 'Ученик не найден'}, status=404)
+
+    if not request.user.is_superuser and student.created_by_id != request.user.id:
+        return JsonResponse({'status': 'error', 'message': 'Доступ запрещен'}, status=403)
+
+    try:
+        limit = min(int(request.GET.get('limit', HISTORY_PAGE_SIZE)), HISTORY_MAX_PAGE_SIZE)
+        if limit < 1:
+            raise ValueError(limit)
+        cursor = request.GET.get('cursor')
+
+        events = ScheduleEvent.objects.filter(student=student)
+        response = {'status': 'success', 'student_id': student.id}
+
+        if cursor:
+            cursor_date, cursor_time, cursor_id = _parse_history_cursor(cursor)
+            events = events.filter(
+                Q(date__lt=cursor_date)
+                | Q(date=cursor_date, time__lt=cursor_time)
+                | Q(date=cursor_date, time=cursor_time, id__lt=cursor_id)
+            )
+        else:
+            today = timezone.localdate()
+            stats = events.aggregate(
+                lessons=Count('id'),
+                hours=Sum('duration'),
+                past_lessons=Count('id', filter=Q(date__lte=today)),
+                past_hours=Sum('duration', filter=Q(date__lte=today)),
+                first_date=Min('date'),
+                last_date=Max('date')
+            )
+            response['stats'] = {
+                'lessons': stats['lessons'],
+                'hours': stats['hours'] or 0,
+                'past_lessons': stats['past_lessons'],
+                'past_hours': stats['past_hours'] or 0,
+                'first_date': stats['first_date'].strftime('%Y-%m-%d') if stats['first_date'] else None,
+                'last_date': stats['last_date'].strftime('%Y-%m-%d') if stats['last_date'] else None
+            }
+
+        # Берем на одно событие больше, чтобы узнать, есть ли следующая страница
+        page = list(events.order_by('-date', '-time', '-id')[:limit + 1])
+        has_more = len(page) > limit
+        page = page[:limit]
+
+        response['events'] = [serialize_event(event) for event in page]
+        response['next_cursor'] = (
+            f"{page[-1].date:%Y-%m-%d}|{page[-1].time:%H:%M:%S}|{page[-1].id}" if has_more else None
+        )
+        return JsonResponse(response)
+
+    except ValueError:
+        return JsonResponse({'status': 'error', 'message': 'Неверные параметры'}, status=400)
@@ -0,0 +1,41 @@
+"""Обработчики фоновых задач (регистрируются в SchedulerConfig.ready)"""
+import uuid
+from datetime import date, datetime, timedelta
+
+from .event_manager import MATERIALIZE_SERIES_JOB, EventManager
+from .jobs import job_handler
+from .models import ScheduleEvent
+
+
+@job_handler(MATERIALIZE_SERIES_JOB)
+def materialize_series(job):
+    """
+    Создает будущие события серии. Идемпотентна: даты, где в это время
+    уже есть событие (в том числе созданное прошлым запуском), пропускаются.
+    """
+    payload = job.payload
+    series = uuid.UUID(payload['series_id'])
+    manager = EventManager.for_user(job.user, job.created_by)
+
+    start_date = date.fromisoformat(payload['start_date'])
+    time = datetime.strptime(payload['time'], '%H:%M:%S').time()
+    text, color, duration = payload['text'], payload['color'], payload['duration']
+    student_id = payload.get('student_id')
+
+    if payload.get('anchor_id'):
+        anchor = ScheduleEvent.objects.filter(
+            id=payload['anchor_id'], user=job.user, series_id=series, is_recurring=True
+        ).first()
+        if anchor is None:
+            # Серию удалили или превратили в разовое событие до запуска задачи
+            return {'created': 0}
+
+        # Серию могли отредактировать или сдвинуть, пока задача ждала очереди
+        start_date = anchor.date + timedelta(weeks=1)
+        time, text, color, duration = anchor.time, anchor.text, anchor.color, anchor.duration
+        student_id = anchor.student_id
+
+    created = manager._create_future_recurring_events(
+        start_date, time, text, color, duration, series, payload['weeks_ahead'], student_id=student_id
+    )
+    return {'created': created}
@@ -1,3 +1,1547 @@
-from django.test import TestCase
+import csv
+import hashlib
+import io
+import json
+import os
+import re
+import uuid
+import shutil
+import tempfile
+import threading
+import time as time_module
+from unittest import mock
+from datetime import date, time, timedelta
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache.backends.db import DatabaseCache
+from django.core.management import call_command
+from django.db import IntegrityError, connection, connections, transaction
+from django.test import Client, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from core import storage
+from core.db_router import ReadWriteRouter, read_from_replica
+from core.slow_queries import fingerprint, install_recorder, query_context, recorder
+
+from . import audit
+from .jobs import run_job
+from .locks import LOCAL_LOCK_STRIPES, users_schedule_lock
+from .event_manager import EventManager, is_duplicate_slot
+from .models import AuditEntry, BackgroundJob, DayOccupancy, IdempotencyKey, ScheduleEvent, Student, WeeklyWorkload
+from .month_summary import invalidate_months
+from .search import create_search_index
+from .workload import WorkloadDelta
+
+SAVE_URL = '/api/save-event/'
+OVERVIEW_URL = '/api/load-users-overview/'
+WORKLOAD_URL = '/api/workload-summary/'
+DELETE_URL = '/api/delete-event/'
+LOAD_URL = '/api/load-events/'
+SHIFT_URL = '/api/shift-series/'
+CONFLICT_URL = '/api/check-event-conflict/'
+JOB_STATUS_URL = '/api/job-status/'
+LINK_STUDENT_URL = '/api/link-student/'
+HISTORY_URL = '/api/student-history/'
+SEARCH_URL = '/api/search-events/'
+MONTH_URL = '/api/month-summary/'
+COPY_WEEK_URL = '/api/copy-week/'
+BULK_EDIT_URL = '/api/bulk-edit-events/'
+EXPORT_URL = '/api/export-events/'
+AUDIT_URL = '/api/audit-log/'
+USERS_DIRECTORY_URL = '/api/users-directory/'
+
+
+class ScheduleAPITestCase(TransactionTestCase):
+    """Обвязка тестов API: обе базы и суперпользователь teacher в сессии"""
+
+    databases = {'default', 'replica'}
+    reset_sequences = True
+
+    def setUp(self):
+        self.teacher = User.objects.create_superuser('teacher', password='password')
+        self.client.force_login(self.teacher)
+
+    def post(self, url, payload, status=200, **extra):
+        response = self.client.post(url, json.dumps(payload), content_type='application/json', **extra)
+        self.assertEqual(response.status_code, status, response.content)
+        return response.json()
+
+
+class UsersOverviewTest(ScheduleAPITestCase):
+    """События нескольких пользователей одним запросом, без смены target_user_id"""
+
+    def test_events_grouped_by_user(self):
+        alice = User.objects.create_user('alice', password='password')
+        bob = User.objects.create_user('bob', password='password')
+        for user, day, text in [(alice, 3, 'Первый'), (alice, 4, 'Второй'), (bob, 5, 'Боб'), (bob, 12, 'Позже')]:
+            ScheduleEvent.objects.create(
+                user=user, created_by=self.teacher, date=date(2025, 3, day), time=time(10), text=text, duration=1.5
+            )
+        params = {'date_from': '2025-03-03', 'date_to': '2025-03-09'}
+
+        with CaptureQueriesContext(connection) as queries, CaptureQueriesContext(connections['replica']) as replica:
+            response = self.client.get(OVERVIEW_URL, {**params, 'user_ids': f'{alice.id},{bob.id}'})
+        data = response.json()
+        # Пользователь сессии, выбранные пользователи, их события (чтения — с реплики)
+        self.assertEqual(len(queries) + len(replica), 3)
+        self.assertEqual([user['username'] for user in data['users']], ['alice', 'bob'])
+        events = [dict(zip(data['fields'], row)) for row in data['users'][0]['events']]
+        self.assertEqual([event['text'] for event in events], ['Первый', 'Второй'])
+        self.assertEqual((events[0]['date'], events[0]['time'], events[0]['duration']), ('2025-03-03', '10:00', 1.5))
+        self.assertEqual(events[0]['created_by'], self.teacher.id)
+        self.assertEqual(len(data['users'][1]['events']), 1)
+
+        # Без user_ids — все пользователи, включая тех, у кого нет событий
+        data = self.client.get(OVERVIEW_URL, params).json()
+        self.assertEqual([user['username'] for user in data['users']], ['alice', 'bob', 'teacher'])
+        self.assertEqual(data['users'][2]['events'], [])
+        self.assertNotIn('target_user_id', self.client.session)
+
+        self.assertEqual(self.client.get(OVERVIEW_URL, {'date_from': '2025-03-03'}).status_code, 400)
+        self.client.force_login(alice)
+        self.assertEqual(self.client.get(OVERVIEW_URL, params).status_code, 403)
+
+
+class WorkloadSummaryTest(ScheduleAPITestCase):
+    """Сводная нагрузка по неделям: инкрементальные изменения и границы периодов"""
+
+    def workload(self):
+        return set(WeeklyWorkload.objects.exclude(event_count=0).values_list('week_start', 'event_count', 'minutes'))
+
+    def summary(self, date_from, date_to, group_by):
+        data = self.client.get(WORKLOAD_URL, {'date_from': date_from, 'date_to': date_to, 'group_by': group_by}).json()
+        return [(row['period'], row['event_count'], row['hours']) for row in data['summary']]
+
+    def test_workload_delta(self):
+        delta = WorkloadDelta()
+        delta.add(self.teacher.id, date(2025, 3, 3), 1.5)
+        delta.add(self.teacher.id, date(2025, 3, 9), 0.25)
+        delta.add(self.teacher.id, date(2025, 3, 10), 1)
+        delta.apply()
+        self.assertEqual(self.workload(), {(date(2025, 3, 3), 2, 105), (date(2025, 3, 10), 1, 60)})
+
+        # Взаимно погашенные изменения не дают запросов
+        delta.add(self.teacher.id, date(2025, 3, 4), 1)
+        delta.remove(self.teacher.id, date(2025, 3, 6), 1)
+        with self.assertNumQueries(0):
+            delta.apply()
+
+        delta.remove(self.teacher.id, date(2025, 3, 9), 0.25)
+        delta.remove(self.teacher.id, date(2025, 3, 12), 1)
+        delta.apply()
+        self.assertEqual(self.workload(), {(date(2025, 3, 3), 1, 90)})
+
+    def test_periods_at_month_and_iso_week_boundaries(self):
+        for day, duration in [
+            ('2024-12-31', 1),    # неделя 30.12 — ISO 2025-W01, январь по четвергу
+            ('2025-03-01', 1.5),  # суббота недели 24.02 — февраль
+            ('2025-03-03', 0.5),
+            ('2025-04-01', 2),    # неделя 31.03 — четверг 03.04, апрель
+            ('2025-04-02', 1),
+        ]:
+            self.post(SAVE_URL, {'date': day, 'time': '10:00', 'text': 'Урок', 'duration': duration})
+
+        self.assertEqual(self.summary('2024-12-31', '2025-04-30', 'month'), [
+            ('2025-01', 1, 1.0), ('2025-02', 1, 1.5), ('2025-03', 1, 0.5), ('2025-04', 2, 3.0),
+        ])
+        # Границы периода округляются до недель: date_from — к ее понедельнику,
+        # date_to включает неделю, которая в нем начинается
+        self.assertEqual(self.summary('2025-03-02', '2025-03-30', 'week'), [('2025-W09', 1, 1.5), ('2025-W10', 1, 0.5)])
+        self.assertEqual(self.summary('2025-03-02', '2025-03-31', 'week')[-1], ('2025-W14', 2, 3.0))
+        self.assertEqual(self.summary('2024-12-29', '2025-01-05', 'week'), [('2025-W01', 1, 1.0)])
+
+        incremental = self.workload()
+        call_command('rebuild_workload', stdout=open(os.devnull, 'w'))
+        self.assertEqual(incremental, self.workload())
+
+
+class UsersDirectoryTest(ScheduleAPITestCase):
+    """Каталог пользователей: первая страница из кэша, сброс сигналами"""
+
+    def directory(self, **params):
+        with CaptureQueriesContext(connection) as queries:
+            data = self.client.get(USERS_DIRECTORY_URL, params).json()
+        return data, len(queries)
+
+    def test_first_page_is_cached_until_users_change(self):
+        User.objects.create_user('alice', password='password')
+        data, _ = self.directory()
+        self.assertEqual([user['username'] for user in data['users']], ['alice', 'teacher'])
+
+        cached, queries = self.directory()
+        self.assertEqual(cached, data)
+        # Только пользователь сессии
+        self.assertEqual(queries, 1)
+
+        # Вход обновляет last_login — каталог не меняется, кэш остается
+        self.client.login(username='alice', password='password')
+        self.client.force_login(self.teacher)
+        self.assertEqual(self.directory()[1], 1)
+
+        User.objects.create_user('bob', password='password')
+        data, _ = self.directory()
+        self.assertEqual([user['username'] for user in data['users']], ['alice', 'bob', 'teacher'])
+
+        User.objects.get(username='bob').delete()
+        data, _ = self.directory()
+        self.assertEqual([user['username'] for user in data['users']], ['alice', 'teacher'])
+
+    def test_search_and_pages(self):
+        User.objects.bulk_create([User(username=f'student{number:02d}') for number in range(60)])
+        first = self.directory(q='stud')[0]
+        self.assertEqual((len(first['users']), first['has_next']), (50, True))
+        second = self.directory(q='STUD', page=2)[0]
+        self.assertEqual((len(second['users']), second['has_next']), (10, False))
+        self.assertEqual(second['users'][-1]['username'], 'student59')
+
+        self.client.force_login(User.objects.get(username='student00'))
+        self.assertEqual(self.client.get(USERS_DIRECTORY_URL).status_code, 403)
+
+
+class ModulePreloadTest(SimpleTestCase):
+    """modulepreload в index.html покрывает все статически импортируемые модули main.js"""
+
+    def test_preload_list_covers_import_graph(self):
+        scripts = os.path.join(settings.BASE_DIR, 'static', 'scripts')
+        reachable, pending = set(), ['main.js']
+        while pending:
+            module = pending.pop()
+            with open(os.path.join(scripts, module), encoding='utf-8') as source:
+                for target in re.findall(r"^import .*? from '(\.[^']+)'", source.read(), re.MULTILINE):
+                    path = os.path.normpath(os.path.join(os.path.dirname(module), target)).replace(os.sep, '/')
+                    if path not in reachable:
+                        reachable.add(path)
+                        pending.append(path)
+
+        with open(os.path.join(settings.BASE_DIR, 'templates', 'index.html'), encoding='utf-8') as template:
+            preloaded = set(re.findall(r'rel="modulepreload" href="{% static \'scripts/([^\']+)\' %}"', template.read()))
+        self.assertTrue(reachable)
+        self.assertEqual(reachable - preloaded, set())
+
+
+class CollectStaticTest(SimpleTestCase):
+    """collectstatic с хранилищем production проходит по настоящему static/"""
+
+    def test_collectstatic_with_production_storage(self):
+        static_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, static_root)
+        storages = {
+            'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+            'staticfiles': {'BACKEND': 'core.storage.CompressedManifestStaticFilesStorage'},
+        }
+        with override_settings(STATIC_ROOT=static_root, STORAGES=storages):
+            call_command('collectstatic', interactive=False, verbosity=0)
+
+        with open(os.path.join(static_root, 'staticfiles.json'), encoding='utf-8') as manifest:
+            paths = json.load(manifest)['paths']
+        scripts = {name: hashed for name, hashed in paths.items()
+                   if name.startswith('scripts/') and name.endswith('.js')}
+        self.assertIn('scripts/main.js', scripts)
+        for name, hashed in scripts.items():
+            self.assertRegex(hashed, r'\.[0-9a-f]{12}\.js$')
+            self.assertTrue(os.path.exists(os.path.join(static_root, hashed + '.gz')), hashed)
+            if storage.brotli is not None:
+                self.assertTrue(os.path.exists(os.path.join(static_root, hashed + '.br')), hashed)
+
+
+class HomePageInitialDataTest(ScheduleAPITestCase):
+    """Главная страница встраивает текущую неделю в формате load_events"""
+
+    def initial_data(self):
+        response = self.client.get('/')
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'id="initial-schedule"')
+        return response.context['initial_data']
+
+    def test_current_week_is_embedded(self):
+        monday = timezone.localdate() - timedelta(days=timezone.localdate().weekday())
+        for day in (monday, monday + timedelta(days=6), monday + timedelta(days=7)):
+            self.post(SAVE_URL, {'date': day.isoformat(), 'time': '10:00', 'text': 'Урок'})
+
+        data = self.initial_data()
+        week = {'date_from': monday.isoformat(), 'date_to': (monday + timedelta(days=6)).isoformat()}
+        self.assertEqual((data['date_from'], data['date_to']), (week['date_from'], week['date_to']))
+        self.assertEqual(data['events'], self.client.get(LOAD_URL, week).json()['events'])
+        self.assertEqual(len(data['events']), 2)
+        self.assertEqual(data['target_user'], {'id': self.teacher.id, 'username': 'teacher', 'is_self': True})
+        self.assertEqual([user['username'] for user in data['users']['users']], ['teacher'])
+
+    def test_target_user_and_non_superuser(self):
+        other = User.objects.create_user('other', password='password')
+        self.post('/api/switch_user/', {'user_id': other.id})
+        data = self.initial_data()
+        self.assertEqual(data['target_user'], {'id': other.id, 'username': 'other', 'is_self': False})
+        self.assertEqual(data['events'], [])
+
+        self.client.force_login(other)
+        data = self.initial_data()
+        self.assertEqual(data['target_user']['id'], other.id)
+        self.assertIsNone(data['users'])
+
+
+class ShiftSeriesTest(ScheduleAPITestCase):
+    """Сдвиг серии одним UPDATE: id и created_by сохраняются, конфликты проверяются заранее"""
+
+    def setUp(self):
+        super().setUp()
+        self.series = self.post(SAVE_URL, {
+            'date': '2025-03-04', 'time': '10:00', 'text': 'Урок', 'duration': 1, 'is_recurring': True
+        })
+        self.events = ScheduleEvent.objects.filter(series_id=self.series['series_id'])
+        self.before = dict(self.events.values_list('id', 'date'))
+
+    def test_shift_keeps_ids_and_summaries(self):
+        result = self.post(SHIFT_URL, {'id': self.series['id'], 'day_offset': 2, 'time': '15:30'})
+        self.assertEqual((result['shifted'], result['series_id']), (53, self.series['series_id']))
+
+        after = {event_id: (day, at, version, created_by) for event_id, day, at, version, created_by
+                 in self.events.values_list('id', 'date', 'time', 'version', 'created_by')}
+        self.assertEqual(set(after), set(self.before))
+        self.assertEqual(
+            {after[event_id][0] - day for event_id, day in self.before.items()}, {timedelta(days=2)}
+        )
+        self.assertEqual({values[1:] for values in after.values()}, {(time(15, 30), 2, self.teacher.id)})
+
+        incremental = set(WeeklyWorkload.objects.exclude(event_count=0).values_list('week_start', 'event_count'))
+        call_command('rebuild_workload', stdout=open(os.devnull, 'w'))
+        self.assertEqual(incremental, set(WeeklyWorkload.objects.exclude(event_count=0).values_list(
+            'week_start', 'event_count'
+        )))
+
+    def test_shift_from_date_and_conflicts(self):
+        blocker = self.post(SAVE_URL, {'date': '2025-03-26', 'time': '10:30', 'text': 'Занято', 'duration': 1})
+
+        response = self.post(SHIFT_URL, {'id': self.series['id'], 'day_offset': 1}, status=400)
+        self.assertIn('2025-03-26', response['message'])
+        self.assertEqual(dict(self.events.values_list('id', 'date')), self.before)
+
+        self.post(SAVE_URL, {'id': blocker['id'], 'date': '2025-03-26', 'time': '12:00', 'text': 'Занято'})
+        self.post(SHIFT_URL, {'id': self.series['id'], 'day_offset': 1, 'from_date': '2025-03-18'})
+        self.assertEqual(
+            sorted(self.events.filter(date__lt='2025-03-19').values_list('date', flat=True)),
+            [date(2025, 3, 4), date(2025, 3, 11)]
+        )
+        self.assertTrue(self.events.filter(date='2025-03-19').exists())
+
+        self.post(SHIFT_URL, {'id': self.series['id']}, status=400)
+        self.post(SHIFT_URL, {'id': blocker['id'], 'day_offset': 1}, status=400)
+
+
+class ConcurrentSaveStressTest(TransactionTestCase):
+    """Гонки параллельных save_event/delete_event за одно расписание"""
+
+    THREADS = 8
+    reset_sequences = True
+
+    def setUp(self):
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            self.skipTest('Нужна файловая БД: python manage.py test --settings=core.settings.test')
+
+        self.admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.teacher = User.objects.create_user('teacher', password='password')
+
+    def race(self, requests):
+        """Отправляет запросы (user, url, payload) одновременно — по потоку и клиенту на запрос"""
+        barrier = threading.Barrier(len(requests))
+        responses = [None] * len(requests)
+
+        def worker(index, user, url, payload):
+            client = Client()
+            client.force_login(user)
+            try:
+                barrier.wait()
+                responses[index] = client.post(url, json.dumps(payload), content_type='application/json')
+            finally:
+                connection.close()
+
+        threads = [
+            threading.Thread(target=worker, args=(index, *request))
+            for index, request in enumerate(requests)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return responses
+
+    def test_concurrent_creates_in_same_slot_create_one_event(self):
+        payload = {'date': '2025-03-03', 'time': '10:00', 'text': 'Урок', 'duration': 1}
+        responses = self.race([(self.teacher, SAVE_URL, payload)] * self.THREADS)
+
+        self.assertEqual(sorted(r.status_code for r in responses), [200] + [400] * (self.THREADS - 1))
+        self.assertEqual(ScheduleEvent.objects.filter(user=self.teacher).count(), 1)
+
+    def test_concurrent_recurring_creates_do_not_duplicate_series(self):
+        payload = {'date': '2025-03-03', 'time': '10:00', 'text': 'Урок', 'duration': 1, 'is_recurring': True}
+
+        responses = self.race([(self.teacher, SAVE_URL, payload)] * 4)
+
+        self.assertEqual(sum(r.status_code == 200 for r in responses), 1)
+        events = ScheduleEvent.objects.filter(user=self.teacher)
+        self.assertEqual(events.values('series_id').distinct().count(), 1)
+        self.assertEqual(events.count(), events.values('date', 'time').distinct().count())
+
+    def test_concurrent_edits_of_same_version_allow_one_winner(self):
+        event = ScheduleEvent.objects.create(
+            user=self.teacher, date='2025-03-03', time='10:00', text='Урок', created_by=self.teacher
+        )
+        requests = [
+            (self.teacher, SAVE_URL, {
+                'id': event.id, 'date': '2025-03-03', 'time': f'{11 + i}:00',
+                'text': f'Правка {i}', 'duration': 1, 'version': event.version
+            })
+            for i in range(self.THREADS)
+        ]
+
+        responses = self.race(requests)
+
+        statuses = sorted(r.status_code for r in responses)
+        self.assertEqual(statuses, [200] + [409] * (self.THREADS - 1))
+        event.refresh_from_db()
+        self.assertEqual(event.version, 2)
+
+    def test_series_edit_races_with_series_delete(self):
+        client = Client()
+        client.force_login(self.teacher)
+        created = client.post(SAVE_URL, json.dumps({
+            'date': '2025-03-03', 'time': '10:00', 'text': 'Урок', 'duration': 1, 'is_recurring': True
+        }), content_type='application/json').json()
+
+        responses = self.race([
+            (self.teacher, SAVE_URL, {
+                'id': created['id'], 'date': '2025-03-03', 'time': '10:00',
+                'text': 'Новый текст', 'duration': 2, 'is_recurring': True, 'version': 1
+            }),
+            (self.teacher, DELETE_URL, {'id': created['id'], 'delete_recurring': True}),
+        ])
+
+        self.assertIn(responses[0].status_code, (200, 404))
+        self.assertEqual(responses[1].status_code, 200)
+        self.assertEqual(responses[1].json()['status'], 'success')
+        # Либо серия удалена целиком, либо удаление прошло после правки — не частично
+        self.assertFalse(ScheduleEvent.objects.filter(series_id=created['series_id']).exists())
+
+
+class ReplicaRoutingTest(ScheduleAPITestCase):
+    """Чтение с реплики и read-your-writes после собственной записи"""
+
+    def setUp(self):
+        if 'replica' not in connections.databases:
+            self.skipTest('Нужна реплика: python manage.py test --settings=core.settings.test')
+
+        self.teacher = User.objects.create_user('teacher', password='password')
+        self.client.force_login(self.teacher)
+
+    def load_events(self):
+        with CaptureQueriesContext(connections['replica']) as replica_queries:
+            response = self.client.get(LOAD_URL, {'date_from': '2025-03-03', 'date_to': '2025-03-09'})
+        self.assertEqual(response.status_code, 200)
+        return len(replica_queries)
+
+    def test_read_endpoint_uses_replica(self):
+        self.assertGreater(self.load_events(), 0)
+
+    def test_reads_stick_to_primary_after_own_write(self):
+        response = self.client.post(SAVE_URL, json.dumps({
+            'date': '2025-03-03', 'time': '10:00', 'text': 'Урок', 'duration': 1
+        }), content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+
+        self.assertEqual(self.load_events(), 0)
+
+        session = self.client.session
+        session['db_primary_until'] = 0
+        session.save()
+        self.assertGreater(self.load_events(), 0)
+
+    def test_search_reads_one_database(self):
+        ScheduleEvent.objects.create(user=self.teacher, date=date(2025, 3, 3), time=time(10, 0), text='Урок')
+        with CaptureQueriesContext(connection) as primary_queries, \
+                CaptureQueriesContext(connections['replica']) as replica_queries:
+            response = self.client.get(SEARCH_URL, {'q': 'урок'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['results']), 1)
+        # FTS-запрос и in_bulk — на реплике; на основной только пользователь сессии
+        self.assertEqual([q['sql'] for q in primary_queries if 'scheduler_' in q['sql']], [])
+        self.assertEqual(len([q for q in replica_queries if 'scheduler_' in q['sql']]), 2)
+
+    def test_writes_go_to_primary(self):
+        with CaptureQueriesContext(connections['replica']) as replica_queries:
+            self.client.post(SAVE_URL, json.dumps({
+                'date': '2025-03-03', 'time': '10:00', 'text': 'Урок', 'duration': 1
+            }), content_type='application/json')
+        self.assertEqual(len(replica_queries), 0)
+
+    def test_database_cache_reads_primary(self):
+        cache_entry = DatabaseCache('django_cache', {}).cache_model_class
+        with read_from_replica():
+            self.assertEqual(ReadWriteRouter().db_for_read(cache_entry), 'default')
+            self.assertEqual(ReadWriteRouter().db_for_read(ScheduleEvent), 'replica')
+
+
+class OccupancyIndexTest(ScheduleAPITestCase):
+    """Маски занятости дней совпадают с пересчетом по событиям после любых записей"""
+
+    def snapshot(self):
+        return {
+            (user_id, date): (bytes(busy), bytes(starts))
+            for user_id, date, busy, starts in DayOccupancy.objects.values_list('user_id', 'date', 'busy', 'starts')
+        }
+
+    def assert_matches_rebuild(self):
+        incremental = self.snapshot()
+        call_command('rebuild_occupancy', stdout=open(os.devnull, 'w'))
+        self.assertEqual(incremental, self.snapshot())
+
+    def has_conflict(self, date, time, duration):
+        response = self.client.get(CONFLICT_URL, {'date': date, 'time': time, 'duration': duration})
+        return response.json()['hasConflict']
+
+    def test_occupancy_follows_writes(self):
+        series = self.post(SAVE_URL, {
+            'date': '2025-03-03', 'time': '10:00', 'text': 'Урок', 'duration': 1, 'is_recurring': True
+        })
+        single = self.post(SAVE_URL, {'date': '2025-03-03', 'time': '10:30', 'text': 'Окно', 'duration': 0.5})
+        self.assert_matches_rebuild()
+        self.assertEqual(DayOccupancy.objects.count(), ScheduleEvent.objects.values('date').distinct().count())
+
+        self.assertTrue(self.has_conflict('2025-03-10', '10:45', 1))
+        self.assertFalse(self.has_conflict('2025-03-10', '11:00', 1))
+        self.assertFalse(self.has_conflict('2025-03-10', '09:00', 1))
+
+        self.post(SHIFT_URL, {'id': series['id'], 'day_offset': 1, 'time': '09:10'})
+        self.assert_matches_rebuild()
+        self.assertTrue(self.has_conflict('2025-03-11', '10:00', 0.25))
+        self.assertFalse(self.has_conflict('2025-03-11', '10:15', 1))
+
+        converted = {'id': single['id'], 'date': '2025-03-05', 'time': '12:00', 'text': 'Окно', 'duration': 1}
+        self.post(SAVE_URL, {**converted, 'is_recurring': True})
+        self.assert_matches_rebuild()
+        self.post(SAVE_URL, {**converted, 'is_recurring': False})
+        self.assert_matches_rebuild()
+
+        # Снятие события, пересекающегося с другим, не освобождает слоты другого
+        overlapping = self.post(SAVE_URL, {'date': '2025-03-04', 'time': '09:30', 'text': 'Окно', 'duration': 1})
+        self.post(DELETE_URL, {'id': overlapping['id']})
+        self.assert_matches_rebuild()
+        self.assertTrue(self.has_conflict('2025-03-04', '10:00', 0.25))
+
+        self.post(DELETE_URL, {'id': series['id'], 'delete_recurring': True})
+        self.assertFalse(DayOccupancy.objects.filter(date='2025-03-11').exists())
+
+    def test_admin_writes_keep_occupancy(self):
+        admin_url = '/admin/scheduler/scheduleevent/'
+        form = {
+            'user': self.teacher.id, 'date': '2025-03-03', 'time': '10:00', 'text': 'Из админки', 'color': 'blue',
+            'duration': 1, 'version': 1, 'created_by': self.teacher.id, 'student': '',
+        }
+        response = self.client.post(admin_url + 'add/', form)
+        self.assertEqual(response.status_code, 302)
+        event = ScheduleEvent.objects.get()
+        self.assertTrue(self.has_conflict('2025-03-03', '10:30', 1))
+
+        response = self.client.post(f'{admin_url}{event.id}/change/', {**form, 'date': '2025-03-04'})
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(self.has_conflict('2025-03-03', '10:30', 1))
+        self.assertTrue(self.has_conflict('2025-03-04', '10:30', 1))
+        self.assertEqual(set(WeeklyWorkload.objects.values_list('event_count', 'minutes')), {(1, 60)})
+        self.assert_matches_rebuild()
+
+        # Смена владельца пересчитывает оба расписания
+        assistant = User.objects.create_user('assistant', password='password')
+        response = self.client.post(f'{admin_url}{event.id}/change/', {**form, 'date': '2025-03-04', 'user': assistant.id})
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(self.has_conflict('2025-03-04', '10:30', 1))
+        self.assertEqual(list(DayOccupancy.objects.values_list('user_id', flat=True)), [assistant.id])
+        workload = WeeklyWorkload.objects.values_list('user_id', 'event_count', 'minutes')
+        self.assertEqual(set(workload), {(self.teacher.id, 0, 0), (assistant.id, 1, 60)})
+        self.assert_matches_rebuild()
+
+        response = self.client.post(f'{admin_url}{event.id}/delete/', {'post': 'yes'})
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(self.has_conflict('2025-03-04', '10:30', 1))
+        self.assertEqual(set(WeeklyWorkload.objects.values_list('event_count', 'minutes')), {(0, 0)})
+        self.assertFalse(DayOccupancy.objects.exists())
+
+    def test_users_sharing_a_lock_stripe_do_not_deadlock(self):
+        user_ids = [self.teacher.id, self.teacher.id + LOCAL_LOCK_STRIPES]
+        finished = threading.Event()
+
+        def lock_both():
+            try:
+                with users_schedule_lock(user_ids):
+                    finished.set()
+            finally:
+                connection.close()
+
+        worker = threading.Thread(target=lock_both, daemon=True)
+        worker.start()
+        worker.join(timeout=5)
+        self.assertTrue(finished.is_set())
+
+    def test_reject_conflicts_on_save(self):
+        lesson = self.post(SAVE_URL, {'date': '2025-03-03', 'time': '10:00', 'text': 'Урок', 'duration': 1})
+        payload = {'date': '2025-03-03', 'time': '10:30', 'text': 'Окно', 'duration': 1, 'reject_conflicts': True}
+
+        response = self.client.post(SAVE_URL, json.dumps(payload), content_type='application/json')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual([event['id'] for event in response.json()['conflictingEvents']], [lesson['id']])
+        self.assertEqual(ScheduleEvent.objects.count(), 1)
+
+        # Без флага пересечение разрешено (пользователь подтвердил), редактирование не конфликтует с собой
+        window = self.post(SAVE_URL, {**payload, 'reject_conflicts': False})
+        self.post(SAVE_URL, {**payload, 'date': '2025-03-04', 'time': '10:00', 'text': 'Урок', 'id': lesson['id']})
+        self.post(SAVE_URL, {**payload, 'time': '10:15', 'id': window['id']})
+        self.assert_matches_rebuild()
+
+
+@override_settings(SERIES_BACKGROUND_JOBS=True)
+class SeriesJobQueueTest(ScheduleAPITestCase):
+    """Будущие события серии создаются воркером run_jobs, а не в запросе"""
+
+    def create_series(self):
+        return self.post(SAVE_URL, {
+            'date': '2025-03-03', 'time': '10:00', 'text': 'Урок', 'duration': 1, 'is_recurring': True
+        })
+
+    def run_worker(self):
+        call_command('run_jobs', once=True, threads=1, stdout=open(os.devnull, 'w'))
+
+    def job_state(self, job_id):
+        return self.client.get(JOB_STATUS_URL, {'id': job_id}).json()['job']
+
+    def test_series_is_materialized_by_worker(self):
+        created = self.create_series()
+
+        self.assertEqual(ScheduleEvent.objects.count(), 1)
+        self.assertEqual(self.job_state(created['job_id'])['state'], BackgroundJob.STATUS_PENDING)
+
+        self.run_worker()
+
+        job = self.job_state(created['job_id'])
+        self.assertEqual(job['state'], BackgroundJob.STATUS_DONE)
+        self.assertEqual(job['result'], {'created': 52})
+        self.assertEqual(ScheduleEvent.objects.filter(series_id=created['series_id']).count(), 53)
+
+        # Повторный запуск (например, после падения воркера) ничего не дублирует
+        job = BackgroundJob.objects.get(id=created['job_id'])
+        self.assertTrue(run_job(job))
+        self.assertEqual(job.result, {'created': 0})
+        self.assertEqual(ScheduleEvent.objects.count(), 53)
+
+    def test_job_of_deleted_series_creates_nothing(self):
+        created = self.create_series()
+        self.client.post(DELETE_URL, json.dumps({'id': created['id'], 'delete_recurring': True}),
+                         content_type='application/json')
+
+        self.run_worker()
+
+        self.assertEqual(self.job_state(created['job_id'])['result'], {'created': 0})
+        self.assertFalse(ScheduleEvent.objects.exists())
+
+    def test_loop_requeues_jobs_that_stall_after_start(self):
+        created = self.create_series()
+        # Задачу взял соседний воркер, который упадет уже после старта этого
+        BackgroundJob.objects.filter(id=created['job_id']).update(
+            status=BackgroundJob.STATUS_RUNNING, started_at=timezone.now())
+        clock = [0.0]
+        sleeps = []
+
+        def sleep(seconds):
+            sleeps.append(seconds)
+            job = BackgroundJob.objects.get(id=created['job_id'])
+            # Без повторной проверки зависших воркер ждал бы вечно
+            if job.status == BackgroundJob.STATUS_DONE or len(sleeps) > 200:
+                raise KeyboardInterrupt
+            if job.status == BackgroundJob.STATUS_RUNNING and job.attempts == 0:
+                job.started_at = timezone.now() - timedelta(hours=1)
+                job.save(update_fields=['started_at'])
+                # Следующая проверка зависших — ровно одна, на ближайшей итерации
+                clock[0] += 60
+            time_module.sleep(0.01)
+
+        fake_time = mock.Mock(sleep=sleep, monotonic=lambda: clock[0])
+        with mock.patch('scheduler.management.commands.run_jobs.time', fake_time):
+            call_command('run_jobs', threads=1, stale_timeout=60, stale_check_interval=60,
+                         stdout=open(os.devnull, 'w'))
+
+        self.assertEqual(self.job_state(created['job_id'])['result'], {'created': 52})
+
+
+class ProfilingTest(ScheduleAPITestCase):
+    """Профилирование запроса по ?_profile=1 — только для суперпользователя"""
+
+    def setUp(self):
+        self.reports_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.reports_dir)
+        self.settings_override = override_settings(PROFILE_REPORTS_DIR=self.reports_dir)
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+
+        self.admin = User.objects.create_superuser('admin', password='password')
+        self.teacher = User.objects.create_user('teacher', password='password')
+
+    def load_events(self, user, **extra):
+        self.client.force_login(user)
+        return self.client.get(LOAD_URL, {'date_from': '2025-03-03', 'date_to': '2025-03-09', **extra})
+
+    def test_superuser_gets_report_with_sql_call_sites(self):
+        response = self.load_events(self.admin, _profile=1)
+
+        name = response['X-Profile-Report']
+        with open(os.path.join(self.reports_dir, name), encoding='utf-8') as report:
+            text = report.read()
+        self.assertIn('scheduler/views.py', text)
+        self.assertIn('== Profile', text)
+
+        page = self.client.get('/admin/profiles/')
+        self.assertContains(page, name)
+        self.assertEqual(self.client.get(f'/admin/profiles/{name}/').status_code, 200)
+        self.assertEqual(self.client.get('/admin/profiles/..%2Fmanage.py/').status_code, 404)
+
+    def test_profiling_is_ignored_for_regular_users(self):
+        response = self.load_events(self.teacher, _profile=1)
+
+        self.assertNotIn('X-Profile-Report', response)
+        self.assertEqual(os.listdir(self.reports_dir), [])
+
+
+@override_settings(SLOW_QUERY_THRESHOLD_MS=0, SLOW_QUERY_REPEAT_THRESHOLD=5)
+class SlowQueryLogTest(TestCase):
+    """Журнал медленных и повторяющихся запросов"""
+
+    def setUp(self):
+        install_recorder(sender=None, connection=connection)
+        self.addCleanup(connection.execute_wrappers.remove, recorder)
+        self.teacher = User.objects.create_user('teacher', password='password')
+
+    def test_fingerprint_normalizes_literals_and_lists(self):
+        self.assertEqual(
+            fingerprint("SELECT * FROM t WHERE id IN (%s, %s, %s) AND name = 'x' AND n > 10"),
+            fingerprint("SELECT * FROM t WHERE id IN (%s)  AND name = 'y' AND n > 2"),
+        )
+
+    def test_slow_and_repeated_queries_are_logged_with_call_site(self):
+        with self.assertLogs('core.slow_queries', level='INFO') as logs:
+            with query_context('test'):
+                for week in range(6):
+                    ScheduleEvent.objects.filter(user=self.teacher, date=f'2025-03-{week + 3:02d}').exists()
+
+        entries = [json.loads(line.split(':', 2)[2]) for line in logs.output]
+        slow = [entry for entry in entries if entry['kind'] == 'slow']
+        repeated = [entry for entry in entries if entry['kind'] == 'repeated']
+
+        self.assertEqual(len(slow), 6)
+        self.assertEqual(slow[0]['label'], 'test')
+        self.assertIn('scheduler/tests.py', slow[0]['call_site'])
+        self.assertEqual(len({entry['fingerprint'] for entry in slow}), 1)
+        self.assertEqual([entry['count'] for entry in repeated], [6])
+        slowest = max(entry['duration_ms'] for entry in slow)
+        self.assertAlmostEqual(repeated[0]['max_ms'], slowest, delta=0.01)
+
+        log_path = os.path.join(tempfile.mkdtemp(), 'slow_queries.log')
+        self.addCleanup(shutil.rmtree, os.path.dirname(log_path))
+        with open(log_path, 'w', encoding='utf-8') as log_file:
+            log_file.write('\n'.join(line.split(':', 2)[2] for line in logs.output))
+
+        output = io.StringIO()
+        call_command('slow_query_report', log=log_path, kind='repeated', top=1, stdout=output)
+        self.assertIn(slow[0]['fingerprint'], output.getvalue())
+        self.assertIn('6 выполнений в 1 записях', output.getvalue())
+        self.assertIn(f"макс. {repeated[0]['max_ms']:.1f} ms", output.getvalue())
+
+    def test_failed_explain_keeps_transaction_usable(self):
+        with transaction.atomic():
+            # На SQLite синтаксис EXPLAIN (ANALYZE, BUFFERS) не поддерживается — запрос падает
+            plan = recorder.explain('SELECT 1', [], connection)
+            self.assertTrue(plan.startswith('EXPLAIN failed'))
+            self.assertFalse(connection.needs_rollback)
+            self.assertFalse(ScheduleEvent.objects.exists())
+
+
+QUERY_BUDGETS = {
+    # Пользователь сессии + один запрос данных
+    'load_events': 2,
+    'load_series_events': 2,
+    'load_occupancy': 2,
+    'workload_summary': 2,
+    'load_students': 2,
+    # Поиск по индексу и события найденной страницы
+    'search_events': 3,
+    # Промах кэша: один GROUP BY по (дата, цвет)
+    'month_summary': 2,
+    # Маска занятости дня; при пересечении — еще события этого дня
+    'check_event_conflict': 2,
+    'check_event_conflict_hit': 3,
+    # Транзакция (занятый слот отсекает unique_event_slot), запись и обновление
+    # сводных таблиц
+    'create_series': 15,
+    'edit_series': 10,
+    'shift_series': 10,
+    'delete_series': 10,
+    'bulk_edit': 9,
+    'edit_single': 9,
+    'delete_single': 9,
+}
+
+
+class QueryBudgetTest(ScheduleAPITestCase):
+    """Число запросов эндпоинтов не растет вместе с данными"""
+
+    # На SQLite bulk_create режется на пачки по ~76 событий (лимит параметров
+    # запроса) — большой размер берем в пределах пачки; серия — до 53 недель
+    SMALL, LARGE = 5, 70
+    MONDAY = date(2025, 3, 3)
+
+    # Фикстуры — через массовые пути: bulk_create и пересчет сводных таблиц
+
+    def make_schedule(self, size):
+        """Неделя из size событий по 15 минут, равномерно по дням и без пересечений"""
+        ScheduleEvent.objects.bulk_create([
+            ScheduleEvent(
+                user=self.teacher, created_by=self.teacher, text=f'Урок {number}', duration=0.25,
+                date=self.MONDAY + timedelta(days=number % 7),
+                time=time(number // 7 // 4, number // 7 % 4 * 15)
+            )
+            for number in range(size)
+        ])
+
+    def make_series(self, weeks, start=None, hour=8):
+        series_id = uuid.uuid4()
+        ScheduleEvent.objects.bulk_create([
+            ScheduleEvent(
+                user=self.teacher, created_by=self.teacher, text='Серия', is_recurring=True,
+                series_id=series_id, date=(start or self.MONDAY) + timedelta(weeks=week), time=time(hour)
+            )
+            for week in range(weeks)
+        ])
+        return ScheduleEvent.objects.filter(series_id=series_id).earliest('date')
+
+    def rebuild_derived(self):
+        devnull = open(os.devnull, 'w')
+        self.addCleanup(devnull.close)
+        call_command('rebuild_workload', stdout=devnull)
+        call_command('rebuild_occupancy', stdout=devnull)
+
+    def count_queries(self, action):
+        with CaptureQueriesContext(connections['default']) as primary, \
+                CaptureQueriesContext(connections['replica']) as replica:
+            response = action()
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertNotEqual(response.json().get('status'), 'error', response.content)
+        return len(primary) + len(replica)
+
+    def assert_budget(self, name, counts):
+        small, large = counts
+        self.assertEqual(small, large, f'{name}: {small} запросов на малых данных, {large} на больших')
+        self.assertLessEqual(large, QUERY_BUDGETS[name], f'{name}: {large} > бюджета {QUERY_BUDGETS[name]}')
+
+    def get(self, url, params):
+        return lambda: self.client.get(url, params)
+
+    def post_later(self, url, payload):
+        return lambda: self.client.post(url, json.dumps(payload), content_type='application/json')
+
+    def measure(self, name, setup, action):
+        """Считает запросы action(fixture) после setup(size) на малых и больших данных"""
+        counts = []
+        for size in (self.SMALL, self.LARGE):
+            ScheduleEvent.objects.all().delete()
+            Student.objects.all().delete()
+            fixture = setup(size)
+            self.rebuild_derived()
+            counts.append(self.count_queries(action(fixture)))
+        self.assert_budget(name, counts)
+
+    def test_read_endpoints(self):
+        week = {'date_from': '2025-03-03', 'date_to': '2025-03-09'}
+        reads = {
+            'load_events': self.get(LOAD_URL, week),
+            'check_event_conflict': self.get(CONFLICT_URL, {'date': '2025-03-04', 'time': '20:00', 'duration': 1}),
+            'check_event_conflict_hit': self.get(CONFLICT_URL, {'date': '2025-03-04', 'time': '00:00', 'duration': 1}),
+            'load_occupancy': self.get('/api/load-occupancy/', week),
+            'workload_summary': self.get('/api/workload-summary/', {**week, 'group_by': 'month'}),
+            'search_events': self.get(SEARCH_URL, {'q': 'урок'}),
+        }
+        reads['month_summary'] = lambda: (
+            invalidate_months(self.teacher.id, [self.MONDAY]),
+            self.client.get(MONTH_URL, {'month': '2025-03'})
+        )[1]
+        for name, action in reads.items():
+            self.measure(name, self.make_schedule, lambda _: action)
+
+        self.measure(
+            'load_series_events',
+            lambda size: self.make_series(size),
+            lambda first: self.get('/api/load-series-events/', {'series_id': first.series_id})
+        )
+
+    def test_load_students(self):
+        def make_students(size):
+            Student.objects.bulk_create([
+                Student(first_name=f'Имя {i}', last_name=f'Фамилия {i}', created_by=self.teacher)
+                for i in range(size)
+            ])
+
+        self.measure('load_students', make_students, lambda _: self.get('/api/load-students/', {}))
+
+    def test_series_writes(self):
+        self.measure('create_series', lambda size: self.make_series(size, hour=12), lambda _: self.post_later(SAVE_URL, {
+            'date': '2025-03-03', 'time': '10:00', 'text': 'Урок', 'duration': 1, 'is_recurring': True
+        }))
+
+        def edit(first):
+            return self.post_later(SAVE_URL, {
+                'id': first.id, 'date': first.date.isoformat(), 'time': '09:00', 'text': 'Новый текст',
+                'duration': 1.5, 'is_recurring': True, 'version': first.version
+            })
+
+        self.measure('edit_series', self.make_series, edit)
+        self.measure('shift_series', self.make_series, lambda first: self.post_later(SHIFT_URL, {
+            'id': first.id, 'day_offset': 1, 'time': '09:30'
+        }))
+        self.measure('delete_series', self.make_series, lambda first: self.post_later(DELETE_URL, {
+            'id': first.id, 'delete_recurring': True
+        }))
+        self.measure('bulk_edit', self.make_series, lambda first: self.post_later(BULK_EDIT_URL, {
+            'filter': {'series_ids': [str(first.series_id)]}, 'set': {'duration': 1.5, 'color': 'red'}
+        }))
+
+    def test_single_event_writes(self):
+        def make_single(size):
+            # День переносимого события не должен опустеть (лишний DELETE маски)
+            self.make_schedule(size + 7)
+            return ScheduleEvent.objects.filter(date=self.MONDAY).earliest('time')
+
+        self.measure('edit_single', make_single, lambda event: self.post_later(SAVE_URL, {
+            'id': event.id, 'date': '2025-03-05', 'time': '23:00', 'text': 'Перенос', 'duration': 0.5,
+            'version': event.version
+        }))
+        self.measure('delete_single', make_single, lambda event: self.post_later(DELETE_URL, {'id': event.id}))
+
+    def test_series_creation_does_not_depend_on_horizon(self):
+        manager = EventManager.for_user(self.teacher)
+        counts = []
+        for weeks in (self.SMALL, self.LARGE):
+            with CaptureQueriesContext(connections['default']) as queries:
+                manager._create_future_recurring_events(
+                    self.MONDAY + timedelta(days=weeks), time(10), 'Урок', '', 1.0, uuid.uuid4(), weeks
+                )
+            counts.append(len(queries))
+        self.assertEqual(counts[0], counts[1])
+
+
+class StudentHistoryTest(ScheduleAPITestCase):
+    """Привязка серии к ученику одним UPDATE и история занятий по курсору"""
+
+    def setUp(self):
+        super().setUp()
+        self.student = Student.objects.create(first_name='Анна', last_name='Иванова', created_by=self.teacher)
+
+    def test_series_link_and_history_pages(self):
+        series = self.post(SAVE_URL, {
+            'date': '2025-03-03', 'time': '10:00', 'text': 'Урок', 'duration': 1.5, 'is_recurring': True
+        })
+        self.post(SAVE_URL, {
+            'date': '2025-03-03', 'time': '12:00', 'text': 'Разовый', 'duration': 1,
+            'student_id': self.student.id
+        })
+
+        with CaptureQueriesContext(connection) as queries:
+            linked = self.post(LINK_STUDENT_URL, {'id': series['id'], 'student_id': self.student.id})
+        self.assertEqual(linked['linked'], 53)
+        updates = [q for q in queries.captured_queries if q['sql'].startswith('UPDATE "scheduler_scheduleevent"')]
+        self.assertEqual(len(updates), 1)
+
+        # Редактирование серии без student_id не снимает привязку
+        self.post(SAVE_URL, {
+            'id': series['id'], 'date': '2025-03-03', 'time': '10:00', 'text': 'Урок 2',
+            'duration': 1.5, 'is_recurring': True
+        })
+        self.assertEqual(ScheduleEvent.objects.filter(student=self.student).count(), 54)
+
+        first = self.client.get(HISTORY_URL, {'student_id': self.student.id, 'limit': 20}).json()
+        self.assertEqual(first['stats']['lessons'], 54)
+        self.assertEqual(first['stats']['hours'], 53 * 1.5 + 1)
+        self.assertEqual(first['stats']['first_date'], '2025-03-03')
+
+        seen = [event['id'] for event in first['events']]
+        cursor = first['next_cursor']
+        while cursor:
+            page = self.client.get(HISTORY_URL, {'student_id': self.student.id, 'limit': 20, 'cursor': cursor}).json()
+            self.assertNotIn('stats', page)
+            seen.extend(event['id'] for event in page['events'])
+            cursor = page['next_cursor']
+
+        expected = ScheduleEvent.objects.filter(student=self.student).order_by('-date', '-time', '-id')
+        self.assertEqual(seen, list(expected.values_list('id', flat=True)))
+
+        students = self.client.get('/api/load-students/').json()['students']
+        self.assertEqual((students[0]['lessons'], students[0]['hours']), (54, 53 * 1.5 + 1))
+
+    def test_foreign_student_is_rejected(self):
+        other = User.objects.create_user('other', password='password')
+        foreign = Student.objects.create(first_name='Петр', last_name='Петров', created_by=other)
+        event = self.post(SAVE_URL, {'date': '2025-03-03', 'time': '10:00', 'text': 'Урок'})
+
+        response = self.client.post(LINK_STUDENT_URL, json.dumps({'id': event['id'], 'student_id': foreign.id}),
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(ScheduleEvent.objects.filter(student=foreign).exists())
+
+
+class EventSearchTest(ScheduleAPITestCase):
+    """Поиск по тексту: индекс следует за записями, серия сворачивается в одну строку"""
+
+    def search(self, query, **params):
+        response = self.client.get(SEARCH_URL, {'q': query, **params})
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def test_search_follows_writes(self):
+        series = self.post(SAVE_URL, {
+            'date': '2025-03-03', 'time': '10:00', 'text': 'Урок с Ивановым', 'is_recurring': True
+        })
+        single = self.post(SAVE_URL, {'date': '2025-03-04', 'time': '10:00', 'text': 'Консультация: Иванова'})
+        self.post(SAVE_URL, {'date': '2025-03-05', 'time': '10:00', 'text': 'Петров'})
+
+        found = self.search('иванов')
+        self.assertEqual(found['total'], 2)
+        hits = {result['event']['series_id']: result for result in found['results']}
+        self.assertEqual(hits[series['series_id']]['hits'], 53)
+        self.assertEqual(hits[series['series_id']]['event']['date'], '2025-03-03')
+        self.assertEqual(hits['None']['event']['id'], single['id'])
+
+        page = self.search('иванов', page=2, page_size=1)
+        self.assertEqual((page['total'], len(page['results'])), (2, 1))
+
+        # Переименование серии одним UPDATE обновляет индекс
+        self.post(SAVE_URL, {
+            'id': series['id'], 'date': '2025-03-03', 'time': '10:00', 'text': 'Урок с Сидоровым',
+            'is_recurring': True
+        })
+        self.assertEqual(self.search('иванов')['total'], 1)
+        self.assertEqual(self.search('сидоров урок')['results'][0]['hits'], 53)
+
+        self.post(DELETE_URL, {'id': single['id']})
+        self.assertEqual(self.search('иванов')['total'], 0)
+
+        # Чужие события не находятся
+        other = User.objects.create_user('other', password='password')
+        ScheduleEvent.objects.create(user=other, created_by=other, date=date(2025, 3, 3), time=time(9), text='Петров')
+        self.assertEqual(self.search('петров')['total'], 1)
+
+
+class MonthSummaryTest(ScheduleAPITestCase):
+    """Сводка месяца считается одним запросом, кэшируется и сбрасывается записями"""
+
+    def setUp(self):
+        super().setUp()
+        invalidate_months(self.teacher.id, [date(2025, 3, 1)])
+
+    def summary(self):
+        with CaptureQueriesContext(connection) as queries:
+            data = self.client.get(MONTH_URL, {'month': '2025-03'}).json()
+        return data, len(queries)
+
+    def test_day_aggregates_and_invalidation(self):
+        self.post(SAVE_URL, {'date': '2025-03-03', 'time': '09:00', 'text': 'А', 'color': 'red', 'duration': 1})
+        self.post(SAVE_URL, {'date': '2025-03-03', 'time': '11:30', 'text': 'Б', 'color': 'red', 'duration': 0.5})
+        single = self.post(SAVE_URL, {
+            'date': '2025-03-03', 'time': '14:00', 'text': 'В', 'color': 'blue', 'duration': 2
+        })
+        self.post(SAVE_URL, {'date': '2025-03-31', 'time': '10:00', 'text': 'Г', 'duration': 1})
+        self.post(SAVE_URL, {'date': '2025-04-01', 'time': '10:00', 'text': 'Апрель', 'duration': 1})
+
+        data, _ = self.summary()
+        self.assertEqual(data['days']['2025-03-03'], {
+            'count': 3, 'hours': 3.5, 'first_time': '09:00', 'last_time': '14:00',
+            'colors': [{'color': 'red', 'count': 2}, {'color': 'blue', 'count': 1}]
+        })
+        self.assertEqual(sorted(data['days']), ['2025-03-03', '2025-03-31'])
+        self.assertEqual(data['totals'], {'count': 4, 'hours': 4.5})
+
+        cached, queries = self.summary()
+        self.assertEqual(cached, data)
+        # Только пользователь сессии — сводка из кэша
+        self.assertEqual(queries, 1)
+
+        self.post(SAVE_URL, {
+            'id': single['id'], 'date': '2025-03-03', 'time': '15:00', 'text': 'В', 'color': 'red', 'duration': 2
+        })
+        data, _ = self.summary()
+        self.assertEqual(data['days']['2025-03-03']['colors'], [{'color': 'red', 'count': 3}])
+        self.assertEqual(data['days']['2025-03-03']['last_time'], '15:00')
+
+    @override_settings(SERIES_BACKGROUND_JOBS=True)
+    def test_invalidated_by_background_job(self):
+        self.post(SAVE_URL, {'date': '2025-03-03', 'time': '10:00', 'text': 'Урок', 'duration': 1, 'is_recurring': True})
+        data, _ = self.summary()
+        self.assertEqual(data['totals'], {'count': 1, 'hours': 1.0})
+
+        # Воркер пишет через EventManager.for_user, без запроса
+        call_command('run_jobs', once=True, threads=1, stdout=open(os.devnull, 'w'))
+
+        data, _ = self.summary()
+        self.assertEqual(data['totals'], {'count': 5, 'hours': 5.0})
+        self.assertEqual(sorted(data['days'])[-1], '2025-03-31')
+
+
+class CopyWeekTest(ScheduleAPITestCase):
+    """Копирование недели: одна вставка, общая проверка конфликтов, политики skip/overwrite"""
+
+    def make_week(self):
+        for day, hour in [(3, 9), (3, 11), (4, 10), (7, 15)]:
+            self.post(SAVE_URL, {'date': f'2025-03-0{day}', 'time': f'{hour}:00', 'text': f'Урок {day}', 'duration': 1})
+        self.post(SAVE_URL, {'date': '2025-03-05', 'time': '12:00', 'text': 'Серия', 'is_recurring': True})
+
+    def test_copy_to_following_weeks(self):
+        self.make_week()
+        blocker = self.post(SAVE_URL, {'date': '2025-03-18', 'time': '10:30', 'text': 'Занято', 'duration': 1})
+
+        with CaptureQueriesContext(connection) as queries:
+            result = self.post(COPY_WEEK_URL, {'week': '2025-03-05', 'weeks': 4})
+        self.assertLessEqual(len(queries), 15)
+        # Серия не копируется, одна копия попала на занятый слот
+        self.assertEqual((result['created'], result['skipped'], result['replaced']), (15, 1, 0))
+        self.assertFalse(ScheduleEvent.objects.filter(date='2025-03-18', time=time(10)).exists())
+        self.assertEqual(ScheduleEvent.objects.filter(date='2025-04-04', time=time(15)).count(), 1)
+
+        result = self.post(COPY_WEEK_URL, {
+            'week': '2025-03-03', 'target_week': '2025-03-17', 'policy': 'overwrite'
+        })
+        # Три копии первого прогона и блокирующее событие
+        self.assertEqual((result['created'], result['replaced']), (4, 4))
+        self.assertFalse(ScheduleEvent.objects.filter(id=blocker['id']).exists())
+        self.assertEqual(ScheduleEvent.objects.filter(date='2025-03-18', time=time(10)).count(), 1)
+
+        call_command('rebuild_occupancy', stdout=open(os.devnull, 'w'))
+        self.assertFalse(self.client.get(CONFLICT_URL, {'date': '2025-03-31', 'time': '08:00', 'duration': 1}).json()['hasConflict'])
+        self.assertTrue(self.client.get(CONFLICT_URL, {'date': '2025-03-31', 'time': '09:30', 'duration': 1}).json()['hasConflict'])
+
+        self.post(COPY_WEEK_URL, {'week': '2025-03-03', 'target_week': '2025-03-03'}, status=400)
+
+    def test_copy_to_other_user(self):
+        self.make_week()
+        other = User.objects.create_user('other', password='password')
+
+        result = self.post(COPY_WEEK_URL, {'week': '2025-03-03', 'to_user_id': other.id})
+        self.assertEqual(result['created'], 5)
+        copied = ScheduleEvent.objects.filter(user=other)
+        self.assertEqual(set(copied.values_list('date', flat=True)), {
+            date(2025, 3, 3), date(2025, 3, 4), date(2025, 3, 5), date(2025, 3, 7)
+        })
+        self.assertFalse(copied.filter(is_recurring=True).exists())
+
+        self.client.force_login(other)
+        self.post(COPY_WEEK_URL, {'week': '2025-03-03', 'to_user_id': self.teacher.id}, status=403)
+
+    def test_overwrite_keeps_events_user_may_not_delete(self):
+        assistant = User.objects.create_user('assistant', password='password')
+        self.client.force_login(assistant)
+        self.post(SAVE_URL, {'date': '2025-03-03', 'time': '09:00', 'text': 'Урок', 'duration': 1})
+        self.post(SAVE_URL, {'date': '2025-03-04', 'time': '09:00', 'text': 'Урок', 'duration': 1})
+        own = self.post(SAVE_URL, {'date': '2025-03-10', 'time': '09:30', 'text': 'Свое', 'duration': 1})
+        # Событие в расписании assistant, созданное администратором
+        foreign = ScheduleEvent.objects.create(
+            user=assistant, date=date(2025, 3, 11), time=time(9, 30), text='Чужое', created_by=self.teacher
+        )
+        call_command('rebuild_occupancy', stdout=open(os.devnull, 'w'))
+
+        result = self.post(COPY_WEEK_URL, {'week': '2025-03-03', 'policy': 'overwrite'})
+        self.assertEqual((result['created'], result['skipped'], result['replaced']), (1, 1, 1))
+        self.assertFalse(ScheduleEvent.objects.filter(id=own['id']).exists())
+        self.assertTrue(ScheduleEvent.objects.filter(id=foreign.id).exists())
+        self.assertFalse(ScheduleEvent.objects.filter(date='2025-03-11', time=time(9)).exists())
+
+
+class IdempotencyKeyTest(ScheduleAPITestCase):
+    """Повтор записи с тем же Idempotency-Key получает сохраненный ответ и ничего не пишет"""
+
+    def post_with_key(self, url, payload, key):
+        return self.client.post(url, json.dumps(payload), content_type='application/json',
+                                HTTP_IDEMPOTENCY_KEY=key)
+
+    def test_retried_writes_are_replayed(self):
+        series = {'date': '2025-03-03', 'time': '10:00', 'text': 'Урок', 'is_recurring': True}
+        first = self.post_with_key(SAVE_URL, series, 'create-1')
+        self.assertEqual(first.status_code, 200)
+
+        with CaptureQueriesContext(connection) as queries:
+            retry = self.post_with_key(SAVE_URL, series, 'create-1')
+        self.assertEqual(retry.json(), first.json())
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertFalse(any('INSERT INTO "scheduler_scheduleevent"' in q['sql'] for q in queries.captured_queries))
+        self.assertEqual(ScheduleEvent.objects.count(), 53)
+
+        # Тот же ключ с другим телом — ошибка клиента, а не чужой ответ
+        self.assertEqual(self.post_with_key(SAVE_URL, {**series, 'time': '11:00'}, 'create-1').status_code, 422)
+
+        # Ошибки валидации тоже воспроизводятся; без ключа запрос выполняется как обычно
+        self.assertEqual(self.post_with_key(SAVE_URL, series, 'create-2').json()['status'], 'error')
+        self.assertEqual(self.post_with_key(SAVE_URL, series, 'create-2').json()['status'], 'error')
+
+        delete = {'id': first.json()['id'], 'delete_recurring': True}
+        self.assertEqual(self.post_with_key(DELETE_URL, delete, 'delete-1').json()['status'], 'success')
+        self.assertEqual(self.post_with_key(DELETE_URL, delete, 'delete-1').json()['status'], 'success')
+        self.assertFalse(ScheduleEvent.objects.exists())
+
+        IdempotencyKey.objects.filter(key='create-1').update(created_at=timezone.now() - timedelta(days=2))
+        call_command('purge_idempotency_keys', stdout=open(os.devnull, 'w'))
+        self.assertEqual(
+            sorted(IdempotencyKey.objects.values_list('key', flat=True)), ['create-2', 'delete-1']
+        )
+
+
+    def test_abandoned_key_is_reclaimed(self):
+        payload = {'date': '2025-03-03', 'time': '10:00', 'text': 'Урок'}
+        digest = hashlib.sha256(SAVE_URL.encode() + b'\n' + json.dumps(payload).encode()).hexdigest()
+        # Первый запрос с ключом не завершился: процесс убит до записи ответа
+        IdempotencyKey.objects.create(user=self.teacher, key='abandoned', request_hash=digest)
+
+        self.assertEqual(self.post_with_key(SAVE_URL, payload, 'abandoned').status_code, 409)
+        self.assertFalse(ScheduleEvent.objects.exists())
+
+        IdempotencyKey.objects.filter(key='abandoned').update(created_at=timezone.now() - timedelta(minutes=10))
+        retry = self.post_with_key(SAVE_URL, payload, 'abandoned')
+        self.assertEqual(retry.json()['status'], 'success')
+        self.assertEqual(ScheduleEvent.objects.count(), 1)
+        self.assertEqual(self.post_with_key(SAVE_URL, payload, 'abandoned')['Idempotent-Replayed'], 'true')
+        self.assertEqual(ScheduleEvent.objects.count(), 1)
+
+class EventSlotUniquenessTest(ScheduleAPITestCase):
+    """Слот (user, date, time) уникален на уровне базы; старые дубликаты сливает dedupe_events"""
+
+    def assert_summaries_match_rebuild(self):
+        def snapshot():
+            return (
+                # Опустевшие недели инкрементальный путь оставляет с нулями
+                set(WeeklyWorkload.objects.exclude(event_count=0).values_list(
+                    'user_id', 'week_start', 'event_count', 'minutes'
+                )),
+                set(DayOccupancy.objects.values_list('user_id', 'date', 'busy', 'starts')),
+            )
+        incremental = snapshot()
+        call_command('rebuild_workload', stdout=open(os.devnull, 'w'))
+        call_command('rebuild_occupancy', stdout=open(os.devnull, 'w'))
+        self.assertEqual(incremental, snapshot())
+
+    def test_writes_rely_on_constraint(self):
+        taken = self.post(SAVE_URL, {'date': '2025-03-17', 'time': '10:00', 'text': 'Разовое'})
+        other = self.post(SAVE_URL, {'date': '2025-03-17', 'time': '12:00', 'text': 'Другое'})
+
+        response = self.post(SAVE_URL, {'date': '2025-03-17', 'time': '10:00', 'text': 'Дубль'}, status=400)
+        self.assertEqual(response['message'], 'Событие в это время уже существует')
+        self.post(SAVE_URL, {'id': other['id'], 'date': '2025-03-17', 'time': '10:00', 'text': 'Другое'}, status=400)
+        self.assertEqual(ScheduleEvent.objects.get(id=other['id']).time, time(12))
+
+        # Занятая дата серии пропускается INSERT ... ON CONFLICT DO NOTHING
+        series = self.post(SAVE_URL, {'date': '2025-03-03', 'time': '10:00', 'text': 'Урок', 'is_recurring': True})
+        self.assertEqual(ScheduleEvent.objects.filter(series_id=series['series_id']).count(), 52)
+        self.assertEqual(ScheduleEvent.objects.get(user=self.teacher, date='2025-03-17', time=time(10)).id, taken['id'])
+        self.assert_summaries_match_rebuild()
+
+        # Сдвиг на неделю: каждое событие встает на место следующего
+        self.post(DELETE_URL, {'id': taken['id']})
+        self.post(SHIFT_URL, {'id': series['id'], 'day_offset': 7})
+        dates = ScheduleEvent.objects.filter(series_id=series['series_id']).values_list('date', flat=True)
+        self.assertEqual(min(dates), date(2025, 3, 10))
+        self.assertEqual(len(set(dates)), 52)
+        self.assert_summaries_match_rebuild()
+
+    def test_bulk_writes_map_duplicate_slot(self):
+        series = self.post(SAVE_URL, {'date': '2025-03-03', 'time': '10:00', 'text': 'Урок', 'is_recurring': True})
+        self.post(SAVE_URL, {'date': '2025-03-05', 'time': '09:00', 'text': 'Разовое'})
+        # Метки нулевой длительности, записанные в обход API: проверки пересечений их не видят
+        for day in (date(2025, 3, 4), date(2025, 3, 12)):
+            ScheduleEvent.objects.create(
+                user=self.teacher, created_by=self.teacher, date=day, time=time(10 if day.day == 4 else 9),
+                text='Метка', duration=0
+            )
+
+        response = self.post(SHIFT_URL, {'id': series['id'], 'day_offset': 1}, status=400)
+        self.assertEqual(response['message'], 'Событие в это время уже существует')
+        self.assertTrue(ScheduleEvent.objects.filter(id=series['id'], date='2025-03-03').exists())
+
+        response = self.post(COPY_WEEK_URL, {'week': '2025-03-03'}, status=400)
+        self.assertEqual(response['message'], 'Событие в это время уже существует')
+        self.assertEqual(ScheduleEvent.objects.filter(date='2025-03-12').count(), 1)
+
+    def test_other_integrity_errors_are_not_duplicates(self):
+        with self.assertRaises(IntegrityError) as caught, transaction.atomic():
+            ScheduleEvent.objects.create(user=None, date=date(2025, 3, 3), time=time(10), text='Без владельца')
+        self.assertFalse(is_duplicate_slot(caught.exception))
+
+        self.post(SAVE_URL, {'date': '2025-03-03', 'time': '10:00', 'text': 'Урок'})
+        with self.assertRaises(IntegrityError) as caught, transaction.atomic():
+            ScheduleEvent.objects.create(user=self.teacher, date=date(2025, 3, 3), time=time(10), text='Дубль')
+        self.assertTrue(is_duplicate_slot(caught.exception))
+
+    def test_dedupe_events(self):
+        # База до миграции 0018: SQLite пересобирает таблицу по _meta модели
+        constraint = next(c for c in ScheduleEvent._meta.constraints if c.name == 'unique_event_slot')
+        with mock.patch.object(ScheduleEvent._meta, 'constraints', []), connection.schema_editor() as editor:
+            editor.remove_constraint(ScheduleEvent, constraint)
+        try:
+            student = Student.objects.create(first_name='Анна', last_name='Иванова', created_by=self.teacher)
+            slot = {'user': self.teacher, 'created_by': self.teacher, 'date': date(2025, 3, 3), 'time': time(10)}
+            ScheduleEvent.objects.bulk_create([
+                ScheduleEvent(text='Первое', **slot),
+                ScheduleEvent(text='Второе', student=student, **slot),
+                ScheduleEvent(text='Соседнее', **{**slot, 'time': time(11)}),
+                ScheduleEvent(text='Третье', duration=2, **slot),
+            ])
+            call_command('rebuild_workload', stdout=open(os.devnull, 'w'))
+            call_command('rebuild_occupancy', stdout=open(os.devnull, 'w'))
+
+            output = io.StringIO()
+            call_command('dedupe_events', batch_size=2, stdout=output)
+            self.assertIn('Удалено дубликатов: 2', output.getvalue())
+
+            survivor = ScheduleEvent.objects.get(date=date(2025, 3, 3), time=time(10))
+            self.assertEqual((survivor.text, survivor.student_id), ('Первое', student.id))
+            self.assertEqual(ScheduleEvent.objects.count(), 2)
+            self.assert_summaries_match_rebuild()
+        finally:
+            with connection.schema_editor() as editor:
+                editor.add_constraint(ScheduleEvent, constraint)
+                create_search_index(editor)
+
+
+class EventExportTest(ScheduleAPITestCase):
+    """Выгрузка событий потоком: CSV/NDJSON, итоги по пользователям, права"""
+
+    def setUp(self):
+        self.admin = User.objects.create_superuser('admin', password='password')
+        self.teacher = User.objects.create_user('teacher', password='password')
+        for user, day, hour, duration, text in [
+            (self.teacher, date(2025, 3, 3), 9, 1.5, 'Урок, "дробь"'),
+            (self.teacher, date(2025, 3, 31), 10, 1, 'Март'),
+            (self.teacher, date(2025, 5, 1), 10, 1, 'Вне периода'),
+            (self.admin, date(2025, 3, 4), 12, 0.25, 'Созвон'),
+        ]:
+            ScheduleEvent.objects.create(user=user, date=day, time=time(hour), duration=duration, text=text)
+
+    def export(self, status=200, **params):
+        response = self.client.get(EXPORT_URL, {'date_from': '2025-01-01', 'date_to': '2025-04-30', **params})
+        self.assertEqual(response.status_code, status)
+        if status != 200:
+            return response.json()
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode('utf-8')
+
+    def test_csv_with_totals(self):
+        self.client.force_login(self.admin)
+        content = self.export(totals='1')
+        self.assertTrue(content.startswith('\ufeff'))
+        rows = list(csv.DictReader(io.StringIO(content.lstrip('\ufeff'))))
+
+        self.assertEqual(
+            [(row['record'], row['username'], row['date'], row['time'], row['text']) for row in rows],
+            [
+                ('event', 'admin', '2025-03-04', '12:00', 'Созвон'),
+                ('total', 'admin', '', '', ''),
+                ('event', 'teacher', '2025-03-03', '09:00', 'Урок, "дробь"'),
+                ('event', 'teacher', '2025-03-31', '10:00', 'Март'),
+                ('total', 'teacher', '', '', ''),
+            ]
+        )
+        self.assertEqual((rows[4]['duration'], rows[4]['event_count']), ('2.5', '2'))
+        self.assertEqual((rows[1]['duration'], rows[1]['event_count']), ('0.25', '1'))
+
+    def test_csv_escapes_formulas(self):
+        for hour, text in [(13, '=HYPERLINK("http://x","y")'), (14, '+7 900'), (15, '-1'), (16, '@SUM(A1)')]:
+            ScheduleEvent.objects.create(user=self.admin, date=date(2025, 3, 5), time=time(hour), text=text)
+        self.client.force_login(self.admin)
+        rows = list(csv.DictReader(io.StringIO(self.export(user_ids=str(self.admin.id)).lstrip('\ufeff'))))
+        self.assertEqual(
+            [row['text'] for row in rows],
+            ['Созвон', '\'=HYPERLINK("http://x","y")', "'+7 900", "'-1", "'@SUM(A1)"]
+        )
+
+        # В NDJSON — исходный текст
+        records = [json.loads(line) for line in self.export(format='ndjson', user_ids=str(self.admin.id)).splitlines()]
+        self.assertEqual(records[-1]['text'], '@SUM(A1)')
+
+    def test_ndjson_is_limited_to_own_events(self):
+        self.client.force_login(self.teacher)
+        content = self.export(format='ndjson', user_ids=str(self.admin.id))
+        records = [json.loads(line) for line in content.splitlines()]
+        self.assertEqual([record['text'] for record in records], ['Урок, "дробь"', 'Март'])
+        self.assertEqual(records[0]['duration'], 1.5)
+
+        self.client.force_login(self.admin)
+        content = self.export(format='ndjson', user_ids=str(self.teacher.id), totals='1')
+        total = json.loads(content.splitlines()[-1])
+        self.assertEqual(total, {
+            'record': 'total', 'user_id': self.teacher.id, 'username': 'teacher',
+            'duration': 2.5, 'event_count': 2
+        })
+
+        self.export(status=400, format='xml')
+        self.export(status=400, date_from='2025-05-01')
+
+    def test_command_matches_endpoint(self):
+        self.client.force_login(self.admin)
+        output = io.StringIO()
+        call_command(
+            'export_events', '--date-from=2025-01-01', '--date-to=2025-04-30',
+            '--format=ndjson', '--totals', '--chunk-size=1', stdout=output
+        )
+        self.assertEqual(output.getvalue(), self.export(format='ndjson', totals='1'))
+
+
+@override_settings(AUDIT_LOG_ENABLED=True)
+class AuditLogTest(ScheduleAPITestCase):
+    """Журнал изменений: запись после коммита, пакетами вне запроса, одна запись на серию"""
+
+    def setUp(self):
+        audit.writer.flush()
+        self.admin = User.objects.create_superuser('admin', password='password')
+        self.teacher = User.objects.create_user('teacher', password='password')
+        self.client.force_login(self.admin)
+
+    def log(self, **params):
+        response = self.client.get(AUDIT_URL, params)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def test_write_paths_are_logged_behind_the_request(self):
+        with CaptureQueriesContext(connection) as queries:
+            series = self.post(SAVE_URL, {'date': '2025-03-03', 'time': '10:00', 'text': 'Урок', 'is_recurring': True})
+        self.assertFalse([query for query in queries if 'scheduler_auditentry' in query['sql']])
+        self.assertEqual(AuditEntry.objects.count(), 0)
+
+        single = self.post(SAVE_URL, {'date': '2025-03-04', 'time': '12:00', 'text': 'Разовое'})
+        self.post(SAVE_URL, {'id': single['id'], 'date': '2025-03-04', 'time': '13:00', 'text': 'Перенос'})
+        # Откаченная запись в журнал не попадает
+        self.post(SAVE_URL, {'date': '2025-03-10', 'time': '10:00', 'text': 'Дубль'}, status=400)
+        self.post(DELETE_URL, {'id': series['id'], 'delete_recurring': True})
+        self.assertEqual(audit.writer.flush(), 4)
+
+        entries = self.log()['results']
+        self.assertEqual(
+            [(entry['action'], entry['count'], entry['actor']) for entry in entries],
+            [('delete_series', 53, 'admin'), ('update', None, 'admin'), ('create', None, 'admin'),
+             ('create_series', 53, 'admin')]
+        )
+        self.assertEqual(entries[1]['changes'], {'time': ['12:00', '13:00'], 'text': ['Разовое', 'Перенос']})
+        self.assertEqual(entries[0]['series_id'], series['series_id'])
+
+        page = self.log(page=2, page_size=3)
+        self.assertEqual((len(page['results']), page['has_more']), (1, False))
+        self.assertEqual(len(self.log(series_id=series['series_id'])['results']), 2)
+
+        # Остальные видят только изменения своего расписания
+        self.client.force_login(self.teacher)
+        self.post(SAVE_URL, {'date': '2025-03-04', 'time': '12:00', 'text': 'Свое'})
+        audit.writer.flush()
+        self.assertEqual([entry['action'] for entry in self.log(user_id=self.admin.id)['results']], ['create'])
+
+    def test_full_queue_and_shutdown_do_not_lose_entries(self):
+        writer = audit.AuditWriter(maxsize=1, batch_size=10, flush_seconds=3600)
+        entries = [
+            AuditEntry(actor_id=self.admin.id, user_id=self.admin.id, action='create', event_id=event_id)
+            for event_id in (1, 2)
+        ]
+        with self.assertLogs('scheduler.audit', 'WARNING'):
+            for entry in entries:
+                writer.submit(entry)
+        # Вторая запись не поместилась в очередь и вставлена сразу
+        self.assertEqual(list(AuditEntry.objects.values_list('event_id', flat=True)), [2])
+
+        writer.stop()
+        self.assertFalse(writer.thread.is_alive())
+        self.assertEqual(sorted(AuditEntry.objects.values_list('event_id', flat=True)), [1, 2])
+
+    def test_admin_is_read_only(self):
+        entry = AuditEntry.objects.create(actor_id=self.admin.id, user_id=self.admin.id, action='create', event_id=1)
+        self.client.force_login(self.admin)
+        admin_url = '/admin/scheduler/auditentry/'
+
+        self.assertEqual(self.client.get(admin_url).status_code, 200)
+        self.assertEqual(self.client.get(f'{admin_url}{entry.id}/change/').status_code, 200)
+        self.assertEqual(self.client.get(admin_url + 'add/').status_code, 403)
+        self.assertEqual(self.client.post(f'{admin_url}{entry.id}/change/', {'action': 'delete'}).status_code, 403)
+        self.assertEqual(self.client.post(f'{admin_url}{entry.id}/delete/', {'post': 'yes'}).status_code, 403)
+        self.assertEqual(AuditEntry.objects.get().action, 'create')
+
+
+class BulkEditTest(ScheduleAPITestCase):
+    """Массовое изменение по фильтру: один UPDATE, сводки и версии остаются согласованными"""
+
+    def setUp(self):
+        super().setUp()
+        invalidate_months(self.teacher.id, [date(2025, 3, 1)])
+
+    def test_dry_run_and_update(self):
+        series = self.post(SAVE_URL, {
+            'date': '2025-03-03', 'time': '10:00', 'text': 'Английский', 'color': 'blue', 'is_recurring': True
+        })
+        other = self.post(SAVE_URL, {'date': '2025-03-04', 'time': '10:00', 'text': 'Английский', 'color': 'green'})
+        self.post(SAVE_URL, {'date': '2025-03-05', 'time': '10:00', 'text': 'Математика', 'color': 'blue'})
+        self.client.get(MONTH_URL, {'month': '2025-03'})
+
+        request = {
+            'filter': {'date_from': '2025-03-01', 'date_to': '2025-03-31', 'text': 'Англ'},
+            'set': {'color': 'red', 'duration': 1.5},
+        }
+        with CaptureQueriesContext(connection) as queries:
+            preview = self.post(BULK_EDIT_URL, {**request, 'dry_run': True})
+        self.assertEqual((preview['matched'], preview['series'], preview['updated']), (6, 1, 0))
+        self.assertFalse([query for query in queries if query['sql'].startswith('UPDATE')])
+
+        result = self.post(BULK_EDIT_URL, request)
+        self.assertEqual((result['matched'], result['updated']), (6, 6))
+        march = ScheduleEvent.objects.filter(date__range=('2025-03-01', '2025-03-31'), text='Английский')
+        self.assertEqual(set(march.values_list('color', 'duration', 'version')), {('red', 1.5, 2)})
+        self.assertEqual(ScheduleEvent.objects.get(series_id=series['series_id'], date='2025-04-07').color, 'blue')
+
+        # Сводки пересчитаны, кэш месяца сброшен
+        self.assertEqual(
+            self.client.get(MONTH_URL, {'month': '2025-03'}).json()['days']['2025-03-04']['colors'],
+            [{'color': 'red', 'count': 1}]
+        )
+        def summaries():
+            return (
+                set(WeeklyWorkload.objects.values_list('week_start', 'event_count', 'minutes')),
+                set(DayOccupancy.objects.values_list('date', 'busy', 'starts')),
+            )
+        incremental = summaries()
+        call_command('rebuild_workload', stdout=open(os.devnull, 'w'))
+        call_command('rebuild_occupancy', stdout=open(os.devnull, 'w'))
+        self.assertEqual(incremental, summaries())
+
+        self.post(SAVE_URL, {
+            'id': other['id'], 'date': '2025-03-04', 'time': '10:00', 'text': 'Английский', 'version': 1
+        }, status=409)
+
+        self.post(BULK_EDIT_URL, {'filter': {}, 'set': {'color': 'red'}}, status=400)
+        self.post(BULK_EDIT_URL, {'filter': {'color': 'red'}, 'set': {'version': 1}}, status=400)
+
+    def test_non_superuser_edits_only_own_events(self):
+        assistant = User.objects.create_user('assistant', password='password')
+        self.client.force_login(assistant)
+        own = self.post(SAVE_URL, {
+            'date': '2025-03-03', 'time': '10:00', 'text': 'Английский', 'color': 'blue', 'is_recurring': True
+        })
+        # Событие в расписании assistant, созданное администратором
+        foreign = ScheduleEvent.objects.create(
+            user=assistant, date=date(2025, 3, 4), time=time(10, 0), text='Английский', color='blue',
+            created_by=self.teacher
+        )
+
+        result = self.post(BULK_EDIT_URL, {
+            'filter': {'date_from': '2025-03-01', 'date_to': '2025-03-31', 'text': 'Англ'},
+            'set': {'color': 'red'},
+        })
+        self.assertEqual((result['matched'], result['updated']), (5, 5))
+        foreign.refresh_from_db()
+        self.assertEqual((foreign.color, foreign.version), ('blue', 1))
+        self.assertEqual(
+            set(ScheduleEvent.objects.filter(series_id=own['series_id'], date__month=3, date__year=2025)
+                .values_list('color', flat=True)),
+            {'red'}
+        )
@@ -5,16 +5,30 @@ from . import students_views
 
 urlpatterns = [
     path('save-event/', views.save_event, name='save_event'),
+    path('shift-series/', views.shift_series, name='shift_series'),
     path('load-events/', views.load_events, name='load_events'),
+    path('load-users-overview/', views.load_users_overview, name='load_users_overview'),
     path('load-series-events/', views.load_series_events, name='load_series_events'),
     path('check-event-conflict/', views.check_event_conflict, name='check_event_conflict'),
+    path('load-occupancy/', views.load_occupancy_range, name='load_occupancy'),
+    path('month-summary/', views.month_summary, name='month_summary'),
+    path('search-events/', views.search_events, name='search_events'),
+    path('workload-summary/', views.workload_summary, name='workload_summary'),
+    path('audit-log/', views.audit_log, name='audit_log'),
+    path('export-events/', views.export_events, name='export_events'),
     path('delete-event/', views.delete_event, name='delete_event'),
+    path('job-status/', views.job_status, name='job_status'),
+    path('link-student/', views.link_student, name='link_student'),
+    path('bulk-edit-events/', views.bulk_edit_events, name='bulk_edit_events'),
+    path('copy-week/', views.copy_week, name='copy_week'),
     path('switch_user/', views.switch_user, name='switch_user'),
     path('get_users_list/', views.get_users_list, name='get_users_list'),
+    path('users-directory/', views.users_directory, name='users_directory'),
     path('signup/', views.signup, name='signup'),  # ← Добавляем регистрацию
 
     path('students/', students_views.students_page, name='students_page'),
     path('save-student/', students_views.save_student, name='save_student'),
     path('load-students/', students_views.load_students, name='load_students'),
     path('delete-student/', students_views.delete_student, name='delete_student'),
+    path('student-history/', students_views.student_history, name='student_history'),
 ]
@@ -1,12 +1,15 @@
+import itertools
 import json
+import uuid
 
 from django.contrib.auth.decorators import login_required
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_POST
 
-from django.http import JsonResponse
+from django.core.cache import cache
+from django.http import JsonResponse, StreamingHttpResponse
 
-from .models import ScheduleEvent
+from .models import AuditEntry, BackgroundJob, ScheduleEvent, WeeklyWorkload
 
 from django.shortcuts import render, redirect
 from django.contrib.auth.forms import UserCreationForm
@@ -14,7 +17,23 @@ from django.contrib.auth import login
 
 from django.contrib.auth.models import User
 
-from .event_manager import EventManager
+from . import audit
+from .cache_keys import USERS_DIRECTORY_CACHE_KEY, USERS_DIRECTORY_CACHE_TIMEOUT
+from .event_manager import STALE_EVENT_MESSAGE, EventConflictError, EventManager, StaleEventError
+from .export import EXPORT_CHUNK_SIZE, EXPORT_CONTENT_TYPES, export_queryset, render_export
+from .idempotency import idempotent
+from .jobs import serialize_job
+from .locks import user_schedule_lock
+from .month_summary import get_month_summary
+from .occupancy import SLOT_MINUTES, OccupancyDelta, load_occupancy, slot_mask
+from .search import search_terms, search_user_events
+from .serializers import serialize_event
+from .workload import WorkloadDelta, week_start
+
+SEARCH_PAGE_SIZE = 20
+SEARCH_MAX_PAGE_SIZE = 100
+AUDIT_PAGE_SIZE = 50
+AUDIT_MAX_PAGE_SIZE = 200
 
 # def get_target_user(request):
 #     """Определяет целевого пользователя для операций"""
@@ -274,6 +293,7 @@ from .event_manager import EventManager
 @csrf_exempt
 @require_POST
 @login_required
+@idempotent
 def save_event(request):
     try:
         # Просто создаем менеджер с request
@@ -296,6 +316,16 @@ def save_event(request):
             {'status': 'error', 'message': str(e)}, 
             status=403
         )
+    except StaleEventError as e:
+        return JsonResponse(
+            {'status': 'error', 'message': str(e)}, 
+            status=409
+        )
+    except EventConflictError as e:
+        return JsonResponse(
+            {'status': 'error', 'message': str(e), 'conflictingEvents': e.conflicts},
+            status=409
+        )
     except ValueError as e:
         return JsonResponse(
             {'status': 'error', 'message': str(e)}, 
@@ -317,6 +347,182 @@ def save_event(request):
             status=500
         )
 
+def load_week_events(target_user, date_from, date_to):
+    """События пользователя за период в формате API"""
+    events = ScheduleEvent.objects.filter(
+        user=target_user,
+        date__range=[date_from, date_to]
+    )
+    return [serialize_event(event) for event in events]
+
+
+@csrf_exempt
+@require_POST
+@login_required
+def shift_series(request):
+    """Сдвиг серии на несколько дней и/или новое время одной операцией"""
+    try:
+        manager = EventManager(request)
+        data = json.loads(request.body)
+
+        return JsonResponse(manager.shift_series(data))
+
+    except ScheduleEvent.DoesNotExist:
+        return JsonResponse(
+            {'status': 'error', 'message': 'Событие не найдено'},
+            status=404
+        )
+    except PermissionError as e:
+        return JsonResponse(
+            {'status': 'error', 'message': str(e)},
+            status=403
+        )
+    except StaleEventError as e:
+        return JsonResponse(
+            {'status': 'error', 'message': str(e)},
+            status=409
+        )
+    except json.JSONDecodeError:
+        return JsonResponse(
+            {'status': 'error', 'message': 'Неверный формат JSON'},
+            status=400
+        )
+    except (KeyError, ValueError) as e:
+        return JsonResponse(
+            {'status': 'error', 'message': str(e)},
+            status=400
+        )
+    except Exception as e:
+        import logging
+        logger = logging.getLogger(__name__)
+        logger.error(f"Error in shift_series: {e}", exc_info=True)
+
+        return JsonResponse(
+            {'status': 'error', 'message': 'Внутренняя ошибка сервера'},
+            status=500
+        )
+
+@csrf_exempt
+@require_POST
+@login_required
+@idempotent
+def bulk_edit_events(request):
+    """Массовое изменение цвета, текста и продолжительности событий по фильтру (dry_run — подсчет)"""
+    try:
+        manager = EventManager(request)
+        data = json.loads(request.body)
+
+        return JsonResponse(manager.bulk_edit(data))
+
+    except json.JSONDecodeError:
+        return JsonResponse(
+            {'status': 'error', 'message': 'Неверный формат JSON'},
+            status=400
+        )
+    except (KeyError, TypeError, ValueError) as e:
+        return JsonResponse(
+            {'status': 'error', 'message': str(e)},
+            status=400
+        )
+    except Exception as e:
+        import logging
+        logger = logging.getLogger(__name__)
+        logger.error(f"Error in bulk_edit_events: {e}", exc_info=True)
+
+        return JsonResponse(
+            {'status': 'error', 'message': 'Внутренняя ошибка сервера'},
+            status=500
+        )
+
+
+@csrf_exempt
+@require_POST
+@login_required
+@idempotent
+def copy_week(request):
+    """Копирование недели на следующие недели (или в расписание другого пользователя)"""
+    try:
+        manager = EventManager(request)
+        data = json.loads(request.body)
+
+        return JsonResponse(manager.copy_week(data))
+
+    except User.DoesNotExist:
+        return JsonResponse(
+            {'status': 'error', 'message': 'Пользователь не найден'},
+            status=404
+        )
+    except PermissionError as e:
+        return JsonResponse(
+            {'status': 'error', 'message': str(e)},
+            status=403
+        )
+    except json.JSONDecodeError:
+        return JsonResponse(
+            {'status': 'error', 'message': 'Неверный формат JSON'},
+            status=400
+        )
+    except (KeyError, ValueError) as e:
+        return JsonResponse(
+            {'status': 'error', 'message': str(e)},
+            status=400
+        )
+    except Exception as e:
+        import logging
+        logger = logging.getLogger(__name__)
+        logger.error(f"Error in copy_week: {e}", exc_info=True)
+
+        return JsonResponse(
+            {'status': 'error', 'message': 'Внутренняя ошибка сервера'},
+            status=500
+        )
+
+@csrf_exempt
+@require_POST
+@login_required
+def link_student(request):
+    """Привязка события (по умолчанию — всей его серии) к ученику"""
+    try:
+        manager = EventManager(request)
+        data = json.loads(request.body)
+
+        return JsonResponse(manager.link_student(data))
+
+    except ScheduleEvent.DoesNotExist:
+        return JsonResponse(
+            {'status': 'error', 'message': 'Событие не найдено'},
+            status=404
+        )
+    except PermissionError as e:
+        return JsonResponse(
+            {'status': 'error', 'message': str(e)},
+            status=403
+        )
+    except StaleEventError as e:
+        return JsonResponse(
+            {'status': 'error', 'message': str(e)},
+            status=409
+        )
+    except json.JSONDecodeError:
+        return JsonResponse(
+            {'status': 'error', 'message': 'Неверный формат JSON'},
+            status=400
+        )
+    except (KeyError, ValueError) as e:
+        return JsonResponse(
+            {'status': 'error', 'message': str(e)},
+            status=400
+        )
+    except Exception as e:
+        import logging
+        logger = logging.getLogger(__name__)
+        logger.error(f"Error in link_student: {e}", exc_info=True)
+
+        return JsonResponse(
+            {'status': 'error', 'message': 'Внутренняя ошибка сервера'},
+            status=500
+        )
+
 @csrf_exempt
 @login_required
 def load_events(request):
@@ -331,32 +537,81 @@ def load_events(request):
         date_from_obj=datetime.strptime(date_from,'%Y-%m-%d').date()
         date_to_obj=datetime.strptime(date_to,'%Y-%m-%d').date()
 
-        events=ScheduleEvent.objects.filter(
-            user=target_user,
-            date__range=[date_from_obj,date_to_obj]
-        ).select_related('created_by', 'user')
-
-        events_data=[]
-        for event in events:
-            time_str = event.time.strftime('%H:%M')
-
-            events_data.append({
-                'id': event.id,
-                'series_id': str(event.series_id),
-                'date':event.date.strftime('%Y-%m-%d'),
-                'time':time_str,
-                'text': event.text,
-                'color': event.color,
-                'is_recurring': event.is_recurring,
-                'duration': float(event.duration),
-                'created_by': event.created_by.id,  # ← ДОБАВЬТЕ ЭТО
-                'user_id': event.user.id  # ← ДОБАВЬТЕ ЭТО
-            })
+        events_data = load_week_events(target_user, date_from_obj, date_to_obj)
         return  JsonResponse({'status': 'success', 'events': events_data})
 
     except Exception as e:
         return JsonResponse({'status': 'error', 'message': str(e)})
     
+OVERVIEW_EVENT_FIELDS = [
+    'id', 'series_id', 'date', 'time', 'text', 'color', 'is_recurring', 'duration', 'created_by'
+]
+
+
+@login_required
+def load_users_overview(request):
+    """Сводка событий нескольких пользователей за период (только для суперпользователя).
+
+    Не трогает request.session['target_user_id']: все события выбираются одним
+    запросом и группируются по пользователям в компактном виде — список полей
+    передается один раз, а каждое событие — массивом значений.
+    """
+    if not request.user.is_superuser:
+        return JsonResponse({'status': 'error', 'message': 'Доступ запрещен'}, status=403)
+
+    try:
+        from datetime import datetime
+        date_from_obj = datetime.strptime(request.GET.get('date_from'), '%Y-%m-%d').date()
+        date_to_obj = datetime.strptime(request.GET.get('date_to'), '%Y-%m-%d').date()
+
+        # user_ids=1,2,3 — конкретные пользователи, без параметра — все
+        user_ids_param = request.GET.get('user_ids', '').strip()
+        users = User.objects.order_by('username')
+        if user_ids_param:
+            user_ids = [int(user_id) for user_id in user_ids_param.split(',') if user_id.strip()]
+            users = users.filter(id__in=user_ids)
+
+        users_data = {
+            user_id: {'id': user_id, 'username': username, 'events': []}
+            for user_id, username in users.values_list('id', 'username')
+        }
+
+        events = ScheduleEvent.objects.filter(
+            user_id__in=list(users_data),
+            date__range=[date_from_obj, date_to_obj]
+        ).order_by('user_id', 'date', 'time').values_list(
+            'user_id', 'id', 'series_id', 'date', 'time', 'text', 'color',
+            'is_recurring', 'duration', 'created_by_id'
+        )
+
+        for user_id, event_id, series_id, date, time, text, color, is_recurring, duration, created_by in events:
+            users_data[user_id]['events'].append([
+                event_id,
+                str(series_id),
+                date.strftime('%Y-%m-%d'),
+                time.strftime('%H:%M'),
+                text,
+                color,
+                is_recurring,
+                float(duration),
+                created_by
+            ])
+
+        return JsonResponse({
+            'status': 'success',
+            'fields': OVERVIEW_EVENT_FIELDS,
+            'users': list(users_data.values())
+        })
+
+    except (TypeError, ValueError):
+        return JsonResponse({
+            'status': 'error',
+            'message': 'Неверные параметры: date_from, date_to (YYYY-MM-DD), user_ids (1,2,3)'
+        }, status=400)
+    except Exception as e:
+        return JsonResponse({'status': 'error', 'message': str(e)})
+
+
 @csrf_exempt
 @login_required
 def load_series_events(request):
@@ -372,24 +627,9 @@ def load_series_events(request):
         events = ScheduleEvent.objects.filter(
             user=target_user,
             series_id=series_id
-        ).select_related('created_by', 'user')
-
-        events_data = []
-        for event in events:
-            time_str = event.time.strftime('%H:%M')
-
-            events_data.append({
-                'id': event.id,
-                'series_id': str(event.series_id),
-                'date': event.date.strftime('%Y-%m-%d'),
-                'time': time_str,
-                'text': event.text,
-                'color': event.color,
-                'is_recurring': event.is_recurring,
-                'duration': float(event.duration),
-                'created_by': event.created_by.id,
-                'user_id': event.user.id
-            })
+        )
+
+        events_data = [serialize_event(event) for event in events]
         
         return JsonResponse({'status': 'success', 'events': events_data})
 
@@ -445,6 +685,14 @@ def check_event_conflict(request):
                 'message': 'Неверный формат продолжительности'
             }, status=400)
         
+        # Маска занятости дня не пересекается со слотом — конфликта точно нет
+        busy = load_occupancy(target_user.id, [date_obj]).get(date_obj, (0, 0))[0]
+        if not busy & slot_mask(time_obj, duration_hours):
+            return JsonResponse({
+                'hasConflict': False,
+                'message': 'Конфликтов не обнаружено'
+            })
+
         # Вычисляем время окончания события
         start_datetime = datetime.combine(date_obj, time_obj)
         end_datetime = start_datetime + timedelta(hours=duration_hours)
@@ -500,9 +748,301 @@ def check_event_conflict(request):
             'message': f'Ошибка при проверке конфликта: {str(e)}'
         }, status=500)
 
+@login_required
+def search_events(request):
+    """
+    Полнотекстовый поиск по тексту событий целевого пользователя за всю историю.
+
+    Серия возвращается одной строкой: самое релевантное событие, число
+    совпавших событий (hits) и диапазон дат. Пагинация — page/page_size.
+    """
+    try:
+        query = request.GET.get('q', '').strip()
+        page = int(request.GET.get('page', 1))
+        page_size = min(int(request.GET.get('page_size', SEARCH_PAGE_SIZE)), SEARCH_MAX_PAGE_SIZE)
+        if page < 1 or page_size < 1:
+            raise ValueError(page)
+    except ValueError:
+        return JsonResponse({'status': 'error', 'message': 'Неверные параметры'}, status=400)
+
+    if not search_terms(query):
+        return JsonResponse({'status': 'error', 'message': 'Пустой поисковый запрос'}, status=400)
+
+    target_user = EventManager(request).target_user
+    total, rows = search_user_events(target_user.id, query, page_size, (page - 1) * page_size)
+    events = ScheduleEvent.objects.in_bulk([row['id'] for row in rows])
+
+    return JsonResponse({
+        'status': 'success',
+        'total': total,
+        'page': page,
+        'page_size': page_size,
+        'results': [
+            {
+                'event': serialize_event(events[row['id']]),
+                'hits': row['hits'],
+                'first_date': row['first_date'],
+                'last_date': row['last_date'],
+                'rank': row['rank']
+            }
+            for row in rows
+            # Событие могли удалить между двумя запросами
+            if row['id'] in events
+        ]
+    })
+
+
+@login_required
+def month_summary(request):
+    """Агрегаты по дням месяца (?month=YYYY-MM): число событий, часы, первое/последнее время, цвета"""
+    try:
+        from datetime import datetime
+        month = datetime.strptime(request.GET.get('month'), '%Y-%m')
+    except (TypeError, ValueError):
+        return JsonResponse({'status': 'error', 'message': 'Неверный параметр month (YYYY-MM)'}, status=400)
+
+    target_user = EventManager(request).target_user
+    return JsonResponse({
+        'status': 'success',
+        'month': month.strftime('%Y-%m'),
+        **get_month_summary(target_user.id, month.year, month.month)
+    })
+
+
+@login_required
+def load_occupancy_range(request):
+    """Занятость расписания по дням: битовые маски 15-минутных слотов (hex, младший бит — 00:00)"""
+    try:
+        from datetime import datetime, timedelta
+        manager = EventManager(request)
+        date_from_obj = datetime.strptime(request.GET.get('date_from'), '%Y-%m-%d').date()
+        date_to_obj = datetime.strptime(request.GET.get('date_to'), '%Y-%m-%d').date()
+        if not 0 <= (date_to_obj - date_from_obj).days <= 92:
+            raise ValueError('Диапазон больше 3 месяцев')
+
+        dates = [date_from_obj + timedelta(days=day) for day in range((date_to_obj - date_from_obj).days + 1)]
+        occupancy = load_occupancy(manager.target_user.id, dates)
+
+        return JsonResponse({
+            'status': 'success',
+            'slot_minutes': SLOT_MINUTES,
+            'days': {
+                date.strftime('%Y-%m-%d'): format(busy, '024x')
+                for date, (busy, _) in sorted(occupancy.items())
+            }
+        })
+
+    except (TypeError, ValueError):
+        return JsonResponse({
+            'status': 'error',
+            'message': 'Неверные параметры: date_from, date_to (YYYY-MM-DD, не больше 3 месяцев)'
+        }, status=400)
+    except Exception as e:
+        return JsonResponse({'status': 'error', 'message': str(e)})
+
+
+@login_required
+def job_status(request):
+    """Состояние фоновой задачи (например, создания будущих событий серии)"""
+    try:
+        job = BackgroundJob.objects.get(id=request.GET.get('id'))
+    except (BackgroundJob.DoesNotExist, ValueError):
+        return JsonResponse({'status': 'error', 'message': 'Задача не найдена'}, status=404)
+
+    if not request.user.is_superuser and request.user.id not in (job.user_id, job.created_by_id):
+        return JsonResponse({'status': 'error', 'message': 'Доступ запрещен'}, status=403)
+
+    return JsonResponse({'status': 'success', 'job': serialize_job(job)})
+
+
+@login_required
+def workload_summary(request):
+    """Нагрузка (количество событий и часы) по неделям или месяцам из сводной таблицы.
+
+    Суперпользователь получает всех пользователей (или user_ids=1,2,3),
+    остальные — только свое расписание. Неделя относится к месяцу,
+    в который попадает ее четверг (как в ISO 8601).
+    """
+    try:
+        from datetime import datetime, timedelta
+        date_from_obj = datetime.strptime(request.GET.get('date_from'), '%Y-%m-%d').date()
+        date_to_obj = datetime.strptime(request.GET.get('date_to'), '%Y-%m-%d').date()
+        group_by = request.GET.get('group_by', 'week')
+        if group_by not in ('week', 'month'):
+            raise ValueError(group_by)
+
+        rows = WeeklyWorkload.objects.filter(
+            week_start__range=[week_start(date_from_obj), date_to_obj],
+            event_count__gt=0
+        )
+
+        if request.user.is_superuser:
+            user_ids_param = request.GET.get('user_ids', '').strip()
+            if user_ids_param:
+                user_ids = [int(user_id) for user_id in user_ids_param.split(',') if user_id.strip()]
+                rows = rows.filter(user_id__in=user_ids)
+        else:
+            rows = rows.filter(user=request.user)
+
+        totals = {}
+        for user_id, username, week, event_count, minutes in rows.order_by(
+            'user__username', 'week_start'
+        ).values_list('user_id', 'user__username', 'week_start', 'event_count', 'minutes'):
+            if group_by == 'week':
+                iso_year, iso_week, _ = week.isocalendar()
+                period = f'{iso_year}-W{iso_week:02d}'
+            else:
+                period = (week + timedelta(days=3)).strftime('%Y-%m')
+
+            key = (user_id, period)
+            if key not in totals:
+                totals[key] = {
+                    'user_id': user_id,
+                    'username': username,
+                    'period': period,
+                    'event_count': 0,
+                    'minutes': 0
+                }
+            totals[key]['event_count'] += event_count
+            totals[key]['minutes'] += minutes
+
+        summary = [
+            {
+                'user_id': row['user_id'],
+                'username': row['username'],
+                'period': row['period'],
+                'event_count': row['event_count'],
+                'hours': round(row['minutes'] / 60, 2)
+            }
+            for row in totals.values()
+        ]
+
+        return JsonResponse({'status': 'success', 'group_by': group_by, 'summary': summary})
+
+    except (TypeError, ValueError):
+        return JsonResponse({
+            'status': 'error',
+            'message': 'Неверные параметры: date_from, date_to (YYYY-MM-DD), group_by (week/month)'
+        }, status=400)
+    except Exception as e:
+        return JsonResponse({'status': 'error', 'message': str(e)})
+
+
+@login_required
+def audit_log(request):
+    """
+    Журнал изменений расписания, новые записи первыми (page/page_size).
+
+    Суперпользователь видит все расписания (или user_id), остальные —
+    изменения своего. Фильтры: event_id, series_id, action. Записи
+    появляются в журнале через несколько секунд после изменения.
+    """
+    try:
+        page = int(request.GET.get('page', 1))
+        page_size = min(int(request.GET.get('page_size', AUDIT_PAGE_SIZE)), AUDIT_MAX_PAGE_SIZE)
+        if page < 1 or page_size < 1:
+            raise ValueError(page)
+
+        entries = AuditEntry.objects.all()
+        if request.user.is_superuser:
+            if request.GET.get('user_id'):
+                entries = entries.filter(user_id=int(request.GET['user_id']))
+        else:
+            entries = entries.filter(user_id=request.user.id)
+        if request.GET.get('event_id'):
+            entries = entries.filter(event_id=int(request.GET['event_id']))
+        if request.GET.get('series_id'):
+            entries = entries.filter(series_id=uuid.UUID(request.GET['series_id']))
+        if request.GET.get('action'):
+            entries = entries.filter(action=request.GET['action'])
+    except ValueError:
+        return JsonResponse({'status': 'error', 'message': 'Неверные параметры'}, status=400)
+
+    # Лишняя строка показывает, есть ли следующая страница, без COUNT(*) по журналу
+    offset = (page - 1) * page_size
+    rows = list(entries.order_by('-created_at', '-id').values(
+        'id', 'created_at', 'action', 'actor_id', 'actor__username', 'user_id',
+        'event_id', 'series_id', 'count', 'changes'
+    )[offset:offset + page_size + 1])
+
+    return JsonResponse({
+        'status': 'success',
+        'page': page,
+        'page_size': page_size,
+        'has_more': len(rows) > page_size,
+        'results': [
+            {
+                'id': row['id'],
+                'created_at': row['created_at'].isoformat(),
+                'action': row['action'],
+                'actor_id': row['actor_id'],
+                'actor': row['actor__username'],
+                'user_id': row['user_id'],
+                'event_id': row['event_id'],
+                'series_id': str(row['series_id']) if row['series_id'] else None,
+                'count': row['count'],
+                'changes': row['changes']
+            }
+            for row in rows[:page_size]
+        ]
+    })
+
+
+@login_required
+def export_events(request):
+    """Потоковая выгрузка событий за период (?date_from, date_to, format=csv|ndjson, totals=1).
+
+    Суперпользователь выгружает всех пользователей (или user_ids=1,2,3),
+    остальные — только свое расписание. Период не ограничен: события
+    читаются порциями и сразу отдаются клиенту.
+    """
+    try:
+        from datetime import datetime
+        date_from_obj = datetime.strptime(request.GET.get('date_from'), '%Y-%m-%d').date()
+        date_to_obj = datetime.strptime(request.GET.get('date_to'), '%Y-%m-%d').date()
+        if date_to_obj < date_from_obj:
+            raise ValueError('date_to раньше date_from')
+        export_format = request.GET.get('format', 'csv')
+        if export_format not in EXPORT_CONTENT_TYPES:
+            raise ValueError(export_format)
+
+        if request.user.is_superuser:
+            user_ids_param = request.GET.get('user_ids', '').strip()
+            user_ids = [
+                int(user_id) for user_id in user_ids_param.split(',') if user_id.strip()
+            ] if user_ids_param else None
+        else:
+            user_ids = [request.user.id]
+    except (TypeError, ValueError):
+        return JsonResponse({
+            'status': 'error',
+            'message': 'Неверные параметры: date_from, date_to (YYYY-MM-DD), format (csv/ndjson)'
+        }, status=400)
+
+    events = export_queryset(date_from_obj, date_to_obj, user_ids)
+    # Ответ читается после выхода из view, когда маршрутизация на реплику
+    # уже сброшена middleware, — база фиксируется сейчас
+    events = events.using(events.db)
+
+    chunks = render_export(
+        events, export_format,
+        totals=request.GET.get('totals') == '1',
+        chunk_size=EXPORT_CHUNK_SIZE
+    )
+    if export_format == 'csv':
+        # BOM — чтобы Excel открыл кириллицу в UTF-8
+        chunks = itertools.chain(['\ufeff'], chunks)
+
+    response = StreamingHttpResponse(chunks, content_type=EXPORT_CONTENT_TYPES[export_format])
+    filename = f'events_{date_from_obj:%Y%m%d}_{date_to_obj:%Y%m%d}.{export_format}'
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
 @csrf_exempt
 @require_POST
 @login_required
+@idempotent
 def delete_event(request):
     try:
         manager = EventManager(request)
@@ -516,20 +1056,47 @@ def delete_event(request):
             return JsonResponse({'status': 'error', 'message': 'Не указан ID события'})
 
         try:
-            event = ScheduleEvent.objects.get(id=event_id, user=target_user)
-
-            if delete_recurring:
-                # Удаляем все регулярные занятия из этой серии
-                ScheduleEvent.objects.filter(
-                    user=target_user,
-                    series_id=event.series_id,
-                ).delete()
-            else:
-                event.delete()
+            workload = WorkloadDelta()
+            occupancy = OccupancyDelta()
+
+            # Под той же блокировкой расписания, что и save_event
+            with user_schedule_lock(target_user.id):
+                event = ScheduleEvent.objects.get(id=event_id, user=target_user)
+
+                expected_version = data.get('version')
+                if expected_version is not None and int(expected_version) != event.version:
+                    raise StaleEventError(STALE_EVENT_MESSAGE)
+
+                deleted_id, before = event.id, audit.snapshot(event)
+                if delete_recurring:
+                    # Удаляем все регулярные занятия из этой серии
+                    series_events = ScheduleEvent.objects.filter(
+                        user=target_user,
+                        series_id=event.series_id,
+                    )
+                    for date, duration in series_events.values_list('date', 'duration'):
+                        workload.remove(target_user.id, date, duration)
+                        occupancy.touch(target_user.id, date)
+                    deleted, _ = series_events.delete()
+                else:
+                    workload.remove(target_user.id, event.date, event.duration)
+                    occupancy.touch(target_user.id, event.date)
+                    deleted, _ = event.delete()
+
+                # Удаление серии — одна запись: событие, по которому удаляли, и число удаленных
+                manager._audit(
+                    'delete_series' if delete_recurring else 'delete', deleted_id, event.series_id,
+                    count=deleted, changes=audit.diff(before, None)
+                )
+
+                workload.apply()
+                occupancy.apply()
 
             return JsonResponse({'status': 'success', 'message': 'Событие удалено'})
         except ScheduleEvent.DoesNotExist:
             return JsonResponse({'status': 'error', 'message': 'Событие не найдено'})
+        except StaleEventError as e:
+            return JsonResponse({'status': 'error', 'message': str(e)}, status=409)
 
     except Exception as e:
         return JsonResponse({'status': 'error', 'message': str(e)})
@@ -553,12 +1120,12 @@ def switch_user(request):
                 del request.session['target_user_id']
             return JsonResponse({'status': 'success', 'message': 'Режим просмотра: свое расписание'})
 
-        target_user = User.objects.get(id=user_id)
+        username = User.objects.values_list('username', flat=True).get(id=user_id)
         request.session['target_user_id'] = user_id
 
         return JsonResponse({
             'status': 'success',
-            'message': f'Режим просмотра: {target_user.username}'
+            'message': f'Режим просмотра: {username}'
         })
 
     except User.DoesNotExist:
@@ -578,6 +1145,60 @@ def get_users_list(request):
 
     return JsonResponse({'status': 'success', 'users': users_data})
 
+
+USERS_DIRECTORY_PAGE_SIZE = 50
+
+
+@login_required
+def users_directory(request):
+    """Постраничный каталог пользователей с поиском по началу имени (для суперпользователя).
+
+    Первая страница без поиска кэшируется и сбрасывается сигналами
+    при создании/изменении/удалении пользователя (см. signals.py).
+    """
+    if not request.user.is_superuser:
+        return JsonResponse({'status': 'error', 'message': 'Доступ запрещен'}, status=403)
+
+    query = request.GET.get('q', '').strip()
+    try:
+        page = max(int(request.GET.get('page', 1)), 1)
+    except ValueError:
+        page = 1
+
+    return JsonResponse(get_users_directory_page(query, page))
+
+
+def get_users_directory_page(query='', page=1):
+    """Страница каталога пользователей (первая страница без поиска — из кэша)"""
+    use_cache = not query and page == 1
+    if use_cache:
+        cached = cache.get(USERS_DIRECTORY_CACHE_KEY)
+        if cached is not None:
+            return cached
+
+    users = User.objects.order_by('username')
+    if query:
+        users = users.filter(username__istartswith=query)
+
+    # Берем на одну запись больше, чтобы узнать о следующей странице без COUNT(*)
+    offset = (page - 1) * USERS_DIRECTORY_PAGE_SIZE
+    rows = list(users.values_list('id', 'username')[offset:offset + USERS_DIRECTORY_PAGE_SIZE + 1])
+
+    data = {
+        'status': 'success',
+        'page': page,
+        'has_next': len(rows) > USERS_DIRECTORY_PAGE_SIZE,
+        'users': [
+            {'id': user_id, 'username': username}
+            for user_id, username in rows[:USERS_DIRECTORY_PAGE_SIZE]
+        ]
+    }
+
+    if use_cache:
+        cache.set(USERS_DIRECTORY_CACHE_KEY, data, USERS_DIRECTORY_CACHE_TIMEOUT)
+
+    return data
+
 def signup(request):
     if request.method == 'POST':
         form = UserCreationForm(request.POST)
@@ -0,0 +1,67 @@
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db.models import F
+
+from .models import WeeklyWorkload
+
+
+def week_start(date_obj):
+    """Понедельник ISO-недели, в которую попадает дата"""
+    return date_obj - timedelta(days=date_obj.weekday())
+
+
+def duration_minutes(duration):
+    """Продолжительность в часах → целые минуты (без накопления ошибок float)"""
+    return int(round(float(duration) * 60))
+
+
+class WorkloadDelta:
+    """
+    Накопитель изменений нагрузки по (пользователь, неделя).
+
+    Методы EventManager регистрируют добавленные и удаленные события,
+    а apply() применяет итог несколькими UPDATE с F-выражениями:
+    недели с одинаковым изменением (типичный случай для серии)
+    обновляются одним запросом.
+    """
+
+    def __init__(self):
+        self.changes = defaultdict(lambda: [0, 0])
+
+    def add(self, user_id, date_obj, duration):
+        change = self.changes[(user_id, week_start(date_obj))]
+        change[0] += 1
+        change[1] += duration_minutes(duration)
+
+    def remove(self, user_id, date_obj, duration):
+        change = self.changes[(user_id, week_start(date_obj))]
+        change[0] -= 1
+        change[1] -= duration_minutes(duration)
+
+    def apply(self):
+        # Группируем недели по одинаковому изменению
+        groups = defaultdict(list)
+        for (user_id, week), (count, minutes) in self.changes.items():
+            if count or minutes:
+                groups[(user_id, count, minutes)].append(week)
+        self.changes.clear()
+
+        if not groups:
+            return
+
+        # Создаем недостающие строки, существующие не трогаем
+        WeeklyWorkload.objects.bulk_create(
+            [
+                WeeklyWorkload(user_id=user_id, week_start=week)
+                for (user_id, _, _), weeks in groups.items()
+                for week in weeks
+            ],
+            ignore_conflicts=True
+        )
+
+        for (user_id, count, minutes), weeks in groups.items():
+            WeeklyWorkload.objects.filter(user_id=user_id, week_start__in=weeks).update(
+                event_count=F('event_count') + count,
+                minutes=F('minutes') + minutes
+            )
@@ -234,6 +234,14 @@ export class EventModal {
 
             delete movedEventData.overlay;
 
+            const rejectConflicts = await this.resolveConflicts([
+                { date: newDate, time: newTime, duration: event.duration, excludeId: event.id }
+            ]);
+            if (rejectConflicts === null) {
+                return;
+            }
+            movedEventData.reject_conflicts = rejectConflicts;
+
             // Валидация
             const dto = new EventDTO(movedEventData);
             const validationErrors = dto.validate();
@@ -266,6 +274,9 @@ export class EventModal {
             }
         } catch (error) {
             console.error('Ошибка при переносе события:', error);
+            if (error.status === 409) {
+                alert(error.message);
+            }
         }
     }
 
@@ -412,6 +423,21 @@ export class EventModal {
         if (!this.isEditing && this.targetUserId) {
             eventData.target_user_id = this.targetUserId;
         }
+
+        // Пересечения — по загруженной неделе, без запроса к серверу
+        const targetDates = this.selectedDays.length > 0
+            ? this.getDatesForSelectedDays(new Date(eventData.date))
+            : [eventData.date];
+        const rejectConflicts = await this.resolveConflicts(targetDates.map(date => ({
+            date,
+            time: eventData.time,
+            duration: eventData.duration,
+            excludeId: date === eventData.date ? eventData.id : null
+        })));
+        if (rejectConflicts === null) {
+            return;
+        }
+        eventData.reject_conflicts = rejectConflicts;
         
         try {
             // ЕСЛИ ВЫБРАНЫ ДНИ - создаем события для каждого дня
@@ -431,8 +457,26 @@ export class EventModal {
             this.hide();
         } catch (error) {
             console.error('Ошибка сети:', error);
-            alert('Ошибка сети при сохранении');
+            alert(error.status === 409 ? error.message : 'Ошибка сети при сохранении');
+        }
+    }
+
+    /**
+     * Проверить пересечения слотов и спросить пользователя, если они есть
+     * @param {Array} slots - [{ date, time, duration, excludeId }]
+     * @returns {Promise<boolean|null>} reject_conflicts для сохранения:
+     *   true — пересечений не найдено (сервер подтвердит), false — пользователь
+     *   согласился сохранить поверх, null — пользователь отказался
+     */
+    async resolveConflicts(slots) {
+        const results = await Promise.all(slots.map(({ date, time, duration, excludeId }) =>
+            this.eventManager.checkConflict(date, time, duration, excludeId)
+        ));
+        const messages = results.filter(result => result.hasConflict).map(result => result.message);
+        if (messages.length === 0) {
+            return true;
         }
+        return confirm(`${messages.join('\n')}\n\nСохранить все равно?`) ? false : null;
     }
 
     // СОХРАНИТЬ СОБЫТИЯ ДЛЯ ВЫБРАННЫХ ДНЕЙ
@@ -9,6 +9,7 @@ export const EVENT_STRUCTURE = {
     color: 'blue',
     is_recurring: false,
     duration: 1.0,
+    version: null,
     created_by: null,
     user_id: null,
     target_user_id: null,
@@ -28,6 +29,7 @@ export const DATA_ATTRIBUTE_MAPPING = {
     'data-color': 'color',
     'data-recurring': 'is_recurring',
     'data-duration': 'duration',
+    'data-version': 'version',
     'data-created-by': 'created_by',
     'data-user-id': 'user_id',
     'data-target-user-id': 'target_user_id',
@@ -46,6 +48,7 @@ export const EVENT_FIELDS = {
     COLOR: 'color',
     IS_RECURRING: 'is_recurring',
     DURATION: 'duration',
+    VERSION: 'version',
     CREATED_BY: 'created_by',
     USER_ID: 'user_id',
     TARGET_USER_ID: 'target_user_id',
@@ -65,6 +68,7 @@ export const DATA_ATTRIBUTES = {
     COLOR: 'data-color',
     RECURRING: 'data-recurring',
     DURATION: 'data-duration',
+    VERSION: 'data-version',
     CREATED_BY: 'data-created-by',
     USER_ID: 'data-user-id',
     TARGET_USER_ID: 'data-target-user-id',
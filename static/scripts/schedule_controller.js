@@ -47,87 +47,135 @@ function updateWeekData() {
     }
 }
 
-// Генерация расписания
+// Генерация расписания.
+// Сетка создается один раз: при смене недели у существующих ячеек меняются
+// только даты и заголовки, а строки часов вне видимого диапазона
+// не создаются вовсе (см. syncHourRows)
 async function generateSchedule() {
     const container = document.getElementById('schedule-container');
-    // Сохраняем overlay перед очисткой
-    const overlay = document.getElementById('events-overlay');
 
-    // Очищаем только содержимое расписания, но не overlay
-    const daysContainer = container.querySelector('.days-container');
-    if (daysContainer) {
-        daysContainer.remove();
-    }
+    let daysContainer = container.querySelector('.days-container');
+    if (!daysContainer) {
+        daysContainer = document.createElement('div');
+        daysContainer.className = 'days-container';
 
-    // Создаем новый days-container
-    const newDaysContainer = document.createElement('div');
-    newDaysContainer.className = 'days-container';
+        // Колонка времени
+        daysContainer.appendChild(createTimeColumn());
 
-    // Колонка времени
-    newDaysContainer.appendChild(createTimeColumn());
+        // Колонки дней
+        currentWeek.days.forEach(day => {
+            daysContainer.appendChild(createDayColumn(day));
+        });
 
-    // Колонки дней
-    currentWeek.days.forEach(day => {
-        newDaysContainer.appendChild(createDayColumn(day));
-    });
+        container.appendChild(daysContainer);
+    } else {
+        patchDayColumns(daysContainer);
+    }
 
-    container.appendChild(newDaysContainer);
+    syncHourRows(daysContainer);
 
     return Promise.resolve();
 }
 
-// Создание колонки времени
+// Создание колонки времени (строки часов добавляет syncHourRows)
 function createTimeColumn() {
     const timeColumn = document.createElement('div');
     timeColumn.className = 'time-column';
 
     timeColumn.appendChild(createElement('div', 'time-header', ''));
 
-    for (let hour = 0; hour < 24; hour++) {
-    // Скрываем ночные часы по умолчанию
-        const timeCell = createElement('div', 'time-cell', `${hour}:00`);
-
-        if (!shouldShowHour(hour)) {
-            timeCell.style.display = 'none';
-        }
-        timeColumn.appendChild(timeCell);
-    }
-
     return timeColumn;
 }
 
-// Создание колонки дня
+// Создание колонки дня (ячейки часов добавляет syncHourRows)
 function createDayColumn(day) {
     const dayColumn = document.createElement('div');
     dayColumn.className = 'day-column';
 
     // Заголовок дня
-    const header = createElement('div', 'day-header', `${day.dayOfMonth}, ${day.shortName}`);
-    header.title = `${day.dayName} ${day.date}`;
+    const header = createElement('div', 'day-header', '');
+    dayColumn.appendChild(header);
+    patchDayHeader(header, day);
 
-    // 🔥 ДОБАВЛЯЕМ ПРОВЕРКУ НА ТЕКУЩИЙ ДЕНЬ
-    if (day.date === getCurrentDateString()) {
-        header.classList.add('current-day');
+    return dayColumn;
+}
+
+// Обновление заголовка дня (только при изменении)
+function patchDayHeader(header, day) {
+    const text = `${day.dayOfMonth}, ${day.shortName}`;
+    if (header.textContent !== text) {
+        header.textContent = text;
+        header.title = `${day.dayName} ${day.date}`;
     }
+    // 🔥 ДОБАВЛЯЕМ ПРОВЕРКУ НА ТЕКУЩИЙ ДЕНЬ
+    header.classList.toggle('current-day', day.date === getCurrentDateString());
+}
 
-    dayColumn.appendChild(header);
+// Смена недели: у ячеек меняются только дата и подсказка
+function patchDayColumns(daysContainer) {
+    daysContainer.querySelectorAll('.day-column').forEach((dayColumn, index) => {
+        const day = currentWeek.days[index];
+        patchDayHeader(dayColumn.querySelector('.day-header'), day);
+        dayColumn.querySelectorAll('.schedule-cell').forEach(cell => {
+            if (cell.getAttribute('data-date') !== day.date) {
+                cell.setAttribute('data-date', day.date);
+                cell.title = `${formatDate(day.date)}\n${parseInt(cell.getAttribute('data-time'))}:00`;
+            }
+        });
+    });
+}
 
-    // Ячейки времени
-    for (let hour = 0; hour < 24; hour++) {
-        const cell = createElement('div', 'schedule-cell', '');
-        cell.setAttribute('data-day', day.day);
-        cell.setAttribute('data-time', `${hour.toString().padStart(2, '0')}:00`);
-        cell.setAttribute('data-date', day.date);
-        cell.title = `${formatDate(day.date)}\n${hour}:00`;
-        // Скрываем ночные часы по умолчанию
-        if (!shouldShowHour(hour)) {
-            cell.style.display = 'none';
-        }
+// Ячейка часа в колонке дня
+function createScheduleCell(day, hour) {
+    const cell = createElement('div', 'schedule-cell', '');
+    cell.setAttribute('data-day', day.day);
+    cell.setAttribute('data-time', `${hour.toString().padStart(2, '0')}:00`);
+    cell.setAttribute('data-date', day.date);
+    cell.title = `${formatDate(day.date)}\n${hour}:00`;
+    return cell;
+}
 
-        dayColumn.appendChild(cell);
-    }
+// Ячейка часа в колонке времени
+function createTimeCell(hour) {
+    const timeCell = createElement('div', 'time-cell', `${hour}:00`);
+    timeCell.setAttribute('data-hour', hour);
+    return timeCell;
+}
 
-    return dayColumn;
+// Виртуализация часов: в DOM только строки видимых часов.
+// Недостающие строки вставляются по порядку, скрытые — удаляются
+function syncHourRows(daysContainer) {
+    const columns = [
+        { element: daysContainer.querySelector('.time-column'), selector: '.time-cell', create: createTimeCell },
+        ...Array.from(daysContainer.querySelectorAll('.day-column'), (element, index) => ({
+            element,
+            selector: '.schedule-cell',
+            create: hour => createScheduleCell(currentWeek.days[index], hour)
+        }))
+    ];
+
+    columns.forEach(({ element, selector, create }) => {
+        const rows = new Map();
+        element.querySelectorAll(selector).forEach(row => {
+            rows.set(parseInt(row.getAttribute('data-hour') ?? row.getAttribute('data-time')), row);
+        });
+
+        let previous = element.firstElementChild; // заголовок колонки
+        for (let hour = 0; hour < 24; hour++) {
+            const row = rows.get(hour);
+            if (!shouldShowHour(hour)) {
+                row?.remove();
+                continue;
+            }
+            if (row) {
+                previous = row;
+            } else {
+                const newRow = create(hour);
+                previous.after(newRow);
+                previous = newRow;
+            }
+        }
+    });
 }
 
 // Вспомогательная функция создания элемента
@@ -148,17 +196,11 @@ function formatDate(dateStr) {
 function toggleHoursVisibility() {
     showAllHours = !showAllHours;
 
-    // Обновляем видимость ячеек времени
-    document.querySelectorAll('.time-cell').forEach(cell => {
-        const hour = parseInt(cell.textContent.split(':')[0]);
-        cell.style.display = shouldShowHour(hour) ? 'block' : 'none';
-    });
-
-    // Обновляем видимость ячеек расписания
-    document.querySelectorAll('.schedule-cell').forEach(cell => {
-        const hour = parseInt(cell.getAttribute('data-time'));
-        cell.style.display = shouldShowHour(hour) ? 'block' : 'none';
-    });
+    // Добавляем или убираем строки скрытых часов
+    const daysContainer = document.querySelector('#schedule-container .days-container');
+    if (daysContainer) {
+        syncHourRows(daysContainer);
+    }
 
     // Обновляем линии времени
     timelineManager.update();
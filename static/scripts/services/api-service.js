@@ -1,5 +1,24 @@
 import { EventDTO } from '../models/event-dto.js';
 
+let initialData; // данные, встроенные сервером в index.html (json_script)
+
+/**
+ * Получить начальные данные страницы (неделя, целевой пользователь, каталог)
+ * @returns {Object|null}
+ */
+export function getInitialData() {
+    if (initialData === undefined) {
+        const element = document.getElementById('initial-schedule');
+        try {
+            initialData = element ? JSON.parse(element.textContent) : null;
+        } catch (error) {
+            console.warn('Не удалось прочитать начальные данные страницы:', error);
+            initialData = null;
+        }
+    }
+    return initialData;
+}
+
 export class ApiService {
     constructor(baseUrl = '/api') {
         this.baseUrl = baseUrl;
@@ -8,26 +27,44 @@ export class ApiService {
     /**
      * Сохранить событие (создание или редактирование)
      * @param {Object} eventData - Данные события
+     * @param {string} idempotencyKey - Ключ действия; повтор с тем же ключом не выполняется дважды
      * @returns {Promise<Object>} Ответ сервера
      */
-    async saveEvent(eventData) {
+    async saveEvent(eventData, idempotencyKey = crypto.randomUUID()) {
         try {
-            const response = await fetch(`${this.baseUrl}/save-event/`, {
+            const response = await this.fetchIdempotent(`${this.baseUrl}/save-event/`, {
                 method: 'POST',
                 headers: {
                     'Content-Type': 'application/json',
                     'X-CSRFToken': this.getCSRFToken(),
+                    'Idempotency-Key': idempotencyKey,
                 },
-                body: JSON.stringify(this.prepareEventData(eventData))
+                body: JSON.stringify({
+                    ...this.prepareEventData(eventData),
+                    // Клиент не нашел пересечений — сервер подтверждает под блокировкой
+                    ...(eventData.reject_conflicts ? { reject_conflicts: true } : {})
+                })
             });
 
+            // 409 — событие уже изменил кто-то другой (устаревшая версия)
+            // или слот занят событием, которого не было в кэше недели
+            if (response.status === 409) {
+                const data = await response.json();
+                const conflictError = new Error(data.message);
+                conflictError.status = 409;
+                throw conflictError;
+            }
+
             if (!response.ok) {
                 throw new Error(`HTTP error! status: ${response.status}`);
             }
 
-            return await response.json();
+            return this.afterWrite(await response.json());
         } catch (error) {
             console.error('Ошибка при сохранении события:', error);
+            if (error.status === 409) {
+                throw error;
+            }
             throw new Error(`Сетевая ошибка: ${error.message}`);
         }
     }
@@ -36,19 +73,21 @@ export class ApiService {
      * Удалить событие
      * @param {string} eventId - ID события
      * @param {boolean} deleteRecurring - Удалить всю серию регулярных событий
+     * @param {string} idempotencyKey - Ключ действия; повтор с тем же ключом не выполняется дважды
      * @returns {Promise<Object>} Ответ сервера
      */
-    async deleteEvent(eventId, deleteRecurring = false) {
+    async deleteEvent(eventId, deleteRecurring = false, idempotencyKey = crypto.randomUUID()) {
         if (!eventId) {
             throw new Error('ID события обязателен для удаления');
         }
 
         try {
-            const response = await fetch(`${this.baseUrl}/delete-event/`, {
+            const response = await this.fetchIdempotent(`${this.baseUrl}/delete-event/`, {
                 method: 'POST',
                 headers: {
                     'Content-Type': 'application/json',
                     'X-CSRFToken': this.getCSRFToken(),
+                    'Idempotency-Key': idempotencyKey,
                 },
                 body: JSON.stringify({
                     id: eventId,
@@ -60,13 +99,189 @@ export class ApiService {
                 throw new Error(`HTTP error! status: ${response.status}`);
             }
 
-            return await response.json();
+            return this.afterWrite(await response.json());
         } catch (error) {
             console.error('Ошибка при удалении события:', error);
             throw new Error(`Сетевая ошибка: ${error.message}`);
         }
     }
 
+    /**
+     * Сдвинуть серию регулярных событий
+     * @param {string} eventId - ID любого события серии
+     * @param {Object} shift - { dayOffset, time, fromDate } (time и fromDate необязательны)
+     * @returns {Promise<Object>} Ответ сервера
+     */
+    async shiftSeries(eventId, { dayOffset = 0, time = null, fromDate = null } = {}) {
+        try {
+            const response = await fetch(`${this.baseUrl}/shift-series/`, {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/json',
+                    'X-CSRFToken': this.getCSRFToken(),
+                },
+                body: JSON.stringify({
+                    id: eventId,
+                    day_offset: dayOffset,
+                    time: time,
+                    from_date: fromDate
+                })
+            });
+
+            return this.afterWrite(await response.json());
+        } catch (error) {
+            console.error('Ошибка при сдвиге серии:', error);
+            throw new Error(`Сетевая ошибка: ${error.message}`);
+        }
+    }
+
+    /**
+     * Скопировать неделю на следующие недели
+     * @param {string} week - Любой день исходной недели (YYYY-MM-DD)
+     * @param {Object} options - { weeks, targetWeek, policy: 'skip'|'overwrite', toUserId }
+     * @param {string} idempotencyKey - Ключ действия; повтор с тем же ключом не копирует неделю дважды
+     * @returns {Promise<Object>} Ответ сервера ({ created, skipped, replaced })
+     */
+    async copyWeek(week, { weeks = 1, targetWeek = null, policy = 'skip', toUserId = null } = {},
+                   idempotencyKey = crypto.randomUUID()) {
+        try {
+            const response = await this.fetchIdempotent(`${this.baseUrl}/copy-week/`, {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/json',
+                    'X-CSRFToken': this.getCSRFToken(),
+                    'Idempotency-Key': idempotencyKey,
+                },
+                body: JSON.stringify({
+                    week: week,
+                    weeks: weeks,
+                    target_week: targetWeek,
+                    policy: policy,
+                    to_user_id: toUserId
+                })
+            });
+
+            return this.afterWrite(await response.json());
+        } catch (error) {
+            console.error('Ошибка при копировании недели:', error);
+            throw new Error(`Сетевая ошибка: ${error.message}`);
+        }
+    }
+
+    /**
+     * Изменить цвет, текст и/или продолжительность всех событий по фильтру
+     * @param {Object} filter - { date_from, date_to, text, color, series_ids, student_id }
+     * @param {Object} changes - { color, text, duration }
+     * @param {Object} options - { dryRun } (только подсчет подходящих событий)
+     * @param {string} idempotencyKey - Ключ действия; повтор с тем же ключом не выполняется дважды
+     * @returns {Promise<Object>} Ответ сервера ({ matched, series, updated })
+     */
+    async bulkEditEvents(filter, changes, { dryRun = false } = {}, idempotencyKey = crypto.randomUUID()) {
+        try {
+            const response = await this.fetchIdempotent(`${this.baseUrl}/bulk-edit-events/`, {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/json',
+                    'X-CSRFToken': this.getCSRFToken(),
+                    'Idempotency-Key': idempotencyKey,
+                },
+                body: JSON.stringify({
+                    filter: filter,
+                    set: changes,
+                    dry_run: dryRun
+                })
+            });
+
+            const data = await response.json();
+            return dryRun ? data : this.afterWrite(data);
+        } catch (error) {
+            console.error('Ошибка при массовом изменении событий:', error);
+            throw new Error(`Сетевая ошибка: ${error.message}`);
+        }
+    }
+
+    /**
+     * Привязать событие (по умолчанию всю его серию) к ученику
+     * @param {string} eventId - ID события
+     * @param {number|null} studentId - ID ученика (null — отвязать)
+     * @param {Object} options - { wholeSeries, version }
+     * @returns {Promise<Object>} Ответ сервера ({ linked, version })
+     */
+    async linkStudent(eventId, studentId, { wholeSeries = true, version = null } = {}) {
+        try {
+            const response = await fetch(`${this.baseUrl}/link-student/`, {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/json',
+                    'X-CSRFToken': this.getCSRFToken(),
+                },
+                body: JSON.stringify({
+                    id: eventId,
+                    student_id: studentId,
+                    whole_series: wholeSeries,
+                    version: version
+                })
+            });
+
+            return this.afterWrite(await response.json());
+        } catch (error) {
+            console.error('Ошибка при привязке ученика:', error);
+            throw new Error(`Сетевая ошибка: ${error.message}`);
+        }
+    }
+
+    /**
+     * Загрузить страницу истории занятий ученика (от новых к старым)
+     * @param {number} studentId - ID ученика
+     * @param {string|null} cursor - next_cursor предыдущей страницы
+     * @param {number} limit - Размер страницы
+     * @returns {Promise<Object>} { events, next_cursor, stats (только первая страница) }
+     */
+    async loadStudentHistory(studentId, cursor = null, limit = 50) {
+        const params = new URLSearchParams({ student_id: studentId, limit });
+        if (cursor) {
+            params.set('cursor', cursor);
+        }
+        const response = await fetch(`${this.baseUrl}/student-history/?${params}`);
+        const data = await response.json();
+        if (data.status !== 'success') {
+            throw new Error(data.message || 'Ошибка загрузки истории ученика');
+        }
+        return data;
+    }
+
+    /**
+     * Получить состояние фоновой задачи
+     * @param {number} jobId - ID задачи (job_id из ответа saveEvent)
+     * @returns {Promise<Object>} { id, kind, state, attempts, result, error }
+     */
+    async getJobStatus(jobId) {
+        const response = await fetch(`${this.baseUrl}/job-status/?id=${encodeURIComponent(jobId)}`);
+        const data = await response.json();
+        if (data.status !== 'success') {
+            throw new Error(data.message);
+        }
+        return data.job;
+    }
+
+    /**
+     * Дождаться завершения фоновой задачи
+     * @param {number} jobId - ID задачи
+     * @param {Object} options - { interval, timeout } в миллисекундах
+     * @returns {Promise<Object>} Задача в состоянии done/failed
+     */
+    async waitForJob(jobId, { interval = 1000, timeout = 60000 } = {}) {
+        const deadline = Date.now() + timeout;
+        while (Date.now() < deadline) {
+            const job = await this.getJobStatus(jobId);
+            if (job.state === 'done' || job.state === 'failed') {
+                return job;
+            }
+            await new Promise(resolve => setTimeout(resolve, interval));
+        }
+        throw new Error(`Задача ${jobId} не завершилась за ${timeout / 1000} с`);
+    }
+
     /**
      * Загрузить события за период
      * @param {string} dateFrom - Дата начала (YYYY-MM-DD)
@@ -78,6 +293,14 @@ export class ApiService {
             throw new Error('Даты начала и окончания обязательны');
         }
 
+        // Первая загрузка недели — из данных, встроенных в страницу
+        const initial = getInitialData();
+        if (initial?.events && initial.date_from === dateFrom && initial.date_to === dateTo) {
+            const events = initial.events;
+            initial.events = null; // дальше — только с сервера
+            return this.addEditInfo(events);
+        }
+
         try {
             const response = await fetch(
                 `${this.baseUrl}/load-events/?date_from=${encodeURIComponent(dateFrom)}&date_to=${encodeURIComponent(dateTo)}`,
@@ -95,14 +318,7 @@ export class ApiService {
             const data = await response.json();
 
             if (data.status === 'success') {
-                // Добавляем информацию о текущем пользователе к каждому событию
-                const currentUserId = this.getCurrentUserId();
-                const events = data.events.map(event => ({
-                    ...event,
-                    currentUserId: currentUserId,
-                    canEdit: this.canUserEditEvent(event, currentUserId)
-                }));
-                return events;
+                return this.addEditInfo(data.events);
             } else {
                 throw new Error(data.message || 'Ошибка загрузки событий');
             }
@@ -112,6 +328,20 @@ export class ApiService {
         }
     }
 
+    /**
+     * Добавить информацию о текущем пользователе к каждому событию
+     * @param {Array} events - События в формате API
+     * @returns {Array} События с полями currentUserId и canEdit
+     */
+    addEditInfo(events) {
+        const currentUserId = this.getCurrentUserId();
+        return events.map(event => ({
+            ...event,
+            currentUserId: currentUserId,
+            canEdit: this.canUserEditEvent(event, currentUserId)
+        }));
+    }
+
     /**
      * Загрузить события для текущей недели
      * @param {Array} weekDays - Массив дней недели
@@ -162,6 +392,84 @@ export class ApiService {
         }
     }
 
+    /**
+     * Загрузить сводку месяца по дням (для месячного вида и тепловой карты)
+     * @param {string} month - Месяц (YYYY-MM)
+     * @returns {Promise<Object>} { days: { 'YYYY-MM-DD': { count, hours, first_time, last_time, colors } }, totals }
+     */
+    async loadMonthSummary(month) {
+        const response = await fetch(`${this.baseUrl}/month-summary/?month=${encodeURIComponent(month)}`);
+        const data = await response.json();
+        if (data.status !== 'success') {
+            throw new Error(data.message || 'Ошибка загрузки сводки месяца');
+        }
+        return data;
+    }
+
+    /**
+     * Полнотекстовый поиск по событиям за всю историю (серия — один результат)
+     * @param {string} query - Поисковый запрос
+     * @param {number} page - Номер страницы (с 1)
+     * @param {number} pageSize - Размер страницы
+     * @returns {Promise<Object>} { results: [{ event, hits, first_date, last_date, rank }], total }
+     */
+    async searchEvents(query, page = 1, pageSize = 20) {
+        const params = new URLSearchParams({ q: query, page, page_size: pageSize });
+        const response = await fetch(`${this.baseUrl}/search-events/?${params}`);
+        const data = await response.json();
+        if (data.status !== 'success') {
+            throw new Error(data.message || 'Ошибка поиска');
+        }
+        return data;
+    }
+
+    /**
+     * Загрузить сводку событий нескольких пользователей (только для суперпользователя)
+     * @param {string} dateFrom - Дата начала (YYYY-MM-DD)
+     * @param {string} dateTo - Дата окончания (YYYY-MM-DD)
+     * @param {Array<number>} userIds - ID пользователей (пустой массив — все)
+     * @returns {Promise<Array>} Пользователи с событиями в виде объектов
+     */
+    async loadUsersOverview(dateFrom, dateTo, userIds = []) {
+        try {
+            const params = new URLSearchParams({ date_from: dateFrom, date_to: dateTo });
+            if (userIds.length > 0) {
+                params.append('user_ids', userIds.join(','));
+            }
+
+            const response = await fetch(
+                `${this.baseUrl}/load-users-overview/?${params.toString()}`,
+                {
+                    headers: {
+                        'X-CSRFToken': this.getCSRFToken(),
+                    }
+                }
+            );
+
+            if (!response.ok) {
+                throw new Error(`HTTP error! status: ${response.status}`);
+            }
+
+            const data = await response.json();
+
+            if (data.status === 'success') {
+                // Разворачиваем компактные строки обратно в объекты событий
+                return data.users.map(user => ({
+                    ...user,
+                    events: user.events.map(row => ({
+                        ...Object.fromEntries(data.fields.map((field, i) => [field, row[i]])),
+                        user_id: user.id
+                    }))
+                }));
+            } else {
+                throw new Error(data.message || 'Ошибка загрузки сводки');
+            }
+        } catch (error) {
+            console.error('Ошибка при загрузке сводки пользователей:', error);
+            throw new Error(`Сетевая ошибка: ${error.message}`);
+        }
+    }
+
     /**
      * Проверить, может ли пользователь редактировать событие
      */
@@ -239,6 +547,50 @@ export class ApiService {
         }
     }
 
+    /**
+     * Получить страницу каталога пользователей
+     * @param {string} query - Начало имени пользователя (пустая строка — без фильтра)
+     * @param {number} page - Номер страницы (с 1)
+     * @returns {Promise<Object>} { users, page, has_next }
+     */
+    async getUsersDirectory(query = '', page = 1) {
+        // Первая страница без поиска уже встроена в страницу
+        const initial = getInitialData();
+        if (!query && page === 1 && initial?.users) {
+            const users = initial.users;
+            initial.users = null;
+            return users;
+        }
+
+        try {
+            const params = new URLSearchParams({ page: page.toString() });
+            if (query) {
+                params.append('q', query);
+            }
+
+            const response = await fetch(`${this.baseUrl}/users-directory/?${params.toString()}`, {
+                headers: {
+                    'X-CSRFToken': this.getCSRFToken(),
+                }
+            });
+
+            if (!response.ok) {
+                throw new Error(`HTTP error! status: ${response.status}`);
+            }
+
+            const data = await response.json();
+
+            if (data.status === 'success') {
+                return data;
+            } else {
+                throw new Error(data.message || 'Ошибка загрузки каталога пользователей');
+            }
+        } catch (error) {
+            console.error('Ошибка при загрузке каталога пользователей:', error);
+            throw new Error(`Сетевая ошибка: ${error.message}`);
+        }
+    }
+
     /**
      * Переключиться на другого пользователя
      * @param {string} userId - ID пользователя
@@ -259,6 +611,12 @@ export class ApiService {
                 throw new Error(`HTTP error! status: ${response.status}`);
             }
 
+            // Встроенные события относятся к прежнему пользователю
+            const initial = getInitialData();
+            if (initial) {
+                initial.events = null;
+            }
+
             return await response.json();
         } catch (error) {
             console.error('Ошибка при переключении пользователя:', error);
@@ -354,6 +712,51 @@ export class ApiService {
         }
     }
 
+    /**
+     * После успешной записи — событие scheduleChanged для кэшей расписания
+     * @param {Object} data - Ответ сервера
+     * @returns {Object} Тот же ответ
+     */
+    afterWrite(data) {
+        if (data?.status === 'success') {
+            document.dispatchEvent(new CustomEvent('scheduleChanged', { detail: data }));
+        }
+        return data;
+    }
+
+    /**
+     * fetch с повтором при сетевой ошибке. Запрос несет Idempotency-Key,
+     * поэтому повтор после потерянного ответа получит сохраненный ответ,
+     * а не выполнит запись второй раз.
+     * @param {string} url - Адрес
+     * @param {Object} options - Параметры fetch (с заголовком Idempotency-Key)
+     * @param {number} maxRetries - Количество повторов
+     * @returns {Promise<Response>}
+     */
+    async fetchIdempotent(url, options, maxRetries = 2) {
+        let delay = 500;
+        for (let attempt = 0; ; attempt++) {
+            try {
+                const response = await fetch(url, options);
+                // 409 с Retry-After — первый запрос с этим ключом еще выполняется
+                if (response.status === 409 && response.headers.has('Retry-After') && attempt < maxRetries) {
+                    await this.delay(delay);
+                    delay *= 2;
+                    continue;
+                }
+                return response;
+            } catch (error) {
+                // TypeError — сеть недоступна или соединение оборвано
+                if (!(error instanceof TypeError) || attempt >= maxRetries) {
+                    throw error;
+                }
+                console.warn(`Сетевая ошибка, повтор через ${delay}мс`);
+                await this.delay(delay);
+                delay *= 2;
+            }
+        }
+    }
+
     /**
      * Повторить запрос с задержкой (retry logic)
      * @param {Function} requestFn - Функция запроса
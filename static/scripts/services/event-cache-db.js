@@ -0,0 +1,92 @@
+// services/event-cache-db.js
+// Недели расписания в IndexedDB: после перезагрузки страницы неделя
+// рисуется из кэша сразу, а с сервера приходит уже проверка актуальности.
+// Любая ошибка IndexedDB (приватный режим, квота) — просто промах кэша.
+
+const DB_NAME = 'schedule-cache';
+const DB_VERSION = 1;
+const STORE_NAME = 'weeks';
+// Недели старше этого срока не показываем даже как черновик
+const MAX_AGE_MS = 7 * 24 * 60 * 60 * 1000;
+// Сколько недель хранить на устройстве
+const MAX_ENTRIES = 60;
+
+let dbPromise = null;
+
+function openDb() {
+    if (!('indexedDB' in window)) {
+        return Promise.resolve(null);
+    }
+    if (!dbPromise) {
+        dbPromise = new Promise(resolve => {
+            const request = indexedDB.open(DB_NAME, DB_VERSION);
+            request.onupgradeneeded = () => {
+                const store = request.result.createObjectStore(STORE_NAME, { keyPath: 'key' });
+                store.createIndex('savedAt', 'savedAt');
+            };
+            request.onsuccess = () => resolve(request.result);
+            request.onerror = () => resolve(null);
+        });
+    }
+    return dbPromise;
+}
+
+function requestToPromise(request) {
+    return new Promise((resolve, reject) => {
+        request.onsuccess = () => resolve(request.result);
+        request.onerror = () => reject(request.error);
+    });
+}
+
+export const eventCacheDb = {
+    /**
+     * Прочитать неделю
+     * @param {string} key - Область кэша и ключ недели
+     * @returns {Promise<Object|null>} { events, savedAt } или null
+     */
+    async getWeek(key) {
+        try {
+            const db = await openDb();
+            if (!db) return null;
+            const entry = await requestToPromise(
+                db.transaction(STORE_NAME).objectStore(STORE_NAME).get(key)
+            );
+            if (!entry || Date.now() - entry.savedAt > MAX_AGE_MS) {
+                return null;
+            }
+            return entry;
+        } catch (error) {
+            console.warn('Кэш недель недоступен:', error);
+            return null;
+        }
+    },
+
+    /**
+     * Сохранить неделю (и удалить самые старые записи сверх MAX_ENTRIES)
+     * @param {string} key - Область кэша и ключ недели
+     * @param {Array} events - События недели
+     */
+    async putWeek(key, events) {
+        try {
+            const db = await openDb();
+            if (!db) return;
+            const transaction = db.transaction(STORE_NAME, 'readwrite');
+            const store = transaction.objectStore(STORE_NAME);
+            store.put({ key, events, savedAt: Date.now() });
+
+            const count = await requestToPromise(store.count());
+            if (count > MAX_ENTRIES) {
+                let excess = count - MAX_ENTRIES;
+                store.index('savedAt').openCursor().onsuccess = (event) => {
+                    const cursor = event.target.result;
+                    if (cursor && excess-- > 0) {
+                        cursor.delete();
+                        cursor.continue();
+                    }
+                };
+            }
+        } catch (error) {
+            console.warn('Не удалось сохранить неделю в кэш:', error);
+        }
+    }
+};
@@ -1,7 +1,9 @@
 import { ApiService } from './api-service.js';
 import { OverlayManager } from './overlay-manager.js';
 import { eventStore } from './event-store.js';
-import { eventUtils } from '../utils/utils.js';
+import { eventCacheDb } from './event-cache-db.js';
+import { eventUtils, dateUtils } from '../utils/utils.js';
+import { findConflicts, toConflictResult } from '../utils/conflict-engine.js';
 import { EventDTO } from '../models/event-dto.js';
 
 import { EventModal } from '../components/event-modal.js';
@@ -22,6 +24,7 @@ export class EventManager {
         this.currentWeek = options.currentWeek || null;
         this.isInitialized = false;
         this.initPromise = null;
+        this.weekLoadId = 0; // ответ для уже покинутой недели не рисуем
 
         // Таймеры
         this.resizeTimer = null;
@@ -30,6 +33,7 @@ export class EventManager {
         this.handleResize = this.handleResize.bind(this);
         this.handleKeydown = this.handleKeydown.bind(this);
         this.onOverlayClicked = this.onOverlayClicked.bind(this);
+        this.onScheduleChanged = this.onScheduleChanged.bind(this);
 
         this.initPromise = this.init();
     }
@@ -102,6 +106,9 @@ export class EventManager {
         // ← ДОБАВЛЕНО: Обработчик кликов по overlay
         document.addEventListener('overlayClicked', this.onOverlayClicked);
 
+        // Любая запись (ApiService.afterWrite) делает закэшированные недели устаревшими
+        document.addEventListener('scheduleChanged', this.onScheduleChanged);
+
         // Обработчики для модального окна
         this.setupModalHandlers();
     }
@@ -138,6 +145,10 @@ export class EventManager {
     }
 
 
+    onScheduleChanged() {
+        this.eventStore.markAllStale();
+    }
+
     /**
      * Проверить, можно ли редактировать событие
      */
@@ -244,7 +255,10 @@ export class EventManager {
 
 
     /**
-     * Загрузить события для текущей недели
+     * Загрузить события для текущей недели.
+     * Неделя сразу рисуется из кэша (память, затем IndexedDB), затем
+     * проверяется на сервере и перерисовывается, только если изменилась.
+     * Соседние недели подгружаются в простое браузера.
      * @param {Array} weekDays - Дни недели
      */
     async loadEventsForWeek(weekDays = null) {
@@ -261,25 +275,122 @@ export class EventManager {
                 return;
             }
 
-            // Очищаем существующие overlay
-            this.overlayManager.clearAll();
+            const dateFrom = targetWeekDays[0].date;
+            const dateTo = targetWeekDays[targetWeekDays.length - 1].date;
+            const loadId = ++this.weekLoadId;
+            this.eventStore.setScope(this.getCacheScope());
+
+            // 1. Из кэша — без ожидания сети
+            let cached = this.eventStore.getWeekEvents(dateFrom, dateTo);
+            if (!cached) {
+                const entry = await eventCacheDb.getWeek(this.getCacheKey(dateFrom, dateTo));
+                if (entry && loadId === this.weekLoadId) {
+                    this.eventStore.setWeekEvents(dateFrom, dateTo, entry.events, { loadedAt: 0, silent: true });
+                    cached = entry.events;
+                }
+            }
+            if (loadId !== this.weekLoadId) {
+                return;
+            }
+            if (cached) {
+                this.renderEvents(cached);
+            } else {
+                // Очищаем overlay прошлой недели
+                this.overlayManager.clearAll();
+            }
+
+            // 2. Проверка на сервере (недавно загруженную неделю не перезапрашиваем)
+            if (!this.eventStore.isWeekFresh(dateFrom, dateTo)) {
+                const events = await this.apiService.loadEventsForWeek(targetWeekDays);
+                const normalizedEvents = events.map(event => eventUtils.normalizeEvent(event));
 
-            // Загружаем события с сервера
-            const events = await this.apiService.loadEventsForWeek(targetWeekDays);
+                this.eventStore.setWeekEvents(dateFrom, dateTo, normalizedEvents);
+                eventCacheDb.putWeek(this.getCacheKey(dateFrom, dateTo), normalizedEvents);
 
-            // ✅ СОХРАНЯЕМ В EventStore
-            const normalizedEvents = events.map(event => eventUtils.normalizeEvent(event));
-            this.eventStore.setEvents(normalizedEvents);
+                if (loadId === this.weekLoadId && !this.isSameWeek(cached, normalizedEvents)) {
+                    this.renderEvents(normalizedEvents);
+                }
+            }
 
-            // Создаем overlay для каждого события
-            events.forEach(event => {
-                this.createEventOverlay(event);
-            });
+            if (loadId === this.weekLoadId) {
+                this.schedulePrefetch(dateFrom, dateTo);
+            }
         } catch (error) {
             console.error('Ошибка при загрузке событий:', error);
         }
     }
 
+    /**
+     * Перерисовать overlay недели (дифф по ID, в следующем кадре)
+     * @param {Array} events - События недели
+     * @returns {Promise}
+     */
+    renderEvents(events) {
+        return this.overlayManager.sync(events.map(event => ({
+            ...event,
+            startMinutes: event.startMinutes !== undefined
+                ? event.startMinutes
+                : parseInt(event.time.split(':')[1] || '0')
+        })));
+    }
+
+    /**
+     * Совпадает ли неделя из кэша с ответом сервера
+     */
+    isSameWeek(cachedEvents, events) {
+        if (!cachedEvents || cachedEvents.length !== events.length) {
+            return false;
+        }
+        const serialize = list => JSON.stringify(
+            [...list].sort((a, b) => String(a.id).localeCompare(String(b.id)))
+        );
+        return serialize(cachedEvents) === serialize(events);
+    }
+
+    /**
+     * Подгрузить предыдущую и следующую недели, когда браузер простаивает
+     */
+    schedulePrefetch(dateFrom, dateTo) {
+        const whenIdle = window.requestIdleCallback || (callback => setTimeout(callback, 200));
+        whenIdle(() => {
+            [-7, 7].forEach(days => {
+                this.prefetchWeek(dateUtils.addDays(dateFrom, days), dateUtils.addDays(dateTo, days));
+            });
+        });
+    }
+
+    async prefetchWeek(dateFrom, dateTo) {
+        if (this.eventStore.isWeekFresh(dateFrom, dateTo)) {
+            return;
+        }
+        const scope = this.eventStore.scope;
+        try {
+            const events = await this.apiService.loadEvents(dateFrom, dateTo);
+            // Пока шел запрос, могли переключить пользователя
+            if (this.eventStore.scope !== scope) {
+                return;
+            }
+            const normalizedEvents = events.map(event => eventUtils.normalizeEvent(event));
+            this.eventStore.setWeekEvents(dateFrom, dateTo, normalizedEvents, { silent: true });
+            eventCacheDb.putWeek(this.getCacheKey(dateFrom, dateTo), normalizedEvents);
+        } catch (error) {
+            console.warn('Не удалось подгрузить соседнюю неделю:', error);
+        }
+    }
+
+    /**
+     * Область кэша: кто смотрит и чье расписание
+     */
+    getCacheScope() {
+        const userSelect = document.getElementById('user-select');
+        const target = userSelect && userSelect.value ? userSelect.value : 'self';
+        return `${this.apiService.getCurrentUserId()}:${target}`;
+    }
+
+    getCacheKey(dateFrom, dateTo) {
+        return `${this.getCacheScope()}|${dateFrom}|${dateTo}`;
+    }
+
     /**
      * СОЗДАТЬ событие (новая версия с EventStore)
      * @param {Object} eventData - Данные события
@@ -300,6 +411,11 @@ export class EventManager {
                 
                 // Создаем overlay
                 this.createEventOverlay(storedEvent);
+
+                // Будущие события серии создаются в фоне
+                if (response.job_id) {
+                    this.refreshAfterJob(response.job_id);
+                }
                 
                 // console.log('✅ Событие создано и сохранено в EventStore:', storedEvent);
                 return storedEvent;
@@ -311,6 +427,24 @@ export class EventManager {
         }
     }
 
+    /**
+     * Перезагрузить неделю, когда фоновая задача серии завершится
+     * @param {number} jobId - ID задачи
+     */
+    async refreshAfterJob(jobId) {
+        try {
+            const job = await this.apiService.waitForJob(jobId);
+            if (job.state === 'failed') {
+                console.error('❌ Фоновая задача серии завершилась с ошибкой:', job.error);
+            }
+            // Задача дописала события в соседние недели
+            this.eventStore.markAllStale();
+            await this.loadEventsForWeek();
+        } catch (error) {
+            console.error('Ошибка ожидания фоновой задачи:', error);
+        }
+    }
+
     /**
      * Подготовить данные события перед отправкой
      */
@@ -381,6 +515,29 @@ export class EventManager {
         }
     }
 
+    /**
+     * Проверить пересечения слота.
+     * Если неделя с этой датой загружена — ответ по EventStore без запроса,
+     * иначе — /check-event-conflict/. Окончательно проверяет сервер при сохранении
+     * @param {string} date - Дата (YYYY-MM-DD)
+     * @param {string} time - Время (HH:MM)
+     * @param {number} duration - Продолжительность в часах
+     * @param {string} excludeEventId - ID события для исключения из проверки
+     * @returns {Promise<Object>} { hasConflict, message, conflictingEvents, checkedLocally }
+     */
+    async checkConflict(date, time, duration, excludeEventId = null) {
+        if (this.eventStore.coversDate(date)) {
+            const conflicts = findConflicts(
+                this.eventStore.getEventsByDate(date),
+                { date, time, duration },
+                [excludeEventId]
+            );
+            return { ...toConflictResult(conflicts), checkedLocally: true };
+        }
+        const result = await this.apiService.checkEventConflict(date, time, duration, excludeEventId);
+        return { ...result, checkedLocally: false };
+    }
+
     /**
      * Обновить позиции overlay (публичный метод для внешнего вызова)
      */
@@ -417,6 +574,7 @@ export class EventManager {
         window.removeEventListener('scroll', this.handleResize);
         document.removeEventListener('keydown', this.handleKeydown);
         document.removeEventListener('overlayClicked', this.onOverlayClicked);
+        document.removeEventListener('scheduleChanged', this.onScheduleChanged);
 
         const scheduleWrapper = document.querySelector('.schedule-wrapper');
         if (scheduleWrapper) {
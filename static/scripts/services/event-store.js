@@ -1,34 +1,123 @@
 // stores/event-store.js
+
+// Сколько недель держать в памяти (текущая, соседние и недавно открытые)
+const MAX_CACHED_WEEKS = 8;
+// Неделя, загруженная недавно, при возврате на нее не перезапрашивается
+const WEEK_FRESH_MS = 30 * 1000;
+
 class EventStore {
     constructor() {
         this.events = new Map(); // Все события по ID
+        this.byDate = new Map(); // date → Set(ID)
+        this.bySeries = new Map(); // series_id → Set(ID)
+        this.weeks = new Map(); // ключ недели → { dateFrom, dateTo, ids, loadedAt }; порядок — LRU
+        this.scope = null; // чье расписание и для кого закэшировано
         this.currentEvent = null; // Текущее редактируемое событие
         this.subscribers = new Set(); // Подписчики на изменения
     }
 
-    // СОХРАНИТЬ события из API
+    // КЛЮЧ недели в кэше
+    static weekKey(dateFrom, dateTo) {
+        return `${dateFrom}|${dateTo}`;
+    }
+
+    // ОБЛАСТЬ кэша: текущий пользователь + выбранное расписание.
+    // При смене области кэш в памяти сбрасывается
+    setScope(scope) {
+        if (this.scope !== scope) {
+            this.scope = scope;
+            this.clear();
+        }
+    }
+
+    // СОХРАНИТЬ события из API (без привязки к неделе — заменяют все)
     setEvents(apiEvents) {
-        this.events.clear();
+        this.clear();
+        apiEvents.forEach(event => this.index(this.normalizeEvent(event)));
+        this.notifySubscribers();
+    }
+
+    // СОХРАНИТЬ события недели: заменяют прежние события этой недели
+    setWeekEvents(dateFrom, dateTo, apiEvents, { loadedAt = Date.now(), silent = false } = {}) {
+        const key = EventStore.weekKey(dateFrom, dateTo);
+        const previous = this.weeks.get(key);
+        const ids = new Set();
+
         apiEvents.forEach(event => {
-            // Нормализуем данные и гарантируем все поля
             const normalizedEvent = this.normalizeEvent(event);
-            this.events.set(normalizedEvent.id, normalizedEvent);
+            this.index(normalizedEvent);
+            ids.add(String(normalizedEvent.id));
         });
-        this.notifySubscribers();
+
+        this.weeks.delete(key);
+        this.weeks.set(key, { dateFrom, dateTo, ids, loadedAt });
+
+        if (previous) {
+            previous.ids.forEach(id => {
+                if (!ids.has(id)) this.forgetIfUnused(id);
+            });
+        }
+
+        this.evictOldWeeks();
+        if (!silent) {
+            this.notifySubscribers();
+        }
+    }
+
+    // ПОЛУЧИТЬ события недели из кэша (null — неделя не загружена)
+    getWeekEvents(dateFrom, dateTo) {
+        const key = EventStore.weekKey(dateFrom, dateTo);
+        const week = this.weeks.get(key);
+        if (!week) {
+            return null;
+        }
+        // Отмечаем как недавно использованную
+        this.weeks.delete(key);
+        this.weeks.set(key, week);
+        return Array.from(week.ids, id => this.events.get(id)).filter(Boolean);
+    }
+
+    // ЕСТЬ ли свежая копия недели (не нужно перезапрашивать)
+    isWeekFresh(dateFrom, dateTo) {
+        const week = this.weeks.get(EventStore.weekKey(dateFrom, dateTo));
+        return Boolean(week) && Date.now() - week.loadedAt < WEEK_FRESH_MS;
+    }
+
+    // ЗАГРУЖЕНА ли неделя с этой датой (тогда события дня известны целиком)
+    coversDate(date) {
+        for (const week of this.weeks.values()) {
+            if (week.dateFrom <= date && date <= week.dateTo) return true;
+        }
+        return false;
+    }
+
+    // ПОМЕТИТЬ все недели устаревшими (после записи: серия меняет и соседние недели)
+    markAllStale() {
+        this.weeks.forEach(week => { week.loadedAt = 0; });
     }
 
     // ДОБАВИТЬ/ОБНОВИТЬ одно событие
     setEvent(eventData) {
         const normalizedEvent = this.normalizeEvent(eventData);
-        this.events.set(normalizedEvent.id, normalizedEvent);
+        this.index(normalizedEvent);
+        const id = String(normalizedEvent.id);
+        this.weeks.forEach(week => {
+            if (week.dateFrom <= normalizedEvent.date && normalizedEvent.date <= week.dateTo) {
+                week.ids.add(id);
+            } else {
+                week.ids.delete(id);
+            }
+        });
         this.notifySubscribers();
         return normalizedEvent;
     }
 
     // УДАЛИТЬ событие
     removeEvent(eventId) {
-        this.events.delete(eventId);
-        if (this.currentEvent?.id === eventId) {
+        const id = String(eventId);
+        this.unindex(id);
+        this.weeks.forEach(week => week.ids.delete(id));
+        if (String(this.currentEvent?.id) === id) {
             this.currentEvent = null;
         }
         this.notifySubscribers();
@@ -42,7 +131,7 @@ class EventStore {
 
     // ПОЛУЧИТЬ событие по ID
     getEvent(id) {
-        return this.events.get(id);
+        return this.events.get(String(id));
     }
 
     // ПОЛУЧИТЬ все события
@@ -50,9 +139,78 @@ class EventStore {
         return Array.from(this.events.values());
     }
 
-    // ПОИСК по series_id
+    // ПОИСК по дате — по индексу
+    getEventsByDate(date) {
+        return Array.from(this.byDate.get(date) || [], id => this.events.get(id));
+    }
+
+    // ПОИСК по series_id — по индексу
     getEventsBySeries(seriesId) {
-        return this.getAllEvents().filter(event => event.series_id === seriesId);
+        return Array.from(this.bySeries.get(seriesId) || [], id => this.events.get(id));
+    }
+
+    // ОЧИСТИТЬ кэш
+    clear() {
+        this.events.clear();
+        this.byDate.clear();
+        this.bySeries.clear();
+        this.weeks.clear();
+    }
+
+    // Индексы: событие сначала снимается со старых даты/серии
+    index(event) {
+        const id = String(event.id);
+        this.unindex(id);
+        this.events.set(id, event);
+        this.addToIndex(this.byDate, event.date, id);
+        if (event.series_id) {
+            this.addToIndex(this.bySeries, event.series_id, id);
+        }
+    }
+
+    unindex(id) {
+        const previous = this.events.get(id);
+        if (!previous) {
+            return;
+        }
+        this.removeFromIndex(this.byDate, previous.date, id);
+        if (previous.series_id) {
+            this.removeFromIndex(this.bySeries, previous.series_id, id);
+        }
+        this.events.delete(id);
+    }
+
+    addToIndex(indexMap, key, id) {
+        let ids = indexMap.get(key);
+        if (!ids) {
+            ids = new Set();
+            indexMap.set(key, ids);
+        }
+        ids.add(id);
+    }
+
+    removeFromIndex(indexMap, key, id) {
+        const ids = indexMap.get(key);
+        if (ids) {
+            ids.delete(id);
+            if (ids.size === 0) indexMap.delete(key);
+        }
+    }
+
+    // Событие удаляется из памяти, если ни одна неделя на него не ссылается
+    forgetIfUnused(id) {
+        for (const week of this.weeks.values()) {
+            if (week.ids.has(id)) return;
+        }
+        this.unindex(id);
+    }
+
+    evictOldWeeks() {
+        while (this.weeks.size > MAX_CACHED_WEEKS) {
+            const [oldestKey, oldest] = this.weeks.entries().next().value;
+            this.weeks.delete(oldestKey);
+            oldest.ids.forEach(id => this.forgetIfUnused(id));
+        }
     }
 
     // НОРМАЛИЗАЦИЯ данных события (решает проблему с series_id!)
@@ -85,4 +243,4 @@ class EventStore {
     }
 }
 
-export const eventStore = new EventStore();
\ No newline at end of file
+export const eventStore = new EventStore();
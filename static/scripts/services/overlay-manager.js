@@ -7,6 +7,9 @@ export class OverlayManager {
     constructor() {
         this.overlaysContainer = document.getElementById('events-overlay');
         this.overlays = new Map(); // Храним overlay по ID для быстрого доступа
+        this.events = new Map(); // ID → данные события, которые должны быть на экране
+        this.signatures = new Map(); // ID → подпись отрисованных данных (для диффа)
+        this.framePromise = null; // Отложенная до следующего кадра отрисовка
         this.setupContainer();
     }
 
@@ -38,6 +41,152 @@ export class OverlayManager {
         return this.create(cell, eventData);
     }
 
+    /**
+     * Показать ровно эти события (ключ — ID).
+     * Отрисовка откладывается до следующего кадра и склеивает все вызовы
+     * за кадр; в DOM меняются только overlay, чьи данные изменились
+     * @param {Array} events - События недели
+     * @returns {Promise} Выполняется после отрисовки
+     */
+    sync(events) {
+        this.events = new Map();
+        events.forEach(eventData => {
+            if (eventData.id !== undefined && eventData.id !== null) {
+                this.events.set(String(eventData.id), eventData);
+            }
+        });
+        return this.scheduleRender();
+    }
+
+    /**
+     * Запланировать отрисовку на следующий кадр (один раз на кадр)
+     * @returns {Promise}
+     */
+    scheduleRender() {
+        if (!this.framePromise) {
+            this.framePromise = new Promise(resolve => {
+                requestAnimationFrame(() => {
+                    this.framePromise = null;
+                    this.render();
+                    resolve();
+                });
+            });
+        }
+        return this.framePromise;
+    }
+
+    /**
+     * Привести overlay к this.events.
+     * Сначала все чтения геометрии, затем все записи в DOM — без
+     * принудительных пересчетов раскладки между overlay.
+     * События в часах, которых нет в сетке (скрытые часы), не рисуются
+     */
+    render() {
+        const cells = this.indexCells();
+
+        // 1. Чтение: позиции всех видимых событий
+        const layout = new Map();
+        this.events.forEach((eventData, id) => {
+            const cell = cells.get(this.cellKey(eventData));
+            if (cell) {
+                layout.set(id, domUtils.calculateEventPosition(cell, eventData.duration, eventData.time));
+            }
+        });
+
+        // 2. Запись: удаляем лишние, патчим измененные, создаем новые
+        this.overlays.forEach((overlay, id) => {
+            if (!layout.has(id)) {
+                overlay.remove();
+                this.overlays.delete(id);
+                this.signatures.delete(id);
+            }
+        });
+
+        const fragment = document.createDocumentFragment();
+        layout.forEach((position, id) => {
+            const eventData = this.events.get(id);
+            const signature = this.getSignature(eventData);
+            const overlay = this.overlays.get(id);
+
+            if (!overlay) {
+                const newOverlay = this.createOverlayElement(eventData, position);
+                this.setupOverlayEvents(newOverlay, eventData);
+                this.registerOverlay(id, newOverlay);
+                fragment.appendChild(newOverlay);
+            } else {
+                if (this.signatures.get(id) !== signature) {
+                    this.patchOverlay(overlay, eventData);
+                }
+                this.applyPosition(overlay, position);
+            }
+            this.signatures.set(id, signature);
+        });
+
+        if (fragment.childNodes.length) {
+            this.addOverlayToContainer(fragment);
+        }
+    }
+
+    /**
+     * Ячейки сетки по ключу "дата|ЧЧ:00" — один запрос к DOM на отрисовку
+     * @returns {Map<string, HTMLElement>}
+     */
+    indexCells() {
+        const cells = new Map();
+        document.querySelectorAll('.schedule-cell[data-date]').forEach(cell => {
+            cells.set(`${cell.getAttribute('data-date')}|${cell.getAttribute('data-time')}`, cell);
+        });
+        return cells;
+    }
+
+    cellKey(eventData) {
+        const dto = new EventDTO(eventData);
+        return `${eventData.date}|${dto.getHours().toString().padStart(2, '0')}:00`;
+    }
+
+    /**
+     * Подпись отображаемых полей события: совпала — overlay не трогаем
+     * @param {Object} eventData - Данные события
+     * @returns {string}
+     */
+    getSignature(eventData) {
+        return Object.values(DATA_ATTRIBUTE_MAPPING)
+            .map(field => eventData[field])
+            .concat(eventData.text)
+            .join('\u0000');
+    }
+
+    /**
+     * Обновить существующий overlay под новые данные события
+     * @param {HTMLElement} overlay - Overlay элемент
+     * @param {Object} eventData - Данные события
+     */
+    patchOverlay(overlay, eventData) {
+        overlay.className = `event-item ${eventData.color || 'blue'}`;
+        overlay.textContent = eventData.text || '';
+
+        Object.keys(DATA_ATTRIBUTE_MAPPING).forEach(attr => overlay.removeAttribute(attr));
+        this.setOverlayAttributes(overlay, eventData);
+
+        if (eventData.duration < 1.5) {
+            overlay.classList.add('short');
+        }
+    }
+
+    /**
+     * Применить позицию (пишем только изменившиеся свойства)
+     * @param {HTMLElement} overlay - Overlay элемент
+     * @param {Object} position - Позиция и размеры
+     */
+    applyPosition(overlay, position) {
+        ['top', 'left', 'width', 'height'].forEach(property => {
+            const value = `${position[property]}px`;
+            if (overlay.style[property] !== value) {
+                overlay.style[property] = value;
+            }
+        });
+    }
+
     findCellForEvent(eventData) {
         const dto = new EventDTO(eventData);
         const baseTime = `${dto.getHours().toString().padStart(2, '0')}:00`;
@@ -72,6 +221,12 @@ export class OverlayManager {
 
         this.setupOverlayEvents(overlay, eventData);
 
+        // Созданный напрямую overlay — часть отображаемого состояния
+        if (eventData.id !== undefined && eventData.id !== null) {
+            this.events.set(String(eventData.id), eventData);
+            this.signatures.set(String(eventData.id), this.getSignature(eventData));
+        }
+
         return overlay;
     }
 
@@ -144,7 +299,7 @@ export class OverlayManager {
 
     /**
      * Добавить overlay в контейнер
-     * @param {HTMLElement} overlay - Overlay элемент
+     * @param {HTMLElement|DocumentFragment} overlay - Overlay элемент или пачка
      */
     addOverlayToContainer(overlay) {
         if (this.overlaysContainer) {
@@ -161,7 +316,7 @@ export class OverlayManager {
      */
     registerOverlay(eventId, overlay) {
         if (eventId) {
-            this.overlays.set(eventId, overlay);
+            this.overlays.set(String(eventId), overlay);
         }
     }
 
@@ -174,7 +329,9 @@ export class OverlayManager {
         // Обработчик клика для редактирования
         overlay.addEventListener('click', (e) => {
             e.stopPropagation();
-            this.emitOverlayClick(overlay, eventData);
+            // После патча overlay актуальные данные лежат в this.events
+            const currentData = this.events.get(overlay.getAttribute('data-id')) || eventData;
+            this.emitOverlayClick(overlay, currentData);
         });
 
         // Дополнительные события можно добавить здесь
@@ -230,11 +387,13 @@ export class OverlayManager {
      * @returns {boolean} Успешно ли удалено
      */
     remove(eventId) {
-        const overlay = this.overlays.get(eventId);
+        const overlay = this.overlays.get(String(eventId));
+        this.events.delete(String(eventId));
+        this.signatures.delete(String(eventId));
 
         if (overlay) {
             overlay.remove();
-            this.overlays.delete(eventId);
+            this.overlays.delete(String(eventId));
             return true;
         }
 
@@ -257,6 +416,8 @@ export class OverlayManager {
             overlay.remove();
         });
         this.overlays.clear();
+        this.events.clear();
+        this.signatures.clear();
 
         // Дополнительная очистка DOM на случай рассинхронизации
         if (this.overlaysContainer) {
@@ -266,12 +427,12 @@ export class OverlayManager {
 
     /**
      * Обновить позиции всех overlay
-     * Используется при изменении размера окна или прокрутке
+     * Используется при изменении размера окна, прокрутке и показе/скрытии
+     * часов (события в появившихся часах дорисовываются)
+     * @returns {Promise} Выполняется после отрисовки
      */
     updatePositions() {
-        this.overlays.forEach((overlay, eventId) => {
-            this.updateOverlayPosition(overlay);
-        });
+        return this.scheduleRender();
     }
 
 
@@ -309,7 +470,7 @@ export class OverlayManager {
      * @returns {HTMLElement|null} Overlay элемент или null
      */
     findById(eventId) {
-        return this.overlays.get(eventId) ||
+        return this.overlays.get(String(eventId)) ||
                document.querySelector(`.event-item[data-id="${eventId}"]`);
     }
 
@@ -344,7 +505,7 @@ export class OverlayManager {
      * @returns {boolean} Существует ли overlay
      */
     exists(eventId) {
-        return this.overlays.has(eventId) ||
+        return this.overlays.has(String(eventId)) ||
                !!document.querySelector(`.event-item[data-id="${eventId}"]`);
     }
 
@@ -407,6 +568,8 @@ export class OverlayManager {
                 const eventId = overlay.getAttribute('data-id');
                 if (eventId) {
                     this.overlays.delete(eventId);
+                    this.events.delete(eventId);
+                    this.signatures.delete(eventId);
                 }
                 overlay.remove();
                 removedCount++;
@@ -6,6 +6,7 @@ export class TimelineManager {
         this.DAY_IDS = ['mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun'];
         this.updateInterval = null;
         this.isInitialized = false;
+        this.frameId = null; // Запланированная перерисовка линий
 
         // Привязка контекста
         this.update = this.update.bind(this);
@@ -37,20 +38,34 @@ export class TimelineManager {
     }
 
     /**
-     * Основной метод обновления линий
+     * Основной метод обновления линий.
+     * Вызовы склеиваются до следующего кадра
      */
     update() {
+        if (this.frameId) return;
+        this.frameId = requestAnimationFrame(() => {
+            this.frameId = null;
+            this.render();
+        });
+    }
+
+    /**
+     * Перерисовка линий: сначала все чтения геометрии, затем записи.
+     * Элементы линий создаются один раз и переиспользуются
+     */
+    render() {
         if (!this.currentWeek) return;
 
         const now = new Date();
         const currentDateStr = now.toISOString().split('T')[0];
 
-        // Удаляем все существующие линии
-        this.removeAllLines();
-
         // Проверяем, находится ли текущая дата в отображаемой неделе
         const isCurrentWeek = this.currentWeek.days.some(day => day.date === currentDateStr);
-        if (!isCurrentWeek) return;
+        const scheduleContainer = document.querySelector('.schedule-container');
+        if (!isCurrentWeek || !scheduleContainer) {
+            this.hideLines();
+            return;
+        }
 
         const currentDay = now.getDay();
         const currentHour = now.getHours();
@@ -59,54 +74,37 @@ export class TimelineManager {
         // Преобразуем воскресенье (0) в 6 для совместимости
         const adjustedCurrentDay = currentDay === 0 ? 6 : currentDay - 1;
 
-        const scheduleContainer = document.querySelector('.schedule-container');
-        if (!scheduleContainer) return;
-
+        // 1. Чтение
         const timeColumn = document.querySelector('.time-column');
         const timeColumnWidth = timeColumn ? timeColumn.offsetWidth : 60;
+        const weekLine = this.calculateWeekLine(currentHour, currentMinutes, timeColumnWidth);
+        const dayLine = this.calculateDayLine(currentHour, currentMinutes, adjustedCurrentDay, timeColumnWidth);
+        const isVisible = this.isLineVisible(currentHour, currentMinutes);
 
-        // 1. СОЗДАЕМ ЛИНИЮ НА ВСЮ НЕДЕЛЮ (тонкая)
-        const weekLine = this.createWeekLine(currentHour, currentMinutes, timeColumnWidth);
-        if (weekLine) {
-            document.querySelector('.schedule-wrapper').appendChild(weekLine);
-        }
-
-        // 2. СОЗДАЕМ ЛИНИЮ НА ТЕКУЩИЙ ДЕНЬ (толстая)
-        const dayLine = this.createDayLine(currentHour, currentMinutes, adjustedCurrentDay, timeColumnWidth);
-        if (dayLine) {
-            document.querySelector('.schedule-wrapper').appendChild(dayLine);
-        }
-
-        // Управляем видимостью линий
-        this.updateLinesVisibility(currentHour, currentMinutes);
+        // 2. Запись
+        this.applyLine('current-time-line current-time-week-line', weekLine, isVisible);
+        this.applyLine('current-time-line current-time-day-line', dayLine, isVisible);
     }
 
-
      /**
-     * Создать линию на всю неделю
+     * Геометрия линии на всю неделю (тонкой)
      */
-    createWeekLine(hour, minutes, timeColumnWidth) {
-        // 1. СОЗДАЕМ ЛИНИЮ НА ВСЮ НЕДЕЛЮ (тонкая)
+    calculateWeekLine(hour, minutes, timeColumnWidth) {
         const position = this.calculateLinePosition(hour, minutes);
         if (position === 0) return null;
 
-        const weekLine = document.createElement('div');
-        weekLine.className = 'current-time-line current-time-week-line';
-        weekLine.style.top = `${position}px`;
-        weekLine.style.left = `${Math.round(timeColumnWidth)}px`;
-
         // 🔥 ВЫРАВНИВАЕМ ШИРИНУ
-        const totalWidth = Math.round(this.calculateTotalWeekWidth());
-        weekLine.style.width = `${totalWidth}px`;
-
-        return weekLine;
+        return {
+            top: position,
+            left: Math.round(timeColumnWidth),
+            width: Math.round(this.calculateTotalWeekWidth())
+        };
     }
 
         /**
-     * Создать линию на текущий день
+     * Геометрия линии на текущий день (толстой)
      */
-    createDayLine(hour, minutes, adjustedCurrentDay, timeColumnWidth) {
-        // 2. СОЗДАЕМ ЛИНИЮ НА ТЕКУЩИЙ ДЕНЬ (толстая)
+    calculateDayLine(hour, minutes, adjustedCurrentDay, timeColumnWidth) {
         const todayCells = document.querySelectorAll(`[data-day="${this.DAY_IDS[adjustedCurrentDay]}"]`);
         if (todayCells.length === 0) return null;
 
@@ -120,31 +118,51 @@ export class TimelineManager {
         const position = this.calculateLinePosition(hour, minutes);
         if (position === 0) return null;
 
-        const dayLine = document.createElement('div');
-        dayLine.className = 'current-time-line current-time-day-line';
-
         // 🔥 ВЫРАВНИВАЕМ ВСЕ К ЦЕЛЫМ ПИКСЕЛЯМ
         const cellWidth = Math.round(currentHourCell.offsetWidth);
-        const leftPosition = Math.round(timeColumnWidth + (adjustedCurrentDay * cellWidth));
+        return {
+            top: position,
+            left: Math.round(timeColumnWidth + (adjustedCurrentDay * cellWidth)),
+            width: cellWidth
+        };
+    }
 
-        dayLine.style.top = `${position}px`;
-        dayLine.style.left = `${leftPosition}px`;
-        dayLine.style.width = `${cellWidth}px`;
+    /**
+     * Показать линию с геометрией или скрыть (geometry = null)
+     */
+    applyLine(className, geometry, isVisible) {
+        let line = document.querySelector(`.${className.split(' ').join('.')}`);
+        if (!geometry) {
+            if (line) line.style.display = 'none';
+            return;
+        }
+        if (!line) {
+            line = document.createElement('div');
+            line.className = className;
+            document.querySelector('.schedule-wrapper').appendChild(line);
+        }
 
-        return dayLine;
+        line.style.top = `${geometry.top}px`;
+        line.style.left = `${geometry.left}px`;
+        line.style.width = `${geometry.width}px`;
+        line.style.display = isVisible ? 'block' : 'none';
     }
 
-
      /**
-     * Обновить видимость линий
+     * Видны ли линии в текущий час
      */
-    updateLinesVisibility(hour, minutes) {
-        const shouldShow = shouldShowHour(hour) ||
-                          (hour === 20 && minutes > 0) ||
-                          (hour === 6 && minutes < 59);
+    isLineVisible(hour, minutes) {
+        return shouldShowHour(hour) ||
+               (hour === 20 && minutes > 0) ||
+               (hour === 6 && minutes < 59);
+    }
 
+    /**
+     * Скрыть линии (текущая дата вне отображаемой недели)
+     */
+    hideLines() {
         document.querySelectorAll('.current-time-line').forEach(line => {
-            line.style.display = shouldShow ? 'block' : 'none';
+            line.style.display = 'none';
         });
     }
 
@@ -219,6 +237,10 @@ export class TimelineManager {
         if (this.updateInterval) {
             clearInterval(this.updateInterval);
         }
+        if (this.frameId) {
+            cancelAnimationFrame(this.frameId);
+            this.frameId = null;
+        }
 
         window.removeEventListener('resize', this.handleResize);
         window.removeEventListener('scroll', this.handleScroll);
@@ -1,10 +1,11 @@
 // scripts/services/user-manager.js
-import { ApiService } from './api-service.js';
+import { ApiService, getInitialData } from './api-service.js';
 
 export class UserManager {
     constructor() {
         this.apiService = new ApiService();
         this.currentUserInfo = null;
+        this.searchTimer = null;
     }
 
      /**
@@ -15,19 +16,8 @@ export class UserManager {
         if (!userSelect) return;
 
         try {
-            // Загружаем список пользователей через ApiService
-            const users = await this.apiService.getUsersList();
-
-            // Добавляем пользователей в выпадающий список, исключая текущего
-            users.forEach(user => {
-                // 👇 Пропускаем текущего пользователя
-                if (user.id.toString() !== this.getCurrentUserId()) {
-                    const option = document.createElement('option');
-                    option.value = user.id;
-                    option.textContent = user.username;
-                    userSelect.appendChild(option);
-                }
-            });
+            // Загружаем первую страницу каталога (кэшируется на сервере)
+            await this.loadUserOptions('');
 
             // Восстанавливаем сохраненный выбор
             await this.restoreUserSelection();
@@ -37,6 +27,17 @@ export class UserManager {
                 this.handleUserSwitch(e.target.value);
             });
 
+            // Поиск по началу имени с задержкой ввода
+            const searchInput = document.getElementById('user-search');
+            if (searchInput) {
+                searchInput.addEventListener('input', (e) => {
+                    clearTimeout(this.searchTimer);
+                    this.searchTimer = setTimeout(() => {
+                        this.loadUserOptions(e.target.value.trim());
+                    }, 300);
+                });
+            }
+
             console.log('✅ User switcher initialized');
 
         } catch (error) {
@@ -44,6 +45,50 @@ export class UserManager {
         }
     }
 
+    /**
+     * Заполнить выпадающий список страницей каталога пользователей
+     * @param {string} query - Начало имени пользователя
+     */
+    async loadUserOptions(query) {
+        const userSelect = document.getElementById('user-select');
+        if (!userSelect) return;
+
+        const { users, has_next } = await this.apiService.getUsersDirectory(query);
+        const selectedValue = userSelect.value;
+        const currentUserId = this.getCurrentUserId();
+
+        // Оставляем только «Мое расписание» и выбранного пользователя
+        Array.from(userSelect.options).forEach(option => {
+            if (option.value !== 'self' && option.value !== selectedValue) {
+                option.remove();
+            }
+        });
+
+        users.forEach(user => {
+            // 👇 Пропускаем текущего и уже выбранного пользователя
+            const userId = user.id.toString();
+            if (userId !== currentUserId && userId !== selectedValue) {
+                userSelect.appendChild(this.createUserOption(userId, user.username));
+            }
+        });
+
+        if (has_next) {
+            const moreOption = this.createUserOption('', 'Уточните поиск…');
+            moreOption.disabled = true;
+            userSelect.appendChild(moreOption);
+        }
+    }
+
+    /**
+     * Создать элемент списка пользователей
+     */
+    createUserOption(userId, username) {
+        const option = document.createElement('option');
+        option.value = userId;
+        option.textContent = username;
+        return option;
+    }
+
     getCurrentUserId() {
         // Из data-атрибута
         const userElement = document.querySelector('[data-user-id]');
@@ -74,7 +119,9 @@ export class UserManager {
                 this.updateUserInfoDisplay();
 
                 // 👇 ДОБАВЬТЕ ЭТУ СТРОКУ - сохраняем выбор
-                this.saveUserSelection(userId);
+                const userSelect = document.getElementById('user-select');
+                const username = userSelect?.selectedOptions[0]?.textContent || '';
+                this.saveUserSelection(userId, username);
 
                 // Создаем событие для уведомления других модулей
                 this.dispatchUserChangedEvent(userId);
@@ -91,9 +138,10 @@ export class UserManager {
     /**
      * Сохраняет выбранного пользователя в localStorage
      */
-    saveUserSelection(userId) {
+    saveUserSelection(userId, username = '') {
         try {
             localStorage.setItem('selectedUserId', userId);
+            localStorage.setItem('selectedUsername', username);
         } catch (error) {
             console.warn('Не удалось сохранить выбор пользователя:', error);
         }
@@ -119,10 +167,18 @@ export class UserManager {
         const userSelect = document.getElementById('user-select');
 
         if (userSelect && savedUserId) {
+            // Выбранного пользователя может не быть на первой странице каталога
+            if (!Array.from(userSelect.options).some(option => option.value === savedUserId)) {
+                const savedUsername = localStorage.getItem('selectedUsername') || savedUserId;
+                userSelect.appendChild(this.createUserOption(savedUserId, savedUsername));
+            }
             userSelect.value = savedUserId;
 
-            // Если выбран не "self", применяем выбор
-            if (savedUserId !== 'self') {
+            // Сервер уже отдал расписание целевого пользователя из сессии —
+            // переключаемся, только если он не совпадает с сохраненным выбором
+            const targetUser = getInitialData()?.target_user;
+            const activeUserId = !targetUser || targetUser.is_self ? 'self' : targetUser.id.toString();
+            if (savedUserId !== activeUserId) {
                 await this.handleUserSwitch(savedUserId);
             }
         }
@@ -195,6 +251,7 @@ export class UserManager {
             userSelect.replaceWith(userSelect.cloneNode(true)); // Удаляем обработчики
         }
 
+        clearTimeout(this.searchTimer);
         this.currentUserInfo = null;
         console.log('🧹 User manager cleaned up');
     }
@@ -0,0 +1,65 @@
+// utils/conflict-engine.js
+// Проверка пересечений по событиям, уже загруженным в браузер.
+// Семантика — как у check_event_conflict на сервере: интервалы
+// [начало, начало + длительность) в минутах пересекаются, если
+// start < eventEnd && end > eventStart. Окончательно пересечения
+// проверяет сервер при сохранении (reject_conflicts).
+
+/**
+ * Время "ЧЧ:ММ" (или "ЧЧ:ММ:СС") в минуты от начала дня
+ * @param {string} time
+ * @returns {number}
+ */
+export function timeToMinutes(time) {
+    const [hours, minutes = '0'] = String(time).split(':');
+    return parseInt(hours, 10) * 60 + parseInt(minutes, 10);
+}
+
+/**
+ * События, пересекающиеся со слотом
+ * @param {Array} events - События (достаточно событий дня слота)
+ * @param {Object} slot - { date, time, duration }
+ * @param {Array} excludeIds - ID, которые не учитываются (само редактируемое событие)
+ * @returns {Array} Пересекающиеся события
+ */
+export function findConflicts(events, { date, time, duration }, excludeIds = []) {
+    const excluded = new Set(
+        excludeIds.filter(id => id !== null && id !== undefined && id !== '').map(String)
+    );
+    const start = timeToMinutes(time);
+    const end = start + parseFloat(duration) * 60;
+
+    return events.filter(event => {
+        if (event.date !== date || excluded.has(String(event.id))) {
+            return false;
+        }
+        const eventStart = timeToMinutes(event.time);
+        const eventEnd = eventStart + parseFloat(event.duration) * 60;
+        return start < eventEnd && end > eventStart;
+    });
+}
+
+/**
+ * Результат в формате ответа /check-event-conflict/
+ * @param {Array} conflicts - Пересекающиеся события
+ * @returns {Object} { hasConflict, message, conflictingEvents }
+ */
+export function toConflictResult(conflicts) {
+    if (conflicts.length === 0) {
+        return { hasConflict: false, message: 'Конфликтов не обнаружено' };
+    }
+    const conflictingEvents = conflicts.map(event => ({
+        id: event.id,
+        text: event.text,
+        time: String(event.time).slice(0, 5),
+        duration: parseFloat(event.duration),
+        color: event.color
+    }));
+    return {
+        hasConflict: true,
+        message: 'Конфликт с событиями: ' + conflictingEvents
+            .map(event => `${event.text} (${event.time}, ${event.duration}ч)`)
+            .join(', '),
+        conflictingEvents
+    };
+}
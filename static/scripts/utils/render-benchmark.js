@@ -0,0 +1,123 @@
+// utils/render-benchmark.js
+// Бенчмарк отрисовки недели в браузере: полная пересборка overlay против
+// диффа по ID (OverlayManager.sync). Запуск из консоли на открытой неделе:
+// динамически импортировать этот модуль (scripts/utils/render-benchmark.js
+// из статики) и вызвать runRenderBenchmark с параметром eventCount, например 200.
+// Путь нельзя писать в виде вызова импорта: ManifestStaticFilesStorage
+// переписывает импорты и в комментариях, а самоимпорт не дает хэшу сойтись.
+//
+// Overlay приложения на время замера убираются из контейнера и потом
+// возвращаются, данные на сервер не отправляются.
+
+import { OverlayManager } from '../services/overlay-manager.js';
+
+const COLORS = ['blue', 'green', 'red', 'orange', 'purple'];
+
+function nextFrame() {
+    return new Promise(resolve => requestAnimationFrame(() => resolve()));
+}
+
+// Синтетическая неделя: события по видимым ячейкам текущей сетки
+function buildWeek(eventCount) {
+    const cells = Array.from(document.querySelectorAll('.schedule-cell[data-date]'));
+    if (cells.length === 0) {
+        throw new Error('Сетка расписания не найдена');
+    }
+    return Array.from({ length: eventCount }, (_, index) => {
+        const cell = cells[index % cells.length];
+        const minutes = (Math.floor(index / cells.length) * 15) % 60;
+        return {
+            id: `bench-${index}`,
+            series_id: null,
+            date: cell.getAttribute('data-date'),
+            time: `${cell.getAttribute('data-time').slice(0, 2)}:${minutes.toString().padStart(2, '0')}`,
+            text: `Событие ${index}`,
+            color: COLORS[index % COLORS.length],
+            duration: 0.25,
+            is_recurring: false,
+            canEdit: true
+        };
+    });
+}
+
+// Изменить одно событие (как после сохранения в модалке)
+function touchOne(events, iteration) {
+    const index = iteration % events.length;
+    return events.map((event, position) => position === index
+        ? { ...event, text: `${event.text} *`, color: COLORS[(iteration + 1) % COLORS.length] }
+        : event);
+}
+
+// Время синхронной работы + число мутаций DOM
+function measure(container, action) {
+    let mutations = 0;
+    const observer = new MutationObserver(records => { mutations += records.length; });
+    observer.observe(container, { childList: true, attributes: true, characterData: true, subtree: true });
+
+    const start = performance.now();
+    action();
+    void container.offsetHeight; // раскладка входит в замер
+    const elapsed = performance.now() - start;
+
+    mutations += observer.takeRecords().length;
+    observer.disconnect();
+    return { elapsed, mutations };
+}
+
+function summarize(name, samples) {
+    const times = samples.map(sample => sample.elapsed).sort((a, b) => a - b);
+    return {
+        'Способ': name,
+        'Медиана, мс': Number(times[Math.floor(times.length / 2)].toFixed(2)),
+        'Максимум, мс': Number(times[times.length - 1].toFixed(2)),
+        'Мутаций DOM': Math.round(samples.reduce((sum, sample) => sum + sample.mutations, 0) / samples.length)
+    };
+}
+
+/**
+ * Сравнить полную пересборку и дифф на неделе из eventCount событий
+ * @param {Object} options - { eventCount, iterations }
+ * @returns {Promise<Array>} Строки результата (они же выводятся в console.table)
+ */
+export async function runRenderBenchmark({ eventCount = 200, iterations = 20 } = {}) {
+    const container = document.getElementById('events-overlay');
+    const saved = document.createDocumentFragment();
+    saved.append(...container.childNodes);
+
+    const manager = new OverlayManager();
+    let events = buildWeek(eventCount);
+    const full = [];
+    const incremental = [];
+
+    try {
+        // Полная пересборка: как раньше при каждом уведомлении
+        for (let i = 0; i < iterations; i++) {
+            events = touchOne(events, i);
+            full.push(measure(container, () => {
+                manager.clearAll();
+                events.forEach(event => manager.createFromData(event));
+            }));
+            await nextFrame();
+        }
+
+        // Дифф: меняется только overlay измененного события
+        manager.clearAll();
+        await manager.sync(events);
+        for (let i = 0; i < iterations; i++) {
+            events = touchOne(events, i);
+            manager.sync(events);
+            incremental.push(measure(container, () => manager.render()));
+            await nextFrame();
+        }
+    } finally {
+        manager.clearAll();
+        container.append(saved);
+    }
+
+    const results = [
+        summarize('Полная пересборка', full),
+        summarize('Дифф по ID', incremental)
+    ];
+    console.table(results);
+    return results;
+}
@@ -64,6 +64,12 @@ export const dateUtils = {
         const date = new Date(dateString);
         const days = ['sun', 'mon', 'tue', 'wed', 'thu', 'fri', 'sat'];
         return days[date.getDay()];
+    },
+
+    // Сдвинуть дату "YYYY-MM-DD" на days дней (в UTC, без влияния часового пояса)
+    addDays(dateString, days) {
+        const [year, month, day] = dateString.split('-').map(Number);
+        return new Date(Date.UTC(year, month - 1, day + days)).toISOString().slice(0, 10);
     }
 };
 